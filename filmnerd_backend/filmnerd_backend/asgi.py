@@ -2,6 +2,8 @@
 ASGI config for filmnerd_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections under /ws/reviews/<movie_id>/ are
+served by reviews.live (live review updates, see also /api/reviews/stream/).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'filmnerd_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from reviews.live import websocket_app  # noqa: E402  (Django setup után)
+from reviews.warmup import warm_up_on_load  # noqa: E402
+
+warm_up_on_load()
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        return await websocket_app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -40,6 +40,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "reviews.middleware.ReplicaRoutingMiddleware",
+    # staff: X-Profile: 1 / ?profile=1 -> ProfileReport az adminban (reviews/profiling.py)
+    "reviews.profiling.ProfilingMiddleware",
 ]
 
 
@@ -59,19 +62,21 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 50,
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT claimekből épített user, DB lekérdezés nélkül (lásd reviews/authentication.py)
+        "reviews.authentication.StatelessJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    # token bucket a throttle_scope-pal jelölt view-kon (reviews/throttling.py, THROTTLE_BUCKETS)
+    "DEFAULT_THROTTLE_CLASSES": [
+        "reviews.throttling.TokenBucketThrottle",
+    ],
 }
 
 if database_url:
     DATABASES = {
-        "default": dj_database_url.config(
-            default=database_url,
-            conn_max_age=600,
-        )
+        "default": dj_database_url.config(default=database_url)
     }
 else:
     DATABASES = {
@@ -88,6 +93,8 @@ else:
 # Tesztadatbázis: használja ugyanazt a configot mirrorral
 DATABASES["default"]["TEST"] = {"MIRROR": "default"}
 STATIC_URL = "/static/"
+# feltöltött import CSV-k (reviews.imports); több gépes futásnál közös storage kell (STORAGES)
+MEDIA_ROOT = os.environ.get("MEDIA_ROOT", BASE_DIR / "media")
 ROOT_URLCONF = "filmnerd_backend.urls"
 AUTH_USER_MODEL = "reviews.User"
 TEST_RUNNER = 'django.test.runner.DiscoverRunner'
@@ -96,6 +103,59 @@ DATABASES['default']['TEST'] = {
     'MIRROR': 'default'
 }
 
+# Read replikák: DATABASE_REPLICA_URLS="postgres://...,postgres://..."
+# A reviews GET-ek ide mennek (reviews.routers), írás után REPLICA_PIN_SECONDS-ig a primaryről.
+for i, replica_url in enumerate(u for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u.strip()):
+    DATABASES[f"replica_{i}"] = dj_database_url.parse(replica_url.strip())
+    DATABASES[f"replica_{i}"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["reviews.routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "5"))
+# A pin csak közös cache-sel (REDIS_URL) látszik minden workeren: enélkül egy másik worker az írás után a
+# replikáról olvasna, ezért alapból csak REDIS_URL mellett route-olunk
+REPLICA_ROUTING = os.environ.get("REPLICA_ROUTING", "1" if os.environ.get("REDIS_URL") else "0") == "1"
+
+# Kapcsolatkezelés minden aliasra: tartós kapcsolat DB_CONN_MAX_AGE mp-ig, health checkkel (egy eldobott
+# kapcsolat helyett a kérés elején új nyílik, nem 500). DB_POOL=1: driver szintű pool (reviews/dbpool.py),
+# ekkor a kérés végén a kapcsolat a poolba megy vissza; DB_POOL_MAX_SIZE kapcsolat processzenként.
+# A sqlite a hangolt backendet kapja (WAL, BEGIN IMMEDIATE; reviews/sqlite/base.py)
+pooled_engines = {
+    "django.db.backends.postgresql": "reviews.postgresql",
+    "django.db.backends.mysql": "reviews.mysql",
+    "django.db.backends.sqlite3": "reviews.sqlite",
+}
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "600"))
+DB_POOL = os.environ.get("DB_POOL", "0") == "1"
+for database in DATABASES.values():
+    database["ENGINE"] = pooled_engines.get(database["ENGINE"], database["ENGINE"])
+    database["CONN_HEALTH_CHECKS"] = True
+    database["CONN_MAX_AGE"] = 0 if DB_POOL else DB_CONN_MAX_AGE
+    if DB_POOL:
+        database.setdefault("OPTIONS", {})["pool"] = {"max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10"))}
+
+
+# Közös cache (throttling, user sor cache, replika pin, profil keret): REDIS_URL="redis://...";
+# enélkül processzenkénti LocMem, vagyis a limitek workerenként számolódnak
+if os.environ.get("REDIS_URL"):
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache",
+                          "LOCATION": os.environ["REDIS_URL"]}}
+
+# Token bucket limitek scope-onként, a reviews.throttling.DEFAULT_BUCKETS felülírására, pl.
+# THROTTLE_BUCKETS = {"user_search": {"anon": "10/min", "user": "60/min", "burst": 5}}
+
+# Teljes User sor cache-elése azoknak a view-knak, amiknek kell (0 = kikapcsolva)
+USER_ROW_CACHE_SECONDS = int(os.environ.get("USER_ROW_CACHE_SECONDS", "30"))
+# Userenkénti aktív állapot cache-e (reviews/authentication.py): a deaktiválás a saját
+# útvonalain azonnal hat, minden más esetben legfeljebb ennyi mp múlva. 0 = minden kérés a DB-ből
+REVOKED_USERS_CACHE_SECONDS = int(os.environ.get("REVOKED_USERS_CACHE_SECONDS", "30"))
+
+# A publikus /api/users/<username>/... válaszok cache-e userenkénti generációval (reviews/public_cache.py);
+# az írások azonnal érvénytelenítenek, a TTL csak a kerülőutakat (admin) korlátozza. 0 = kikapcsolva.
+# Alapból csak közös cache-sel (REDIS_URL): a processzenkénti LocMem-ben a többi worker nem látná az érvénytelenítést
+PUBLIC_CACHE_SECONDS = int(os.environ.get("PUBLIC_CACHE_SECONDS", "600" if os.environ.get("REDIS_URL") else "0"))
+
+# URL-ek, serializerek, DB driver, cache-ek bemelegítése a wsgi/asgi betöltésekor (reviews/warmup.py);
+# a DB lépés a megnyitott kapcsolatot be is zárja, így --preload és ASGI mellett sem marad árva kapcsolat
+WARMUP_ON_LOAD = os.environ.get("WARMUP_ON_LOAD", "1") == "1"
 
 SIMPLE_JWT = {"ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
               "REFRESH_TOKEN_LIFETIME": timedelta(days=7)}
@@ -29,6 +29,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "reviews.middleware.ReplicaRoutingMiddleware",
+    # staff: X-Profile: 1 / ?profile=1 -> ProfileReport az adminban (reviews/profiling.py)
+    "reviews.profiling.ProfilingMiddleware",
 ]
 
 
@@ -37,25 +40,58 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 50,
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT claimekből épített user, DB lekérdezés nélkül (lásd reviews/authentication.py)
+        "reviews.authentication.StatelessJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    # token bucket a throttle_scope-pal jelölt view-kon (reviews/throttling.py, THROTTLE_BUCKETS)
+    "DEFAULT_THROTTLE_CLASSES": [
+        "reviews.throttling.TokenBucketThrottle",
+    ],
 }
 DATABASES = {
       "default": {
-          "ENGINE": "django.db.backends.sqlite3",
+          # WAL, synchronous=NORMAL, busy_timeout, BEGIN IMMEDIATE (reviews/sqlite/base.py)
+          "ENGINE": "reviews.sqlite",
           "NAME": BASE_DIR / "db.sqlite3",
       }
 }
 STATIC_URL = "/static/"
+# feltöltött import CSV-k (reviews.imports); több gépes futásnál közös storage kell (STORAGES)
+MEDIA_ROOT = os.environ.get("MEDIA_ROOT", BASE_DIR / "media")
 ROOT_URLCONF = "filmnerd_backend.urls"
 AUTH_USER_MODEL = "reviews.User"
 TEST_RUNNER = 'django.test.runner.DiscoverRunner'
 DATABASES['default']['TEST'] = {
     'MIRROR': 'default'
 }
+# Tartós, health-checkelt kapcsolat, mint a settings.py-ban; DB_POOL=1: driver szintű pool (reviews/dbpool.py)
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "600"))
+DB_POOL = os.environ.get("DB_POOL", "0") == "1"
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+DATABASES["default"]["CONN_MAX_AGE"] = 0 if DB_POOL else DB_CONN_MAX_AGE
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"] = {"pool": {"max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10"))}}
+DATABASE_ROUTERS = ["reviews.routers.ReplicaRouter"]
+# Teljes User sor cache-elése azoknak a view-knak, amiknek kell (0 = kikapcsolva)
+USER_ROW_CACHE_SECONDS = int(os.environ.get("USER_ROW_CACHE_SECONDS", "30"))
+# Userenkénti aktív állapot cache-e (reviews/authentication.py): a deaktiválás a saját
+# útvonalain azonnal hat, minden más esetben legfeljebb ennyi mp múlva. 0 = minden kérés a DB-ből
+REVOKED_USERS_CACHE_SECONDS = int(os.environ.get("REVOKED_USERS_CACHE_SECONDS", "30"))
+
+# A publikus /api/users/<username>/... válaszok cache-e userenkénti generációval (reviews/public_cache.py);
+# az írások azonnal érvénytelenítenek, a TTL csak a kerülőutakat (admin) korlátozza. 0 = kikapcsolva.
+# Itt nincs közös cache (LocMem, processzenként külön), ezért alapból ki; a tesztek maguk kapcsolják be
+PUBLIC_CACHE_SECONDS = int(os.environ.get("PUBLIC_CACHE_SECONDS", "0"))
+# Replika routing (reviews.middleware): csak közös cache-sel, ahol az írás utáni pin minden workeren látszik
+REPLICA_ROUTING = os.environ.get("REPLICA_ROUTING", "0") == "1"
+
+# URL-ek, serializerek, DB driver, cache-ek bemelegítése a wsgi/asgi betöltésekor (reviews/warmup.py);
+# a DB lépés a megnyitott kapcsolatot be is zárja, így --preload és ASGI mellett sem marad árva kapcsolat
+WARMUP_ON_LOAD = os.environ.get("WARMUP_ON_LOAD", "1") == "1"
+
 SIMPLE_JWT = {"ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
               "REFRESH_TOKEN_LIFETIME": timedelta(days=7)}
 TEMPLATES = [
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'filmnerd_backend.settings')
 
 application = get_wsgi_application()
+
+from reviews.warmup import warm_up_on_load  # noqa: E402  (Django setup után)
+
+warm_up_on_load()
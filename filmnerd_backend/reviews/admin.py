@@ -1,13 +1,158 @@
+"""
+Admin nagy táblákra: nincs pontos COUNT(*) és nincs LIKE '%...%' keresés.
+
+- EstimatedCountPaginator: a lapozó darabszáma a DB statisztikájából jön;
+  show_full_result_count=False, így a "(N total)" COUNT(*) sem fut le.
+- Keresés csak indexelt oszlopokon: pontos egyezés vagy prefix
+  (`__startswith` -> LIKE 'x%', PostgreSQL-en a varchar_pattern_ops indexszel).
+- FK-k raw_id widgettel (nincs több ezer soros <select>), a kiírt
+  kapcsolatok list_select_related-del egy JOIN-ban.
+- Rendezés pk szerint ott, ahol a modell alap ordering-je indexeletlen oszlop.
+"""
+import json
+
 from django.contrib import admin
-from .models import Review
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connections, transaction
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .authentication import forget_user, restore, revoke
+from .jobs import enqueue
+from .models import (CsvImport, Favourite, Follow, FollowSuggestion, Job, Movie, MovieDailyStats, MovieList,
+                     MovieListItem, ProfileReport, Review, RollupWatermark, User, UserStats, Watchlist, YearInReview)
+
+
+def estimated_count(queryset):
+    """
+    Becsült sorszám a DB statisztikájából, vagy None, ha nincs ilyen.
+    Szűretlen queryset: PostgreSQL pg_class.reltuples, MySQL
+    information_schema.TABLES, SQLite sqlite_stat1 (ANALYZE után).
+    Szűrt queryset: PostgreSQL-en a planner becslése (EXPLAIN), máshol None.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if queryset.query.where:
+        if connection.vendor != "postgresql":
+            return None
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        elif connection.vendor == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # a stat oszlop első száma a tábla sorainak száma
+            cursor.execute("SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples = -1: a táblán még nem futott ANALYZE
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    COUNT(*) helyett becslés, ha az legalább `exact_below`; kisebb (vagy nem
+    becsülhető) halmazon pontos COUNT. A becslés miatt az utolsó oldalak
+    lehetnek üresek vagy hiányosak – a lapozóban ez elfogadható ár.
+    """
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < self.exact_below:
+            return super().count
+        return estimate
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class RatingFilter(admin.SimpleListFilter):
+    """Fix sávok: az alapértelmezett filter SELECT DISTINCT rating-et futtatna a teljes táblán."""
+    title = "rating"
+    parameter_name = "rating"
+
+    def lookups(self, request, model_admin):
+        return [(str(n), f"{n} – {n}.9") for n in range(1, 6)]
+
+    def queryset(self, request, queryset):
+        if self.value() in {str(n) for n in range(1, 6)}:
+            n = int(self.value())
+            return queryset.filter(rating__gte=n, rating__lt=n + 1)
+        return queryset
+
+
+@admin.register(User)
+class UserAdmin(ScalableAdmin, BaseUserAdmin):
+    list_display = ("id", "username", "email", "name", "is_staff", "date_joined")
+    search_fields = ("username__startswith",)
+    ordering = ("-id",)
+    fieldsets = BaseUserAdmin.fieldsets + (("Profile", {"fields": ("name", "token_expiration")}),)
+    actions = ["delete_in_chunks"]
+
+    def get_actions(self, request):
+        # a beépített delete_selected a teljes kaszkádot memóriába tölti
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # a tokenes hozzáférés és a cache-elt sor is azonnal kövesse (is_active, email, név)
+        if change and "is_active" in form.changed_data:
+            if obj.is_active:
+                restore(obj.pk)
+            else:
+                revoke([obj.pk])
+        elif change:
+            forget_user(obj.pk)
+
+    @admin.action(description="Delete selected users in chunks (background job)", permissions=["delete"])
+    def delete_in_chunks(self, request, queryset):
+        user_ids = list(queryset.values_list("pk", flat=True))
+        queryset.update(is_active=False)
+        revoke(user_ids)
+        enqueue("delete_users", {"user_ids": user_ids})
+        self.message_user(request, f"{len(user_ids)} user(s) deactivated and queued for deletion.")
+
+
+@admin.register(Movie)
+class MovieAdmin(ScalableAdmin):
+    list_display = ("id", "external_id")
+    search_fields = ("external_id__exact",)
+    ordering = ("-id",)
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
-    list_display = ("id", "user_id", "movie_id", "rating", "short_text", "created_at")
-    search_fields = ("movie_id", "user_id", "text")
-    list_filter = ("rating",)
-    ordering = ("-created_at",)
+class ReviewAdmin(ScalableAdmin):
+    list_display = ("id", "user", "movie", "rating", "short_text", "created_at")
+    list_select_related = ("user", "movie")
+    raw_id_fields = ("user", "movie")
+    search_fields = ("movie__external_id__exact", "user__username__startswith")
+    list_filter = (RatingFilter,)
+    ordering = ("-id",)
 
     def short_text(self, obj):
         if not obj.text:
@@ -15,3 +160,177 @@ class ReviewAdmin(admin.ModelAdmin):
         return (obj.text[:40] + "...") if len(obj.text) > 40 else obj.text
 
     short_text.short_description = "Review text"
+
+
+@admin.register(Favourite)
+class FavouriteAdmin(ScalableAdmin):
+    list_display = ("id", "user", "movie")
+    list_select_related = ("user", "movie")
+    raw_id_fields = ("user", "movie")
+    search_fields = ("movie__external_id__exact", "user__username__startswith")
+    ordering = ("-id",)
+
+
+@admin.register(Watchlist)
+class WatchlistAdmin(FavouriteAdmin):
+    pass
+
+
+@admin.register(MovieList)
+class MovieListAdmin(ScalableAdmin):
+    list_display = ("id", "user", "name", "created_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username__startswith",)
+    ordering = ("-id",)
+
+
+@admin.register(MovieListItem)
+class MovieListItemAdmin(ScalableAdmin):
+    list_display = ("id", "movie_list_id", "movie", "position", "added_at")
+    list_select_related = ("movie",)
+    raw_id_fields = ("movie_list", "movie")
+    search_fields = ("movie__external_id__exact",)
+    ordering = ("-id",)
+
+
+@admin.register(Follow)
+class FollowAdmin(ScalableAdmin):
+    list_display = ("id", "from_user", "to_user", "created_at")
+    list_select_related = ("from_user", "to_user")
+    raw_id_fields = ("from_user", "to_user")
+    search_fields = ("from_user__username__startswith", "to_user__username__startswith")
+    ordering = ("-id",)
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(ScalableAdmin):
+    list_display = ("user", "reviews_count", "favourites_count", "watchlist_count", "lists_count",
+                    "followers_count", "following_count")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username__startswith",)
+    ordering = ("-user_id",)
+
+
+@admin.register(FollowSuggestion)
+class FollowSuggestionAdmin(ScalableAdmin):
+    list_display = ("id", "user", "suggested", "mutual_count", "taste", "score", "computed_at")
+    list_select_related = ("user", "suggested")
+    raw_id_fields = ("user", "suggested")
+    search_fields = ("user__username__startswith",)
+    ordering = ("-id",)
+
+
+@admin.register(MovieDailyStats)
+class MovieDailyStatsAdmin(ScalableAdmin):
+    list_display = ("id", "movie", "day", "reviews_added", "rating_sum", "favourites_added", "watchlist_added",
+                    "list_adds")
+    list_select_related = ("movie",)
+    raw_id_fields = ("movie",)
+    search_fields = ("movie__external_id__exact",)
+    ordering = ("-id",)
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    # a value visszaállítása után a következő futás onnan újraszámol (duplán, ha a napi sorok maradnak)
+    list_display = ("name", "value")
+
+
+@admin.register(YearInReview)
+class YearInReviewAdmin(ScalableAdmin):
+    list_display = ("id", "user", "year", "computed_at")
+    list_filter = ("year",)
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username__startswith",)
+    ordering = ("-id",)
+
+
+@admin.register(Job)
+class JobAdmin(ScalableAdmin):
+    list_display = ("id", "task", "status", "attempts", "max_attempts", "run_at", "locked_by", "created_at")
+    list_filter = ("status",)
+    search_fields = ("dedupe_key__exact",)
+    ordering = ("-id",)
+    actions = ["requeue"]
+
+    @admin.action(description="Requeue selected jobs now")
+    def requeue(self, request, queryset):
+        count = 0
+        for job_id, dedupe_key in queryset.exclude(status=Job.QUEUED).values_list("pk", "dedupe_key"):
+            try:
+                with transaction.atomic():
+                    count += Job.objects.filter(pk=job_id).update(
+                        status=Job.QUEUED, queued_key=dedupe_key, attempts=0, run_at=timezone.now(),
+                        locked_by="", locked_at=None,
+                    )
+            except IntegrityError:
+                pass  # már vár egy azonos dedupe_key-ű job, azt nem duplázzuk
+        self.message_user(request, f"{count} job(s) requeued.")
+
+
+@admin.register(CsvImport)
+class CsvImportAdmin(ScalableAdmin):
+    list_display = ("id", "user", "kind", "source", "status", "rows_processed", "error_count", "created_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    list_filter = ("status", "kind")
+    search_fields = ("user__username__startswith",)
+    ordering = ("-id",)
+
+
+@admin.register(ProfileReport)
+class ProfileReportAdmin(ScalableAdmin):
+    list_display = ("id", "created_at", "user", "method", "path", "status_code", "duration_ms", "cpu_ms",
+                    "sql_count", "sql_ms", "downloads")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    list_filter = ("method",)
+    search_fields = ("user__username__startswith",)
+    ordering = ("-id",)
+    readonly_fields = ("user", "method", "path", "status_code", "duration_ms", "cpu_ms", "sql_count", "sql_ms",
+                       "samples", "created_at", "downloads")
+    exclude = ("collapsed", "sql_log")
+
+    def get_queryset(self, request):
+        # a changelistnek nem kellenek a nagy mezők
+        return super().get_queryset(request).defer("collapsed", "sql_log")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        view = self.admin_site.admin_view
+        return [
+            path("<int:pk>/collapsed/", view(self.download_collapsed), name="reviews_profilereport_collapsed"),
+            path("<int:pk>/sql/", view(self.download_sql), name="reviews_profilereport_sql"),
+        ] + super().get_urls()
+
+    @admin.display(description="Download")
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">stacks</a> · <a href="{}">SQL</a>',
+            reverse("admin:reviews_profilereport_collapsed", args=[obj.pk]),
+            reverse("admin:reviews_profilereport_sql", args=[obj.pk]),
+        )
+
+    def _report(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        return get_object_or_404(ProfileReport.objects.only("collapsed", "sql_log"), pk=pk)
+
+    def download_collapsed(self, request, pk):
+        """flamegraph.pl / speedscope bemenet."""
+        response = HttpResponse(self._report(request, pk).collapsed, content_type="text/plain; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="profile-{pk}.collapsed.txt"'
+        return response
+
+    def download_sql(self, request, pk):
+        response = JsonResponse(self._report(request, pk).sql_log, safe=False, json_dumps_params={"indent": 2})
+        response["Content-Disposition"] = f'attachment; filename="profile-{pk}.sql.json"'
+        return response
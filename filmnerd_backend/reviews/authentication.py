@@ -0,0 +1,106 @@
+"""
+Stateless JWT authentication.
+
+A SimpleJWT `JWTAuthentication` minden kérésnél betölti a User sort. Itt a
+tokenben lévő id + username claimekből építünk egy User példányt, aminek a
+többi mezője deferred: FK-ként, szűrőben (`filter(user=request.user)`) és
+`user.username`-ként DB nélkül használható, bármely más mező első elérése
+tölti be. Ha egy view-nak kell a teljes sor, `full_user()` – opcionális,
+rövid TTL-es cache-sel (USER_ROW_CACHE_SECONDS). A cache csak a
+USER_ROW_FIELDS mezőket tartja, a jelszó hash-t soha.
+
+Visszavonás: userenként egy cache kulcs (`auth:active:<id>`), kérésenként
+egy `cache.get`. Hiányzó kulcsnál egy DB lekérdezés dönt (a törölt user sora
+már nincs meg: visszavont), az aktív állapot REVOKED_USERS_CACHE_SECONDS-ig
+marad a cache-ben. A deaktiváló útvonalak (admin, deletion) a `revoke`-kal
+azonnal, az access token élettartamára írják be a tiltást; ami ezeket
+megkerüli, az legfeljebb a TTL-ig jut még be.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+USERNAME_CLAIM = "username"
+# a full_user()-t használó serializerek mezői (MeSerializer, UserPublicSerializer)
+USER_ROW_FIELDS = ("id", "username", "email", "name", "token_expiration")
+
+
+def tokens_for(user):
+    """RefreshToken a username claimmel (az access token is megkapja)."""
+    refresh = RefreshToken.for_user(user)
+    refresh[USERNAME_CLAIM] = user.username
+    return refresh
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if USERNAME_CLAIM not in validated_token:
+            # régi token username nélkül: a szokásos DB-s út
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if not is_active(user_id):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        User = get_user_model()
+        return User.from_db(DEFAULT_DB_ALIAS, ["id", "username"], [user_id, validated_token[USERNAME_CLAIM]])
+
+
+def _active_key(user_id):
+    return f"auth:active:{user_id}"
+
+
+def is_active(user_id):
+    """A user beléphet-e: egy cache olvasás, hiányzó kulcsnál a DB-ből (és a cache-be, ha van TTL)."""
+    active = cache.get(_active_key(user_id))
+    if active is None:
+        active = get_user_model().objects.filter(pk=user_id, is_active=True).exists()
+        ttl = getattr(settings, "REVOKED_USERS_CACHE_SECONDS", 30)
+        if ttl:
+            cache.set(_active_key(user_id), active, ttl)
+    return active
+
+
+def revoke(user_ids):
+    """Deaktiválás vagy törlés után: a tiltás az access token élettartamáig a cache-ben marad."""
+    lifetime = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    cache.set_many({_active_key(user_id): False for user_id in user_ids}, lifetime)
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def restore(user_id):
+    """Újraaktiválás után: a következő kérés a DB-ből olvassa az állapotot."""
+    cache.delete_many([_active_key(user_id), _cache_key(user_id)])
+
+
+def _cache_key(user_id):
+    return f"user-row:{user_id}"
+
+
+def full_user(request):
+    """
+    A request userének sora (TTL cache-ből, ha be van kapcsolva). Cache-ből csak a
+    USER_ROW_FIELDS mezők jönnek, a többi deferred (első elérésre a DB tölti be).
+    """
+    user = request.user
+    if not user.get_deferred_fields():
+        return user
+    User = get_user_model()
+    ttl = getattr(settings, "USER_ROW_CACHE_SECONDS", 0)
+    if ttl:
+        cached = cache.get(_cache_key(user.pk))
+        if cached is not None:
+            return User.from_db(DEFAULT_DB_ALIAS, USER_ROW_FIELDS, cached)
+    loaded = User.objects.only(*USER_ROW_FIELDS).get(pk=user.pk)
+    if ttl:
+        cache.set(_cache_key(user.pk), [getattr(loaded, field) for field in USER_ROW_FIELDS], ttl)
+    return loaded
+
+
+def forget_user(user_id):
+    """Cache-elt sor eldobása, ha a user adatai változtak."""
+    cache.delete(_cache_key(user_id))
@@ -0,0 +1,446 @@
+"""
+Mikro-benchmarkok a forró végpontokra: `python manage.py bench [scenario ...]`.
+
+Minden scenario egy visszagörgetett tranzakcióban fut a beállított
+adatbázison, és soronként (név, ms/kérés, CPU ms/kérés, lekérdezés/kérés)
+eredményt ad; a CPU idő a process_time, így a DB-re várás nincs benne. A
+lekérdezéseket egy execute_wrapper számolja: a connection.queries napló
+9000 sornál átfordul, és a naplózás maga is időt mérne.
+"""
+import random
+import time
+
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .authentication import StatelessJWTAuthentication, tokens_for
+from .models import User
+
+SCENARIOS = {}
+
+
+def scenario(func):
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+class QueryCounter:
+    """connection.execute_wrapper: minden végrehajtott utasítás számolása, napló nélkül."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(label, call, iterations):
+    call()  # bemelegítés (URL/serializer cache-ek)
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        start, cpu_start = time.perf_counter(), time.process_time()
+        for _ in range(iterations):
+            call()
+        elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    return label, elapsed * 1000 / iterations, cpu * 1000 / iterations, counter.count / iterations
+
+
+def bench_user(username="bench_user"):
+    return User.objects.create_user(username=username, email=f"{username}@example.com", password="x")
+
+
+@scenario
+def friends_scope(iterations):
+    """GET /reviews/?movie_id=&scope=following: 50 vs. 3000 követett user (ebből 50 értékelte a filmet)."""
+    from .models import Follow, Movie, Review
+    from .views import ReviewListCreateView
+
+    viewer = bench_user()
+    others = User.objects.bulk_create([User(username=f"bench_user_{n}", password="!") for n in range(3450)])
+    reviewers, lurkers = others[:500], others[500:]
+    movie = Movie.objects.get_for("bench_movie")
+    Review.objects.bulk_create([Review(user=u, movie=movie, rating=1 + n % 5) for n, u in enumerate(reviewers)])
+    factory = APIRequestFactory()
+    view = ReviewListCreateView.as_view()
+
+    def call():
+        request = factory.get("/reviews/", {"movie_id": "bench_movie", "scope": "following"})
+        force_authenticate(request, user=viewer)
+        return view(request)
+
+    rows = []
+    Follow.objects.bulk_create([Follow(from_user=viewer, to_user=u) for u in reviewers[:50]])
+    rows.append(measure("scope=following, 50 followed", call, iterations))
+    Follow.objects.bulk_create([Follow(from_user=viewer, to_user=u) for u in lurkers])
+    rows.append(measure("scope=following, 3000 followed", call, iterations))
+    return rows
+
+
+@scenario
+def sparse_fields(iterations):
+    """GET /reviews/?movie_id= 50 hosszú review-val: teljes válasz vs. ?fields= / ?omit=text (payload, CPU)."""
+    from rest_framework.renderers import JSONRenderer
+
+    from .models import Movie, Review
+    from .views import ReviewListCreateView
+
+    viewer = bench_user()
+    others = User.objects.bulk_create([User(username=f"bench_user_{n}", password="!") for n in range(50)])
+    movie = Movie.objects.get_for("bench_movie")
+    text = "Lorem ipsum dolor sit amet. " * 70  # ~2 KB
+    Review.objects.bulk_create([Review(user=u, movie=movie, rating=1 + n % 5, text=text) for n, u in enumerate(others)])
+    factory = APIRequestFactory()
+    view = ReviewListCreateView.as_view()
+    renderer = JSONRenderer()
+
+    rows = []
+    for label, params in [("full", {}), ("?omit=text", {"omit": "text"}),
+                          ("?fields=id,user_id,rating", {"fields": "id,user_id,rating"})]:
+        def call(params=params):
+            request = factory.get("/reviews/", {"movie_id": "bench_movie", **params})
+            force_authenticate(request, user=viewer)
+            return renderer.render(view(request).data)
+
+        rows.append(measure(f"{label} ({len(call()) / 1024:.1f} KiB)", call, iterations))
+    return rows
+
+
+@scenario
+def compatibility(iterations):
+    """Ízlés-egyezés 300 követettel (100 közös film): egy vektorizált menet vs. páronként, cache nélkül."""
+    import random
+
+    from . import compatibility as compat
+    from .models import Follow, Movie, Review
+
+    rng = random.Random(0)
+    viewer = bench_user()
+    others = User.objects.bulk_create([User(username=f"bench_user_{n}", password="!") for n in range(300)])
+    movies = [Movie.objects.get_for(f"bench_{n}") for n in range(100)]
+    Review.objects.bulk_create(
+        [Review(user=u, movie=m, rating=rng.randint(1, 5)) for u in [viewer, *others] for m in movies]
+    )
+    Follow.objects.bulk_create([Follow(from_user=viewer, to_user=u) for u in others])
+
+    # a viewer verziójának léptetése: minden hívás cache miss, a többi kulcshoz nem nyúlunk
+    def batch():
+        compat.invalidate(viewer.pk)
+        compat.compare_with_followings(viewer.pk)
+
+    def pairwise():
+        compat.invalidate(viewer.pk)
+        for other in others:
+            compat.compare(viewer.pk, other.pk)
+
+    iterations = max(iterations // 20, 1)
+    return [measure("batch (one pass)", batch, iterations), measure("pair by pair", pairwise, iterations)]
+
+
+@scenario
+def auth(iterations):
+    """Favourite/Watchlist exists: DB-s vs. claim alapú JWT user."""
+    from .views import FavouriteViewSet, MeView
+
+    user = bench_user()
+    token = f"Bearer {tokens_for(user).access_token}"
+    factory = APIRequestFactory()
+
+    def view_call(view):
+        return lambda: view(factory.get("/favourites/exists/", {"movie_id": "603"}, HTTP_AUTHORIZATION=token))
+
+    rows = []
+    for cls in (JWTAuthentication, StatelessJWTAuthentication):
+        view = FavouriteViewSet.as_view({"get": "exists"}, authentication_classes=[cls])
+        rows.append(measure(f"favourites/exists {cls.__name__}", view_call(view), iterations))
+    for cls in (JWTAuthentication, StatelessJWTAuthentication):
+        view = MeView.as_view(authentication_classes=[cls])
+        rows.append(measure(f"auth/me {cls.__name__}", view_call(view), iterations))
+    return rows
+
+
+def count_cache_calls():
+    """A default cache backend hívásai (= round tripek) egy mock-kal számolva; exit után `.total`."""
+    from contextlib import ExitStack
+    from unittest import mock
+
+    from django.core.cache import caches
+
+    backend, stack = caches["default"], ExitStack()
+    calls = [stack.enter_context(mock.patch.object(backend, name, wraps=getattr(backend, name)))
+             for name in ("get", "set", "add", "incr", "decr", "delete", "get_many", "set_many")]
+    stack.total = lambda: sum(call.call_count for call in calls)
+    return stack
+
+
+@scenario
+def throttling(iterations):
+    """GET /users/search/ anonim: throttle nélkül vs. token buckettel; cache round trip / kérés."""
+    from django.core.cache import cache
+    from django.test.utils import override_settings
+
+    from .throttling import TokenBucketThrottle
+    from .views import UserSearchView
+
+    User.objects.bulk_create([User(username=f"bench_user_{n}", password="!") for n in range(50)])
+    factory = APIRequestFactory()
+    rows = []
+    for label, classes in (("no throttle", []), ("token bucket", [TokenBucketThrottle])):
+        view = UserSearchView.as_view(throttle_classes=classes)
+
+        def call(view=view):
+            return view(factory.get("/users/search/", {"q": "bench_user_1"}))
+
+        # a limit ne szóljon bele: a mérés az engedett kérések költsége
+        with override_settings(THROTTLE_BUCKETS={"user_search": {"anon": "1000/s", "burst": 10 ** 9}}):
+            cache.clear()
+            with count_cache_calls() as counter:
+                for _ in range(iterations):
+                    call()
+            trips = counter.total() / iterations
+            rows.append(measure(f"{label}, {trips:.2f} cache round trips/request", call, iterations))
+    return rows
+
+
+@scenario
+def public_cache(iterations):
+    """GET /users/<username>/reviews/ 50 review-val: cache nélkül, generáció léptetés után (miss), találat."""
+    from django.core.cache import cache
+    from django.test.utils import override_settings
+
+    from . import public_cache as public
+    from .models import Movie, Review
+    from .views import UserReviewsView
+
+    user = bench_user()
+    movies = Movie.objects.resolve([f"bench_movie_{n}" for n in range(50)], create=True)
+    Review.objects.bulk_create([Review(user=user, movie=m, rating=1 + n % 5, text="Lorem ipsum " * 20)
+                                for n, m in enumerate(movies.values())])
+    factory = APIRequestFactory()
+    view = UserReviewsView.as_view(throttle_classes=[])
+
+    def call():
+        return view(factory.get(f"/users/{user.username}/reviews/"), username=user.username)
+
+    def miss():
+        public._bump([user.username])
+        return call()
+
+    cache.clear()
+    with override_settings(PUBLIC_CACHE_SECONDS=0):
+        rows = [measure("no cache", call, iterations)]
+    # élesben csak közös cache-sel (REDIS_URL) van bekapcsolva; itt a helyi cache-en mérjük
+    with override_settings(PUBLIC_CACHE_SECONDS=600):
+        rows.append(measure("miss (generation bumped)", miss, iterations))
+        rows.append(measure("hit", call, iterations))
+    return rows
+
+
+@scenario
+def loaders(iterations):
+    """FollowSerializer / ReviewSerializer select_related nélküli querysettel: soronkénti FK vs. batch loader."""
+    from rest_framework import serializers
+
+    from .models import Follow, Movie, Review
+    from .serializers import FollowSerializer, ReviewSerializer
+
+    viewer = bench_user()
+    others = User.objects.bulk_create([User(username=f"bench_user_{n}", password="!") for n in range(200)])
+    movies = list(Movie.objects.resolve([f"bench_movie_{n}" for n in range(200)], create=True).values())
+    Follow.objects.bulk_create([Follow(from_user=viewer, to_user=u) for u in others])
+    Review.objects.bulk_create([Review(user=u, movie=m, rating=3) for u, m in zip(others, movies)])
+
+    rows = []
+    for name, cls, queryset in (("follows", FollowSerializer, Follow.objects.order_by("id")),
+                                ("reviews", ReviewSerializer, Review.objects.order_by("id"))):
+        for size in (50, 200):
+            # a sima ListSerializer kihagyja a regisztrációs menetet: soronként egy lekérdezés típusonként
+            rows.append(measure(f"{name} x{size}, per row", lambda: serializers.ListSerializer(
+                queryset[:size], child=cls()).data, iterations))
+            rows.append(measure(f"{name} x{size}, batched", lambda: cls(queryset[:size], many=True).data, iterations))
+    return rows
+
+
+# a Movie tábla előtti (varchar movie_id) és utáni (integer FK) review-elrendezés
+LAYOUTS = {
+    "varchar movie_id": "varchar(20)",
+    "integer movie FK": "integer",
+}
+
+
+@scenario
+def timeseries(iterations):
+    """Egy film 2 éves heti idősora: a nyers táblák csoportosítása vs. a napi összesítők (MovieDailyStats)."""
+    import datetime
+
+    from django.db.models import Count, Sum
+    from django.db.models.functions import TruncWeek
+    from django.utils import timezone
+
+    from . import rollups
+    from .models import Favourite, Movie, MovieDailyStats, Review, Watchlist
+    from .views import MovieTimeseriesView
+
+    rng = random.Random(0)
+    now = timezone.now()
+    users = User.objects.bulk_create([User(username=f"bench_user_{n}", password="!") for n in range(3000)])
+    movie = Movie.objects.get_for("bench_movie")
+
+    def stamp():
+        return now - datetime.timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+
+    Review.objects.bulk_create([Review(user=u, movie=movie, rating=rng.randint(1, 5), created_at=stamp())
+                                for u in users])
+    Favourite.objects.bulk_create([Favourite(user=u, movie=movie, created_at=stamp()) for u in users[::3]])
+    Watchlist.objects.bulk_create([Watchlist(user=u, movie=movie, created_at=stamp()) for u in users[::2]])
+    rollups.build_movie_stats(until=now)
+    since = now - datetime.timedelta(days=2 * 365)
+
+    def raw():
+        for model, extra in ((Review, {"s": Sum("rating")}), (Favourite, {}), (Watchlist, {})):
+            list(model.objects.filter(movie=movie, created_at__gte=since).order_by()
+                 .values(week=TruncWeek("created_at")).annotate(n=Count("id"), **extra))
+
+    factory = APIRequestFactory()
+    view = MovieTimeseriesView.as_view()
+    params = {"from": since.date().isoformat(), "to": now.date().isoformat(), "bucket": "week"}
+
+    def rollup():
+        return view(factory.get("/movies/bench_movie/timeseries/", params), movie_id="bench_movie")
+
+    return [
+        measure(f"raw GROUP BY, {len(users)} reviews", raw, iterations),
+        measure(f"rollup endpoint, {MovieDailyStats.objects.count()} daily rows", rollup, iterations),
+    ]
+
+
+@scenario
+def wrapped(iterations):
+    """Éves összefoglaló 200 userre (user-enként 40 review): userenkénti aggregátumok vs. vektorizált tartomány."""
+    import datetime
+
+    from django.db.models import Avg, Count
+    from django.db.models.functions import ExtractMonth
+    from django.utils import timezone
+
+    from . import wrapped as year_in_review
+    from .models import Favourite, Movie, Review, Watchlist
+
+    rng = random.Random(0)
+    year = timezone.localdate().year
+    start = timezone.make_aware(datetime.datetime(year, 1, 1))
+    users = User.objects.bulk_create([User(username=f"bench_user_{n}", password="!") for n in range(200)])
+    movies = list(Movie.objects.resolve([f"bench_movie_{n}" for n in range(200)], create=True).values())
+
+    def stamp():
+        return start + datetime.timedelta(minutes=rng.randrange(300 * 24 * 60))
+
+    for user in users:
+        picked = rng.sample(movies, 50)
+        Review.objects.bulk_create([Review(user=user, movie=m, rating=rng.randint(2, 10) / 2, created_at=stamp())
+                                    for m in picked[:40]])
+        Favourite.objects.bulk_create([Favourite(user=user, movie=m, created_at=stamp()) for m in picked[40:45]])
+        Watchlist.objects.bulk_create([Watchlist(user=user, movie=m, created_at=stamp()) for m in picked[45:]])
+    lo, hi = users[0].pk, users[-1].pk + 1
+    # egy userenkénti menet 1000 lekérdezés: a futásidő miatt kevesebb ismétlés is elég
+    iterations = max(iterations // 20, 1)
+
+    def per_user():
+        for user in users:
+            reviews = Review.objects.filter(user=user, created_at__year=year)
+            reviews.aggregate(Count("id"), Avg("rating"))
+            list(reviews.order_by().values("rating").annotate(n=Count("id")))
+            for model in (Review, Favourite, Watchlist):
+                list(model.objects.filter(user=user, created_at__year=year).order_by()
+                     .values(month=ExtractMonth("created_at")).annotate(n=Count("id")))
+
+    return [
+        measure("per-user aggregates", per_user, iterations),
+        measure("vectorized range", lambda: year_in_review.compute(year, lo, hi), iterations),
+    ]
+
+
+@scenario
+def db_pool(iterations):
+    """Kérésenként: kapcsolat + SELECT 1 + zárás (CONN_MAX_AGE=0) új kapcsolattal vs. poolból; p50/p99."""
+    import statistics
+
+    from django.db import connections
+
+    from . import dbpool
+
+    base = connections.settings["default"]
+    rows = []
+    for n, (label, options) in enumerate((("new connection", {}), ("pooled", {"pool": {"max_size": 4}}))):
+        alias = f"bench_pool_{n}"
+        database = {**base, "CONN_MAX_AGE": 0, "OPTIONS": {**base.get("OPTIONS", {}), **options}}
+        connections.settings[alias] = connections.configure_settings({"default": base, alias: database})[alias]
+        latencies = []
+
+        def request(alias=alias, latencies=latencies):
+            start = time.perf_counter()
+            db = connections[alias]
+            with db.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            db.close()  # request_finished: CONN_MAX_AGE=0 mellett zár (poollal: vissza a poolba)
+            latencies.append(time.perf_counter() - start)
+
+        try:
+            label, ms, cpu_ms, queries = measure(label, request, iterations)
+        finally:
+            del connections[alias]
+            del connections.settings[alias]
+            dbpool.close_pools(alias)
+        cuts = statistics.quantiles(latencies[1:], n=100)  # a bemelegítés nélkül
+        rows.append((f"{label}, p50 {cuts[49] * 1000:.3f} ms, p99 {cuts[98] * 1000:.3f} ms", ms, cpu_ms, queries))
+    return rows
+
+
+def index_bytes(table):
+    """A tábla indexeinek mérete bájtban (SQLite: dbstat, PostgreSQL); más backenden None."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                [table],
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_indexes_size(%s::regclass)", [table])
+        else:
+            return None
+        return cursor.fetchone()[0] or 0
+
+
+@scenario
+def index_sizes(iterations):
+    """Review indexek mérete és movie szerinti aggregálás: varchar vs. integer movie_id."""
+    rng = random.Random(0)
+    pairs = {(rng.randrange(2000), 100000 + rng.randrange(20000)) for _ in range(iterations * 100)}
+    rows = []
+    for n, (label, column_type) in enumerate(LAYOUTS.items()):
+        table = f"bench_review_layout_{n}"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {table} (user_id integer NOT NULL, movie_id {column_type} NOT NULL, "
+                "rating real NOT NULL, UNIQUE (user_id, movie_id))"
+            )
+            cursor.execute(f"CREATE INDEX {table}_movie ON {table} (movie_id)")
+            cursor.executemany(
+                f"INSERT INTO {table} (user_id, movie_id, rating) VALUES (%s, %s, %s)",
+                [(user_id, str(movie_id) if column_type != "integer" else movie_id, 3.0)
+                 for user_id, movie_id in pairs],
+            )
+        size = index_bytes(table)
+        movie_ids = [m for _, m in pairs][:50]
+
+        def aggregate(table=table, cast=str if column_type != "integer" else int):
+            with connection.cursor() as cursor:
+                for movie_id in movie_ids:
+                    cursor.execute(f"SELECT COUNT(*), AVG(rating) FROM {table} WHERE movie_id = %s", [cast(movie_id)])
+                    cursor.fetchone()
+
+        size_label = f"{size / 1024:.0f} KiB" if size is not None else "n/a"
+        rows.append(measure(f"{label}, {len(pairs)} rows, indexes {size_label}", aggregate, iterations))
+    return rows
@@ -0,0 +1,229 @@
+"""
+Driver szintű kapcsolat pool a DB backendekhez (reviews.postgresql,
+reviews.mysql, reviews.sqlite).
+
+A Django 5.0 backendjeinek nincs poolja (az 5.1-es OPTIONS["pool"] is csak
+PostgreSQL-re). Itt ugyanazzal a kulccsal, minden backendre:
+
+    DATABASES["default"]["OPTIONS"]["pool"] = {"max_size": 10, "timeout": 30}
+
+Poollal a CONN_MAX_AGE 0: a kérés végi `close()` a kapcsolatot rollback után
+visszaadja a poolba, a következő kérés onnan veszi ki, connect és session
+beállítás (PRAGMA-k, SET-ek) nélkül. A pool processzenként és aliasonként
+egy; fork után a gyerek újat nyit.
+
+Minden backenden (psycopg2, mysqlclient, sqlite3) a `ConnectionPool` shim
+dolgozik:
+
+- LIFO: a legutóbb visszaadott (meleg) kapcsolat megy ki elsőként;
+- kiadás előtt SELECT 1, ha a kapcsolat CHECK_IDLE mp-nél régebben állt:
+  a szerver által eldobott kapcsolat helyett új nyílik, nem 500 lesz belőle
+  (rövid üresjárat után nem kérdezünk, a forgalom zöme így round trip nélküli);
+- a min_size fölötti, MAX_IDLE-nél régebben álló kapcsolatok bezárulnak;
+- max_size-nál a kérő timeout mp-ig vár, utána OperationalError.
+
+Metrikák processzenként: `stats()` (a /api/health/db/ staff végpont adja ki).
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+from django.db.utils import OperationalError
+
+MAX_SIZE = 10
+TIMEOUT = 30
+MAX_IDLE = 600
+CHECK_IDLE = 5
+
+_pools = {}
+_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Szálbiztos LIFO pool DB-API kapcsolatokhoz; új kapcsolatot a hívó nyit (`getconn(create)`)."""
+
+    driver = "shim"
+
+    def __init__(self, name, min_size=0, max_size=MAX_SIZE, timeout=TIMEOUT, max_idle=MAX_IDLE,
+                 check_idle=CHECK_IDLE):
+        self.name = name
+        self.min_size, self.max_size, self.timeout = min_size, max_size, timeout
+        self.max_idle, self.check_idle = max_idle, check_idle
+        self._idle = []  # [(kapcsolat, visszaadás ideje)], a végén a legfrissebb
+        self._size = 0  # nyitott kapcsolatok: kiadott + idle
+        self._cond = threading.Condition()
+        self.counters = Counter()
+        self.wait_seconds = 0.0
+
+    def _checkout(self, deadline):
+        """(idle kapcsolat, állás ideje), vagy (None, 0), ha újat lehet nyitni; a lejártak listája is."""
+        expired, waited_since = [], None
+        with self._cond:
+            try:
+                while True:
+                    now = time.monotonic()
+                    while len(self._idle) > self.min_size and now - self._idle[0][1] > self.max_idle:
+                        expired.append(self._idle.pop(0)[0])
+                        self._size -= 1
+                    if self._idle:
+                        conn, since = self._idle.pop()
+                        return conn, now - since, expired
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, 0, expired
+                    if now >= deadline:
+                        self.counters["timeouts"] += 1
+                        raise OperationalError(
+                            f"Connection pool '{self.name}' exhausted ({self.max_size} in use, {self.timeout}s)."
+                        )
+                    if waited_since is None:
+                        waited_since = now
+                        self.counters["waits"] += 1
+                    self._cond.wait(deadline - now)
+            finally:
+                self.counters["closed"] += len(expired)
+                if waited_since is not None:
+                    self.wait_seconds += time.monotonic() - waited_since
+
+    def getconn(self, create):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn, idle_for, expired = self._checkout(deadline)
+            for old in expired:
+                _quietly_close(old)
+            if conn is None:
+                try:
+                    conn = create()
+                except BaseException:
+                    self._forget()
+                    raise
+                self.counters["created"] += 1
+                return conn
+            if idle_for < self.check_idle or _healthy(conn):
+                self.counters["reused"] += 1
+                return conn
+            self.counters["health_failures"] += 1
+            self._discard(conn)
+
+    def putconn(self, conn, broken=False):
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _discard(self, conn):
+        _quietly_close(conn)
+        self.counters["closed"] += 1
+        self._forget()
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            _quietly_close(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "driver": self.driver,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                **{name: self.counters[name] for name in
+                   ("created", "reused", "closed", "health_failures", "waits", "timeouts")},
+                "wait_ms": round(self.wait_seconds * 1000, 1),
+            }
+
+
+def _healthy(conn):
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception:
+        return False
+    return True
+
+
+def _quietly_close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def pool_for(alias, factory):
+    """Az alias poolja ebben a processzben; először `factory()` hozza létre."""
+    key = (alias, os.getpid())
+    pool = _pools.get(key)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = factory()
+    return pool
+
+
+def stats():
+    """{alias: pool metrikák} az aktuális processz pooljaira."""
+    pid = os.getpid()
+    return {alias: pool.stats() for (alias, owner), pool in list(_pools.items()) if owner == pid}
+
+
+def close_pools(alias=None):
+    """A processz (vagy egy alias) pooljainak bezárása; a következő kapcsolat új poolt nyit."""
+    pid = os.getpid()
+    with _lock:
+        keys = [key for key in _pools if key[1] == pid and alias in (None, key[0])]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+class PooledDatabaseMixin:
+    """DatabaseWrapper keverék: OPTIONS["pool"] esetén a kapcsolat a processz poolból jön és oda megy vissza."""
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        options = settings_dict.get("OPTIONS", {}).get("pool")
+        # None/False: nincs pool; True vagy {...}: pool (alapértékekkel / felülírva)
+        self.pool_options = None if options in (None, False) else {} if options is True else options
+        self.pool = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)  # a driver connect()-je nem ismeri
+        return params
+
+    def get_new_connection(self, conn_params):
+        create = super().get_new_connection
+        if self.pool_options is None:
+            return create(conn_params)
+        self.pool = pool_for(self.alias, lambda: ConnectionPool(self.alias, **self.pool_options))
+        return self.pool.getconn(lambda: create(conn_params))
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        # atomic blokkban zárt (close_if_unusable_or_obsolete) vagy hibás kapcsolat nem megy vissza
+        broken = self.in_atomic_block or self.errors_occurred
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection, broken=broken)
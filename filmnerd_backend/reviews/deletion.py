@@ -0,0 +1,92 @@
+"""
+Userek törlése kis darabokban, a Django deletion collector nélkül.
+
+A `User.delete()` minden kapcsolódó sort (review, favourite, listaelem, ...)
+memóriába tölt, és egyetlen hosszú tranzakcióban töröl. Itt táblánként,
+függőségi sorrendben, `chunk_size` pk-s DELETE-ek mennek, mindegyik a saját
+rövid tranzakciójában; a Follow törlésekor a másik fél UserStats
+számlálói ugyanabban a tranzakcióban csökkennek. A végén a (már üres
+kapcsolatú) User sorokat a szokásos delete() viszi, az kezeli a maradék
+FK-kat (admin log, csoportok).
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from . import public_cache
+from .authentication import revoke
+from .models import (Favourite, Follow, FollowSuggestion, MovieList, MovieListItem, ProfileReport, Review, User,
+                     UserStats, Watchlist, YearInReview)
+
+# (címke, model, a törlendő userre mutató lookup) – függőségi sorrendben
+STEPS = [
+    ("list items", MovieListItem, "movie_list__user_id__in"),
+    ("lists", MovieList, "user_id__in"),
+    ("reviews", Review, "user_id__in"),
+    ("favourites", Favourite, "user_id__in"),
+    ("watchlist", Watchlist, "user_id__in"),
+    ("following", Follow, "from_user_id__in"),
+    ("followers", Follow, "to_user_id__in"),
+    ("suggestions", FollowSuggestion, "user_id__in"),
+    ("suggested to others", FollowSuggestion, "suggested_id__in"),
+    ("profile reports", ProfileReport, "user_id__in"),
+    ("year in review", YearInReview, "user_id__in"),
+    ("stats", UserStats, "user_id__in"),
+]
+
+# Follow törlésekor a túloldali user számlálója: lookup -> (túloldali mező, számláló)
+FOLLOW_COUNTERS = {
+    "from_user_id__in": ("to_user_id", "followers_count"),
+    "to_user_id__in": ("from_user_id", "following_count"),
+}
+
+
+def delete_users(user_ids, chunk_size=1000, progress=None):
+    """
+    A userek és minden adatuk törlése; `progress(label, deleted)` minden
+    darab után hívódik (label = STEPS címke). Returns {label: törölt sorok}.
+    A usereket előbb inaktiválja, hogy a törlés alatt ne írjanak (új bejelentkezés).
+    """
+    user_ids = set(user_ids)
+    usernames = list(User.objects.filter(pk__in=user_ids).values_list("username", flat=True))
+    User.objects.filter(pk__in=user_ids).update(is_active=False)
+    revoke(user_ids)
+    totals = Counter()
+    for label, model, lookup in STEPS:
+        rows = model.objects.filter(**{lookup: user_ids}).order_by("pk")
+        counter = FOLLOW_COUNTERS.get(lookup)
+        while True:
+            if counter:
+                chunk = list(rows.values_list("pk", counter[0])[:chunk_size])
+                pks = [pk for pk, _ in chunk]
+            else:
+                pks = list(rows.values_list("pk", flat=True)[:chunk_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                # függőség nélküli modelleken ez egy DELETE ... WHERE id IN (...), sorok betöltése nélkül
+                model.objects.filter(pk__in=pks).delete()
+                if counter:
+                    others = Counter(other for _, other in chunk if other not in user_ids)
+                    _decrement(counter[1], others)
+                    public_cache.invalidate_ids(others)
+            totals[label] += len(pks)
+            if progress:
+                progress(label, totals[label])
+
+    with transaction.atomic():
+        _, per_model = User.objects.filter(pk__in=user_ids).delete()
+    totals["users"] = per_model.get(User._meta.label, 0)
+    public_cache.invalidate(*usernames)
+    return totals
+
+
+def _decrement(field, deltas):
+    """{user_id: n} csökkentés; azonos n-ű userek egy UPDATE-ben (jellemzően mind 1)."""
+    by_delta = {}
+    for user_id, n in deltas.items():
+        by_delta.setdefault(n, []).append(user_id)
+    for n, user_ids in by_delta.items():
+        UserStats.objects.filter(user_id__in=user_ids).update(**{field: Greatest(F(field) - n, 0)})
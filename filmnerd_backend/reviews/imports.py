@@ -0,0 +1,346 @@
+"""
+Letterboxd / IMDb CSV exportok importja.
+
+A fájlt soronként olvassuk (csv.DictReader egy stream fölött), CHUNK_SIZE
+soronként: címek -> movie_id a resolverrel (egy hívás darabonként), Movie
+sorok egy lépésben, majd egy bulk upsert / INSERT ... ON CONFLICT DO NOTHING
+és a CsvImport számlálóinak frissítése ugyanabban a rövid tranzakcióban.
+
+A resolver a FILMNERD_MOVIE_RESOLVER settingben adható meg (dotted path);
+interfész: `resolve(rows) -> [movie_id | None, ...]` a sorok sorrendjében.
+Alapból a `FixtureResolver` egy helyi JSON-ból dolgozik (fejlesztés, teszt);
+élesben egy TMDB-s keresőt érdemes mögé tenni.
+"""
+import csv
+import json
+import re
+import uuid
+from collections import namedtuple
+from datetime import datetime, time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import compatibility, public_cache, rollups
+from .models import CsvImport, Favourite, Movie, Review, Watchlist
+from .stats import rebuild_user_stats
+
+CHUNK_SIZE = 500
+MAX_ERRORS = 100
+DEFAULT_RESOLVER = "reviews.imports.FixtureResolver"
+
+Row = namedtuple("Row", "line title year imdb_id rating text date")
+
+
+class CsvReadError(Exception):
+    """A fájl egy sora nem olvasható (kódolás, CSV szintaxis); az import ezen a soron leáll."""
+
+    def __init__(self, line, error):
+        super().__init__(f"unreadable line: {error}")
+        self.line = line
+
+
+# --- parse ---
+
+def _number(value, label):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{label} is not a number: {value!r}")
+
+
+def _rating(value, scale):
+    """Az export skálája (5 vagy 10) -> 1..5; az 1 csillag alatti értékek 1-re kerülnek."""
+    if not value:
+        return None
+    rating = _number(value, "rating")
+    if not 0 < rating <= scale:
+        raise ValueError(f"rating {value} out of range")
+    return min(max(rating * 5 / scale, 1), 5)
+
+
+def _date(value):
+    if not value:
+        return None
+    try:
+        day = datetime.strptime(value[:10], "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"bad date: {value!r}")
+    return timezone.make_aware(datetime.combine(day, time()))
+
+
+def _year(value):
+    return int(_number(value, "year")) if value else None
+
+
+def _letterboxd(line, rec):
+    # ratings.csv / reviews.csv / watchlist.csv / likes/films.csv
+    return Row(
+        line=line,
+        title=rec.get("Name", "").strip(),
+        year=_year(rec.get("Year")),
+        imdb_id=None,
+        rating=_rating(rec.get("Rating"), 5),
+        text=rec.get("Review") or "",
+        date=_date(rec.get("Watched Date") or rec.get("Date")),
+    )
+
+
+def _imdb(line, rec):
+    # ratings.csv / watchlist.csv (10-es skála)
+    return Row(
+        line=line,
+        title=rec.get("Title", "").strip(),
+        year=_year(rec.get("Year")),
+        imdb_id=rec.get("Const", "").strip() or None,
+        rating=_rating(rec.get("Your Rating"), 10),
+        text="",
+        date=_date(rec.get("Date Rated") or rec.get("Created")),
+    )
+
+
+def parse(stream):
+    """
+    (source, rows): rows lusta iterátor (line, Row | None, hiba | None) elemekkel.
+    A forrást a fejléc dönti el; ismeretlen vagy olvashatatlan fejlécnél ValueError.
+    A fejléc utáni olvasási hiba (rossz bájt, hibás CSV) a rows-ból CsvReadError.
+    """
+    reader = csv.DictReader(stream)
+    try:
+        header = set(reader.fieldnames or ())
+    except csv.Error as exc:
+        raise ValueError(f"unreadable header: {exc}")
+    if "Const" in header:
+        source, convert = "imdb", _imdb
+    elif "Letterboxd URI" in header or {"Name", "Year"} <= header:
+        source, convert = "letterboxd", _letterboxd
+    else:
+        raise ValueError("Unrecognised CSV header: expected a Letterboxd or IMDb export.")
+
+    def rows():
+        records = iter(reader)
+        while True:
+            try:
+                rec = next(records, None)
+            except UnicodeDecodeError as exc:
+                # a következő sor dekódolása bukott el, a számláló még az előzőn áll
+                raise CsvReadError(reader.reader.line_num + 1, exc) from exc
+            except csv.Error as exc:
+                # a DictReader.line_num csak sikeres sor után lép, a belső readeré már a hibásat számolja
+                raise CsvReadError(reader.reader.line_num, exc) from exc
+            if rec is None:
+                return
+            try:
+                row = convert(reader.line_num, rec)
+                if not row.title and not row.imdb_id:
+                    raise ValueError("missing title")
+                yield reader.line_num, row, None
+            except ValueError as exc:
+                yield reader.line_num, None, str(exc)
+
+    return source, rows()
+
+
+# --- resolver ---
+
+def normalize_title(title):
+    return re.sub(r"[\W_]+", " ", title.casefold()).strip()
+
+
+class FixtureResolver:
+    """IMDb id vagy (cím, év) alapján egy helyi JSON listából (reviews/data/movie_titles.json)."""
+
+    path = Path(__file__).resolve().parent / "data" / "movie_titles.json"
+
+    def __init__(self):
+        with open(self.path, encoding="utf-8") as f:
+            entries = json.load(f)
+        self.by_imdb = {e["imdb_id"]: e["movie_id"] for e in entries if e.get("imdb_id")}
+        self.by_title = {}
+        for e in entries:
+            self.by_title.setdefault(normalize_title(e["title"]), []).append(e)
+
+    def resolve(self, rows):
+        return [self._one(row) for row in rows]
+
+    def _one(self, row):
+        if row.imdb_id in self.by_imdb:
+            return self.by_imdb[row.imdb_id]
+        candidates = self.by_title.get(normalize_title(row.title), [])
+        if row.year is not None:
+            candidates = [e for e in candidates if e["year"] == row.year]
+        # év nélkül csak egyértelmű címre
+        return candidates[0]["movie_id"] if len(candidates) == 1 else None
+
+
+_resolvers = {}
+
+
+def get_resolver():
+    path = getattr(settings, "FILMNERD_MOVIE_RESOLVER", DEFAULT_RESOLVER)
+    if path not in _resolvers:
+        _resolvers[path] = import_string(path)()
+    return _resolvers[path]
+
+
+# --- write ---
+
+def _write_reviews(user_id, pairs, with_text):
+    """Upsert (user, movie)-ra; az értékelt filmek lekerülnek a watchlistről. Returns (created, updated)."""
+    latest = {movie.pk: (row, movie) for row, movie in pairs}  # fájlon belüli ismétlés: az utolsó nyer
+    movies = [movie for _, movie in latest.values()]
+    existing = set(Review.objects.filter(user_id=user_id, movie__in=movies).values_list("movie_id", flat=True))
+    now = timezone.now()
+    Review.objects.bulk_create(
+        [
+            Review(user_id=user_id, movie=movie, rating=row.rating, text=row.text.strip(),
+                   created_at=row.date or now)
+            for row, movie in latest.values()
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "movie"],
+        update_fields=["rating", "text", "updated_at"] if with_text else ["rating", "updated_at"],
+    )
+    Watchlist.objects.filter(user_id=user_id, movie__in=movies).delete()
+    return len(latest) - len(existing), len(existing)
+
+
+def _write_entries(model):
+    def write(user_id, pairs):
+        movies = {movie.pk: movie for _, movie in pairs}
+        existing = set(model.objects.filter(user_id=user_id, movie__in=movies).values_list("movie_id", flat=True))
+        model.objects.bulk_create(
+            [model(user_id=user_id, movie=movie) for pk, movie in movies.items() if pk not in existing],
+            ignore_conflicts=True,
+        )
+        return len(movies) - len(existing), 0
+    return write
+
+
+WRITERS = {
+    "ratings": lambda user_id, pairs: _write_reviews(user_id, pairs, with_text=False),
+    "reviews": lambda user_id, pairs: _write_reviews(user_id, pairs, with_text=True),
+    "watchlist": _write_entries(Watchlist),
+    "favourites": _write_entries(Favourite),
+}
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def run_import(csv_import, stream, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    A stream (szöveges fájl) feldolgozása a csv_import-ba; `progress(csv_import)`
+    minden darab után. Hibás fejlécnél vagy olvashatatlan sornál FAILED (a már
+    beírt darabok megmaradnak), a hibás sorok csak az errors-ba kerülnek.
+    """
+    # újrafuttatásnál (job retry) elölről számolunk; az upsertek idempotensek
+    CsvImport.objects.filter(pk=csv_import.pk).update(
+        status=CsvImport.RUNNING, rows_processed=0, created_count=0, updated_count=0, error_count=0, errors=[]
+    )
+    csv_import.errors = []
+    try:
+        csv_import.source, rows = parse(stream)
+    except ValueError as exc:
+        _finish(csv_import, CsvImport.FAILED, errors=[{"line": 1, "title": "", "error": str(exc)}], error_count=1)
+        return csv_import
+    CsvImport.objects.filter(pk=csv_import.pk).update(source=csv_import.source)
+
+    try:
+        _import_rows(csv_import, rows, chunk_size, progress)
+    except CsvReadError as exc:
+        failure = {"line": exc.line, "title": "", "error": str(exc)}
+    else:
+        failure = None
+
+    rebuild_user_stats([csv_import.user_id])
+    if csv_import.kind in ("ratings", "reviews"):
+        compatibility.invalidate(csv_import.user_id)
+    public_cache.invalidate_ids([csv_import.user_id])
+    if failure:
+        _finish(csv_import, CsvImport.FAILED, errors=csv_import.errors[:MAX_ERRORS - 1] + [failure],
+                error_count=F("error_count") + 1)
+    else:
+        _finish(csv_import, CsvImport.DONE)
+    return csv_import
+
+
+def _import_rows(csv_import, rows, chunk_size, progress):
+    writer = WRITERS[csv_import.kind]
+    needs_rating = csv_import.kind in ("ratings", "reviews")
+    for chunk in _chunks(rows, chunk_size):
+        errors = [{"line": line, "title": "", "error": error} for line, row, error in chunk if error]
+        valid = [row for _, row, error in chunk if not error]
+        if needs_rating:
+            errors += [{"line": r.line, "title": r.title, "error": "no rating"} for r in valid if r.rating is None]
+            valid = [r for r in valid if r.rating is not None]
+        movie_ids = get_resolver().resolve(valid) if valid else []
+        errors += [{"line": r.line, "title": r.title, "error": "movie not found"}
+                   for r, m in zip(valid, movie_ids) if m is None]
+
+        # a tranzakción kívül (SQLite: az első utasítás írás legyen)
+        movies = Movie.objects.resolve({m for m in movie_ids if m}, create=True)
+        pairs = [(r, movies[m]) for r, m in zip(valid, movie_ids) if m]
+        with transaction.atomic():
+            created, updated = writer(csv_import.user_id, pairs) if pairs else (0, 0)
+            if needs_rating and pairs:
+                # történeti created_at: a napok a rollup watermarkja mögé esnek, a build nem látná őket
+                rollups.refresh(
+                    Review.objects.filter(user_id=csv_import.user_id, movie__in=[movie for _, movie in pairs])
+                    .values_list("movie_id", TruncDate("created_at"))
+                )
+            room = max(MAX_ERRORS - len(csv_import.errors), 0)
+            csv_import.errors += sorted(errors, key=lambda e: e["line"])[:room]
+            CsvImport.objects.filter(pk=csv_import.pk).update(
+                rows_processed=F("rows_processed") + len(chunk),
+                created_count=F("created_count") + created,
+                updated_count=F("updated_count") + updated,
+                error_count=F("error_count") + len(errors),
+                errors=csv_import.errors,
+            )
+        csv_import.refresh_from_db()
+        if progress:
+            progress(csv_import)
+
+
+def _finish(csv_import, status, **fields):
+    CsvImport.objects.filter(pk=csv_import.pk).update(status=status, finished_at=timezone.now(), **fields)
+    csv_import.refresh_from_db()
+
+
+def start_upload(user, kind, upload):
+    """A feltöltött fájl a default storage-ba, CsvImport sor + run_import job (commit után)."""
+    from .jobs import enqueue
+
+    name = default_storage.save(f"imports/{user.pk}/{uuid.uuid4().hex}.csv", upload)
+    csv_import = CsvImport.objects.create(user=user, kind=kind, file_name=name)
+    enqueue("run_import", {"import_id": csv_import.pk})
+    return csv_import
+
+
+def decoded_lines(f):
+    """
+    Bináris fájl sorai soronként UTF-8-ként (BOM az első sorban): a TextIOWrapper
+    pufferrel előre olvas, így a rossz bájt egy korábbi sor számával jelezne.
+    """
+    for number, line in enumerate(f):
+        yield line.decode("utf-8-sig" if number == 0 else "utf-8")
+
+
+def run_stored(import_id):
+    """A start_upload-dal tárolt fájl feldolgozása, utána (DONE vagy FAILED) a fájl törlése."""
+    csv_import = CsvImport.objects.get(pk=import_id)
+    with default_storage.open(csv_import.file_name, "rb") as f:
+        run_import(csv_import, decoded_lines(f))
+    default_storage.delete(csv_import.file_name)
+    return csv_import
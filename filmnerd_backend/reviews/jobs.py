@@ -0,0 +1,232 @@
+"""
+Adatbázisban tárolt háttérfeladat-sor, külső broker nélkül.
+
+    from reviews.jobs import enqueue
+    enqueue("rebalance_list", {"movie_list_id": 7}, dedupe_key="rebalance_list:7")
+
+A feladatok a `reviews.tasks` modulban vannak `@task`-kal regisztrálva, a
+`manage.py runworker` futtatja őket. A `@periodic(seconds)` taskokat a
+worker induláskor sorba teszi, és minden futás után újra ütemezi. Foglalás PostgreSQL/MySQL-en
+`SELECT ... FOR UPDATE SKIP LOCKED`-del, SQLite-on egyetlen
+`UPDATE ... WHERE id IN (SELECT ... LIMIT n)` utasítással (az írások ott
+amúgy is sorban futnak). Hibánál exponenciális backoff, max_attempts után
+FAILED. Futás közben egy heartbeat szál HEARTBEAT_SECONDS-onként frissíti a
+lease-t (locked_at), így a hosszú taskokat senki nem veszi el; a
+`LEASE_SECONDS`-nél régebben nem frissített (elhalt workerhez tartozó)
+jobokat más worker újra felveszi.
+
+A dedupe a `queued_key` oszlopon át megy: amíg a job QUEUED, ez a
+dedupe_key, egyébként NULL. Sima unique index, így minden backenden
+(MySQL-en is, ahol nincs részleges index) az adatbázis garantálja.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from importlib import import_module
+
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F, Q, Subquery
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+PERIODIC = {}
+TASK_MODULES = ["reviews.tasks"]
+
+DEFAULT_MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 3600
+LEASE_SECONDS = 300
+HEARTBEAT_SECONDS = LEASE_SECONDS / 5
+
+
+def task(func):
+    """Függvény regisztrálása a nevén; a payload kulcsai a kulcsszavas argumentumai."""
+    TASKS[func.__name__] = func
+    return func
+
+
+def periodic(seconds):
+    """`@periodic(3600)` a `@task` fölé: ismétlődő job, dedupe_key-jel (egyszerre egy vár)."""
+    def register(func):
+        PERIODIC[func.__name__] = seconds
+        return func
+    return register
+
+
+def schedule_periodic():
+    """Minden periodikus task sorba tétele, ha még nem vár (worker induláskor)."""
+    for name in PERIODIC:
+        enqueue(name, dedupe_key=f"periodic:{name}")
+
+
+def load_tasks():
+    for module in TASK_MODULES:
+        import_module(module)
+
+
+def enqueue(task_name, payload=None, *, dedupe_key=None, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Job felvétele a futó tranzakció commitja után (atomic blokkon kívül azonnal),
+    így a worker nem láthat még nem commitolt adatot, rollbacknél pedig nincs job.
+    Ha már vár egy job ugyanazzal a dedupe_key-jel, nem jön létre új.
+    """
+    job = Job(
+        task=task_name,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        queued_key=dedupe_key,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    transaction.on_commit(lambda: Job.objects.bulk_create([job], ignore_conflicts=True))
+
+
+def retry_delay(attempts):
+    """attempts. sikertelen próbálkozás utáni várakozás: 5s, 10s, 20s, ... (max 1 óra), jitterrel."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claimable(now):
+    stale = now - timedelta(seconds=LEASE_SECONDS)
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale)
+
+
+def claim(worker_id, limit=10):
+    """Legfeljebb `limit` esedékes job lefoglalása ennek a workernek."""
+    now = timezone.now()
+    ready = Job.objects.filter(claimable(now)).order_by("run_at", "id")
+    claimed = {
+        "status": Job.RUNNING, "queued_key": None, "locked_by": worker_id, "locked_at": now,
+        "attempts": F("attempts") + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(ready.select_for_update(skip_locked=True).values_list("id", flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**claimed)
+    else:
+        # egy utasítás: két worker nem kaphatja meg ugyanazt a sort
+        Job.objects.filter(claimable(now), id__in=Subquery(ready.values("id")[:limit])).update(**claimed)
+    return list(Job.objects.filter(status=Job.RUNNING, locked_by=worker_id, locked_at=now).order_by("run_at", "id"))
+
+
+def renew(job):
+    """A lease meghosszabbítása; False, ha a job már nem ezé a workeré."""
+    return bool(Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(locked_at=timezone.now()))
+
+
+@contextmanager
+def heartbeat(job):
+    """A blokk alatt egy háttérszál HEARTBEAT_SECONDS-onként megújítja a job lease-ét."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    if not renew(job):
+                        logger.warning("Job %s (%s) lease lost to another worker", job.pk, job.task)
+                        return
+                except DatabaseError:
+                    # pl. SQLite-on foglalt az írás: a következő ütem újrapróbálja
+                    logger.warning("Job %s (%s) lease renewal failed", job.pk, job.task, exc_info=True)
+        finally:
+            connection.close()  # a szál saját kapcsolata
+
+    thread = threading.Thread(target=beat, name=f"job-heartbeat-{job.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def execute(job):
+    """Egy lefoglalt job futtatása; True ha sikerült. Siker: törlés, hiba: retry vagy FAILED."""
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task: {job.task}")
+        with heartbeat(job):
+            func(**job.payload)
+    except Exception:
+        logger.exception("Job %s (%s) failed, attempt %s/%s", job.pk, job.task, job.attempts, job.max_attempts)
+        _failed(job, traceback.format_exc())
+        return False
+    if not Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()[0]:
+        logger.warning("Job %s (%s) finished after its lease was taken over", job.pk, job.task)
+    if job.task in PERIODIC:
+        enqueue(job.task, dedupe_key=f"periodic:{job.task}", delay=PERIODIC[job.task])
+    return True
+
+
+def _failed(job, error):
+    mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+    if job.task not in TASKS or job.attempts >= job.max_attempts:
+        if not mine.update(status=Job.FAILED, last_error=error):
+            logger.warning("Job %s (%s) failed after its lease was taken over", job.pk, job.task)
+        if job.task in PERIODIC:
+            # a sorozat ne szakadjon meg egy végleg elhasalt futás miatt
+            enqueue(job.task, dedupe_key=f"periodic:{job.task}", delay=PERIODIC[job.task])
+        return
+    run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+    try:
+        with transaction.atomic():
+            mine.update(status=Job.QUEUED, queued_key=F("dedupe_key"), run_at=run_at, locked_by="", locked_at=None,
+                        last_error=error)
+    except IntegrityError:
+        # közben bekerült egy új, azonos dedupe_key-ű job: az elvégzi helyette
+        mine.delete()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class WorkerMetrics:
+    """Áteresztőképesség a worker életében: darabszám, jobs/s, átlagos futásidő taskonként."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts = Counter()
+        self.busy = defaultdict(float)
+
+    def record(self, job, ok, seconds):
+        self.counts["succeeded" if ok else "errored"] += 1
+        self.counts[job.task] += 1
+        self.busy[job.task] += seconds
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        done = self.counts["succeeded"] + self.counts["errored"]
+        lines = [
+            f"{done} jobs in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} jobs/s), "
+            f"{self.counts['succeeded']} succeeded, {self.counts['errored']} errored, "
+            f"{Job.objects.filter(status=Job.QUEUED).count()} queued"
+        ]
+        for name, seconds in sorted(self.busy.items()):
+            lines.append(f"  {name}: {self.counts[name]} runs, {seconds * 1000 / self.counts[name]:.1f} ms avg")
+        return "\n".join(lines)
+
+
+def work(worker_id, metrics, batch=10):
+    """Egy kör: foglalás + futtatás; a futtatott jobok száma (0 = nincs esedékes)."""
+    jobs = claim(worker_id, batch)
+    for job in jobs:
+        start = time.perf_counter()
+        ok = execute(job)
+        metrics.record(job, ok, time.perf_counter() - start)
+    return len(jobs)
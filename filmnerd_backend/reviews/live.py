@@ -0,0 +1,142 @@
+"""
+Élő review-frissítések (SSE / WebSocket) movie_id csatornánként.
+
+A view-k commit után `publish_review_event`-tel küldenek; a feliratkozók
+(views.review_stream SSE, illetve `websocket_app` az asgi.py-ban) a brokeren
+keresztül kapják meg. Alapból folyamaton belüli broker, a
+FILMNERD_LIVE_BROKER setting egy saját osztály dotted path-ja lehet
+(publish / subscribe / has_subscribers interfésszel, pl. Redis pub/sub).
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = "reviews.live.InProcessBroker"
+
+
+class InProcessBroker:
+    """Pub/sub egy folyamaton belül; publish bármely szálból hívható."""
+
+    queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def has_subscribers(self, channel):
+        return bool(self._subscribers.get(channel))
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_put_nowait, queue, message)
+
+    def subscribe(self, channel):
+        """`async with broker.subscribe(channel) as queue:` – az üzenetek a queue-ba jönnek."""
+        return _Subscription(self, channel)
+
+    def _add(self, channel, entry):
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(entry)
+
+    def _remove(self, channel, entry):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, set())
+            subscribers.discard(entry)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+
+class _Subscription:
+    # nem @asynccontextmanager: a félbehagyott SSE generátorok lezárásakor
+    # nincs második async generátor, aminek a lezárási sorrendje számítana
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.entry = None
+
+    async def __aenter__(self):
+        self.entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.broker.queue_size))
+        self.broker._add(self.channel, self.entry)
+        return self.entry[1]
+
+    async def __aexit__(self, *exc_info):
+        self.broker._remove(self.channel, self.entry)
+
+
+def _put_nowait(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # lassú kliens: eldobjuk, a következő esemény úgyis hozza a friss summary-t
+        pass
+
+
+_brokers = {}
+
+
+def get_broker():
+    path = getattr(settings, "FILMNERD_LIVE_BROKER", DEFAULT_BROKER)
+    if path not in _brokers:
+        _brokers[path] = import_string(path)()
+    return _brokers[path]
+
+
+def channel_for(movie_id):
+    return f"reviews:{movie_id}"
+
+
+def publish_review_event(movie_id, event, payload):
+    """Esemény + friss summary a movie csatornájára (commit után hívandó)."""
+    from .models import Review
+
+    broker = get_broker()
+    channel = channel_for(movie_id)
+    # külső brokernél nem tudjuk, van-e feliratkozó: mindig küldünk
+    has_subscribers = getattr(broker, "has_subscribers", None)
+    if has_subscribers is not None and not has_subscribers(channel):
+        return
+    broker.publish(channel, {"type": event, **payload, "summary": Review.objects.summary(movie_id)})
+
+
+def format_sse(message):
+    return f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+
+
+async def websocket_app(scope, receive, send):
+    """
+    Nyers ASGI WebSocket handler: ws://.../ws/reviews/<movie_id>/
+    Csak szerver -> kliens üzenetek; a kliens üzeneteit eldobjuk.
+    """
+    parts = scope["path"].strip("/").split("/")
+    if len(parts) != 3 or parts[:2] != ["ws", "reviews"]:
+        await receive()
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+
+    async with get_broker().subscribe(channel_for(parts[2])) as queue:
+        receiver, getter = asyncio.ensure_future(receive()), asyncio.ensure_future(queue.get())
+        try:
+            while True:
+                done, _ = await asyncio.wait({receiver, getter}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    await send({"type": "websocket.send", "text": json.dumps(getter.result())})
+                    getter = asyncio.ensure_future(queue.get())
+                if receiver in done:
+                    if receiver.result()["type"] == "websocket.disconnect":
+                        return
+                    receiver = asyncio.ensure_future(receive())
+        finally:
+            # bontás, send hiba vagy a handler cancel-je: a függő futureök ne maradjanak,
+            # a leiratkozást az async with végzi
+            getter.cancel()
+            receiver.cancel()
@@ -0,0 +1,130 @@
+"""
+Kérésenkénti batch betöltés (DataLoader minta) a serializerek FK-ihoz.
+
+Egy `BatchedMixin`-es mező forrásának első tagja egy FK (pl. `user`,
+`movie`): a kapcsolt sort nem a példány lusta attribútumából veszi (soronként
+egy lekérdezés), hanem a kérés loaderéből az FK id alapján. A
+`BatchListSerializer` két menetben dolgozik: előbb minden sor (és a
+prefetch-elt beágyazott listák sorai) regisztrálja a kellő id-kat, aztán
+típusonként egy `IN` lekérdezés, végül a szokásos szerializálás. Így a
+lekérdezések száma nem függ az oldalmérettől.
+
+Ha a kapcsolat már a példányon van (select_related, prefetch, kézzel
+beállítva), a loader csak eltárolja, lekérdezés nélkül; a generic view-k
+sparse_queryset-je továbbra is JOIN-t számol, ott a loader csak memó.
+
+A loaderek a kérésre (request nélkül a gyökér serializerre) kötődnek, így
+egy kérésen belül több serializer is osztozik a betöltött sorokon.
+"""
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import get_attribute
+
+from .models import Movie, User
+
+# a betöltött oszlopok típusonként: amit a serializerek a kapcsolt sorból olvasnak
+COLUMNS = {
+    User: ("id", "username", "name", "email"),
+    Movie: ("id", "external_id"),
+}
+
+
+class Loader:
+    """Egy model sorai id szerint: `want` regisztrál, `dispatch` egy IN-nel tölt, `get` memóból ad."""
+
+    def __init__(self, model):
+        self.model = model
+        self.loaded = {}
+        self.pending = set()
+
+    def prime(self, obj):
+        self.loaded.setdefault(obj.pk, obj)
+
+    def want(self, pk):
+        if pk is not None and pk not in self.loaded:
+            self.pending.add(pk)
+
+    def dispatch(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, set()
+        self.loaded.update(dict.fromkeys(pending))  # törölt sor: ne kérdezzük újra
+        for obj in self.model._default_manager.filter(pk__in=pending).only(*COLUMNS[self.model]):
+            self.loaded[obj.pk] = obj
+
+    def get(self, pk):
+        if pk not in self.loaded:
+            self.want(pk)
+            self.dispatch()
+        return self.loaded.get(pk)
+
+
+def loaders(serializer):
+    """model -> Loader a serializer kérésén (vagy gyökerén)."""
+    root = serializer.root
+    holder = root.context.get("request") or root
+    registry = getattr(holder, "_loaders", None)
+    if registry is None:
+        registry = holder._loaders = {}
+    return registry
+
+
+def loader(serializer, model):
+    registry = loaders(serializer)
+    if model not in registry:
+        registry[model] = Loader(model)
+    return registry[model]
+
+
+class BatchedMixin:
+    """Mező, aminek a forrása FK-n át olvas (source="user.username", nested user serializer, ...)."""
+
+    def _relation(self, instance):
+        if not isinstance(instance, models.Model):
+            return None
+        return type(instance)._meta.get_field(self.source_attrs[0])
+
+    def register(self, instance):
+        relation = self._relation(instance)
+        if relation is None:
+            return
+        target = loader(self, relation.related_model)
+        if relation.is_cached(instance):
+            obj = relation.get_cached_value(instance)
+            if obj is not None:
+                target.prime(obj)
+        else:
+            target.want(getattr(instance, relation.attname))
+
+    def get_attribute(self, instance):
+        relation = self._relation(instance)
+        if relation is None or relation.is_cached(instance):
+            return super().get_attribute(instance)
+        obj = loader(self, relation.related_model).get(getattr(instance, relation.attname))
+        return None if obj is None else get_attribute(obj, self.source_attrs[1:])
+
+
+def register(serializer, instances):
+    """Az id-k gyűjtése a serializer batched mezőiből, a prefetch-elt beágyazott listákba is lelépve."""
+    for field in serializer.fields.values():
+        if isinstance(field, BatchedMixin):
+            for instance in instances:
+                field.register(instance)
+        elif isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.Serializer):
+            nested = []
+            for instance in instances:
+                cache = getattr(instance, "_prefetched_objects_cache", {})
+                if field.source in cache:
+                    nested.extend(cache[field.source])
+            if nested:
+                register(field.child, nested)
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        register(self.child, data)  # a queryset itt kiértékelődik, a super() a result cache-t járja be
+        for pending in loaders(self).values():
+            pending.dispatch()
+        return super().to_representation(data)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = "Run request micro-benchmarks (wall/CPU ms and SQL queries per request); all writes are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenarios", nargs="*", help=f"Default: all ({', '.join(SCENARIOS)}).")
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        names = options["scenarios"] or list(SCENARIOS)
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {SCENARIOS[name].__doc__.strip()}"))
+            with transaction.atomic():
+                rows = SCENARIOS[name](options["iterations"])
+                transaction.set_rollback(True)
+            for label, ms, cpu_ms, queries in rows:
+                self.stdout.write(f"  {label:<55} {ms:8.3f} ms  {cpu_ms:8.3f} ms CPU  {queries:6.2f} queries")
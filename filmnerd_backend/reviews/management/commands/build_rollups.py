@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reviews.rollups import build_movie_stats, rebuild_movie_stats
+
+
+class Command(BaseCommand):
+    help = "Update the per-movie daily rollups since the last run (normally a periodic job)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Drop every daily row and recount all history.")
+
+    def handle(self, *args, **options):
+        touched = rebuild_movie_stats() if options["rebuild"] else build_movie_stats()
+        self.stdout.write(self.style.SUCCESS(f"{touched} movie-day row(s) updated."))
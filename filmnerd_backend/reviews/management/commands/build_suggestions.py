@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reviews.suggestions import build_suggestions
+
+
+class Command(BaseCommand):
+    help = "Recompute \"people you may know\" follow suggestions for every user (normally a periodic job)."
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} users")
+
+        done = build_suggestions(progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Suggestions rebuilt for {done} user(s)."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reviews import wrapped
+
+
+class Command(BaseCommand):
+    help = "Compute the yearly \"wrapped\" snapshots: one job per user id range for the workers, or --inline."
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", nargs="?", type=int, default=timezone.localdate().year)
+        parser.add_argument("--shard-size", type=int, default=wrapped.SHARD_SIZE, help="User ids per job.")
+        parser.add_argument("--inline", action="store_true", help="Run every range in this process, no jobs.")
+
+    def handle(self, *args, year, shard_size, inline, **options):
+        if not inline:
+            shards = wrapped.schedule(year, shard_size)
+            self.stdout.write(self.style.SUCCESS(f"{len(shards)} job(s) queued for {year}; run manage.py runworker."))
+            return
+        total = 0
+        for lo, hi in wrapped.ranges(shard_size):
+            total += wrapped.build_range(year, lo, hi)
+            self.stdout.write(f"  users {lo}..{hi - 1}: {total} snapshot(s) so far")
+        self.stdout.write(self.style.SUCCESS(f"{total} snapshot(s) written for {year}."))
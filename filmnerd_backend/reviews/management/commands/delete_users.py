@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.deletion import delete_users
+from reviews.models import User
+
+
+class Command(BaseCommand):
+    help = "Delete users and all their data in small chunks, keeping other users' counters in sync."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="+")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per DELETE / transaction.")
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive")
+
+    def handle(self, *args, **options):
+        users = dict(User.objects.filter(username__in=options["usernames"]).values_list("pk", "username"))
+        missing = set(options["usernames"]) - set(users.values())
+        if missing:
+            raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+        if options["interactive"]:
+            answer = input(f"Delete {', '.join(sorted(users.values()))} and all their data? [y/N] ")
+            if answer.lower() != "y":
+                raise CommandError("Cancelled.")
+
+        def progress(label, deleted):
+            self.stdout.write(f"  {label}: {deleted}")
+
+        totals = delete_users(users, chunk_size=options["chunk_size"], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"{totals['users']} user(s) deleted, {sum(totals.values())} rows."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.imports import run_import
+from reviews.models import CsvImport, User
+
+
+class Command(BaseCommand):
+    help = "Import a Letterboxd or IMDb CSV export (ratings, reviews, watchlist or favourites) for one user."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("path")
+        parser.add_argument("--kind", choices=[k for k, _ in CsvImport.KIND_CHOICES], default="ratings")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"Unknown user: {options['username']}")
+        csv_import = CsvImport.objects.create(user=user, kind=options["kind"])
+
+        def progress(csv_import):
+            self.stdout.write(f"  {csv_import.rows_processed} rows, {csv_import.error_count} errors")
+
+        with open(options["path"], encoding="utf-8-sig", newline="") as f:
+            run_import(csv_import, f, chunk_size=options["chunk_size"], progress=progress)
+        for error in csv_import.errors:
+            self.stdout.write(f"  line {error['line']}: {error['title']} {error['error']}")
+        summary = (f"Import #{csv_import.pk} {csv_import.status}: {csv_import.created_count} created, "
+                   f"{csv_import.updated_count} updated, {csv_import.error_count} errors.")
+        if csv_import.status == CsvImport.FAILED:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
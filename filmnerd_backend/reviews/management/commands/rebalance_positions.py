@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Length
+
+from reviews.models import MovieListItem
+from reviews.positions import rebalance
+
+
+class Command(BaseCommand):
+    help = "Shorten list position keys that grew too long (run periodically, e.g. from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-length", type=int, default=12,
+                            help="Rebalance lists having any position key longer than this.")
+        parser.add_argument("--list", type=int, dest="list_id", help="Rebalance only this list.")
+
+    def handle(self, *args, **options):
+        if options["list_id"]:
+            list_ids = [options["list_id"]]
+        else:
+            list_ids = (
+                MovieListItem.objects.annotate(key_length=Length("position"))
+                .filter(key_length__gt=options["max_length"])
+                .order_by("movie_list_id")
+                .values_list("movie_list_id", flat=True)
+                .distinct()
+            )
+        count = 0
+        for list_id in list(list_ids):
+            with transaction.atomic():
+                items = rebalance(list_id)
+            count += 1
+            self.stdout.write(f"list {list_id}: {items} items rebalanced")
+        self.stdout.write(self.style.SUCCESS(f"{count} list(s) rebalanced."))
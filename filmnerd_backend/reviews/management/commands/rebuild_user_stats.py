@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import User
+from reviews.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized UserStats counters from the source tables (drift repair)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Only these users (default: everyone).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["usernames"]:
+            user_ids = list(User.objects.filter(username__in=options["usernames"]).values_list("pk", flat=True))
+        done = rebuild_user_stats(user_ids, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Stats rebuilt for {done} user(s)."))
@@ -0,0 +1,47 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reviews.jobs import WorkerMetrics, default_worker_id, load_tasks, schedule_periodic, work
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs from the database (several workers may run side by side)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=10, help="Jobs claimed per round trip.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is due.")
+        parser.add_argument("--report-every", type=float, default=60.0,
+                            help="Seconds between throughput reports (0: only at exit).")
+        parser.add_argument("--worker-id", default=None)
+
+    def handle(self, *args, **options):
+        load_tasks()
+        schedule_periodic()
+        worker_id = options["worker_id"] or default_worker_id()
+        metrics = WorkerMetrics()
+        stopping = []
+        # SIGTERM/SIGINT: az épp futó batch még befejeződik
+        previous = {
+            sig: signal.signal(sig, lambda *_: stopping.append(True)) for sig in (signal.SIGTERM, signal.SIGINT)
+        }
+
+        self.stdout.write(f"worker {worker_id} started")
+        last_report = time.monotonic()
+        try:
+            while not stopping:
+                close_old_connections()
+                if not work(worker_id, metrics, options["batch"]):
+                    if options["burst"]:
+                        break
+                    time.sleep(options["sleep"])
+                if options["report_every"] and time.monotonic() - last_report >= options["report_every"]:
+                    self.stdout.write(metrics.report())
+                    last_report = time.monotonic()
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        self.stdout.write(self.style.SUCCESS(metrics.report()))
@@ -0,0 +1,163 @@
+import multiprocessing
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+ALIAS = "loadtest"
+PROFILES = {
+    # a gyári backend: rollback journal, deferred BEGIN, 5 s busy timeout
+    "default": {"ENGINE": "django.db.backends.sqlite3"},
+    "tuned": {"ENGINE": "reviews.sqlite"},
+}
+
+
+def _add_alias(database):
+    # a configure_settings tölti ki a hiányzó kulcsokat (ATOMIC_REQUESTS, TIME_ZONE, ...)
+    configured = connections.configure_settings({"default": connections.settings["default"], ALIAS: database})
+    connections.settings[ALIAS] = configured[ALIAS]
+
+
+def worker(database, seed, start_at, seconds, write_ratio, user_ids, movie_ids, results):
+    """
+    Egy processz vegyes terheléssel a határidőig: olvasás (review lista +
+    átlag), írás felváltva a review POST útja (írással kezdő tranzakció) és
+    a follow útja (get_or_create: olvasással kezdő, majd író tranzakció).
+    """
+    import django
+
+    django.setup()
+    from django.db import OperationalError, transaction
+    from django.db.models import Avg, Count
+
+    from reviews.models import Follow, Movie, Review, User, UserStats, Watchlist
+
+    _add_alias(database)
+    rng = random.Random(seed)
+    reviews = Review.objects.db_manager(ALIAS)
+    latencies = {"read": [], "write": []}
+    errors = 0
+    connections[ALIAS].ensure_connection()
+    time.sleep(max(start_at - time.time(), 0))
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        movie_id, user_id = rng.choice(movie_ids), rng.choice(user_ids)
+        kind = "write" if rng.random() < write_ratio else "read"
+        start = time.perf_counter()
+        try:
+            if kind == "read":
+                list(reviews.filter(movie_id=movie_id).select_related("user").order_by("-created_at")[:50])
+                reviews.filter(movie_id=movie_id).aggregate(Avg("rating"), Count("id"))
+            elif rng.random() < 0.5:
+                with transaction.atomic(using=ALIAS):
+                    previous = reviews.previous_rating(user_id=user_id, movie_id=movie_id)
+                    obj, created = reviews.upsert(User(pk=user_id), Movie(pk=movie_id), rng.randint(1, 5), "")
+                    removed, _ = Watchlist.objects.using(ALIAS).filter(user_id=user_id, movie_id=movie_id).delete()
+                    UserStats.objects.db_manager(ALIAS).bump(
+                        user_id, reviews_count=int(created), rating_sum=obj.rating - (previous or 0),
+                        watchlist_count=-removed,
+                    )
+            else:
+                other_id = rng.choice(user_ids)
+                with transaction.atomic(using=ALIAS):
+                    _, created = Follow.objects.using(ALIAS).get_or_create(from_user_id=user_id, to_user_id=other_id)
+                    if created:
+                        UserStats.objects.db_manager(ALIAS).bump(user_id, following_count=1)
+                        UserStats.objects.db_manager(ALIAS).bump(other_id, followers_count=1)
+        except OperationalError:  # database is locked
+            errors += 1
+            continue
+        latencies[kind].append((time.perf_counter() - start) * 1000)
+    connections[ALIAS].close()
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = ("Multi-process mixed read/write load test on a scratch copy of the SQLite database, "
+            "stock Django backend vs. the tuned reviews.sqlite profile.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--write-ratio", type=float, default=0.3)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--movies", type=int, default=50)
+        parser.add_argument("--profiles", default=",".join(PROFILES), help="Comma separated: default,tuned.")
+
+    def handle(self, *args, **options):
+        profiles = options["profiles"].split(",")
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(sorted(unknown))}")
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("The default database must be SQLite (its schema is copied for the test).")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            template = Path(tmp) / "template.sqlite3"
+            user_ids, movie_ids = self.prepare(template, options)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{options['processes']} processes x {options['seconds']:g} s, "
+                f"{options['write_ratio']:.0%} writes, {len(user_ids)} users, {len(movie_ids)} movies"
+            ))
+            for name in profiles:
+                path = Path(tmp) / f"{name}.sqlite3"
+                shutil.copy(template, path)
+                self.report(name, self.run(dict(PROFILES[name], NAME=str(path)), user_ids, movie_ids, options))
+
+    def prepare(self, path, options):
+        """Séma (+ meglévő adat) másolása a default DB-ből, userek és filmek a teszthez."""
+        from reviews.models import Movie, User, UserStats
+
+        connections["default"].ensure_connection()
+        with sqlite3.connect(path) as target:
+            connections["default"].connection.backup(target)
+        target.close()
+        _add_alias(dict(PROFILES["default"], NAME=str(path)))
+        try:
+            users = User.objects.using(ALIAS).bulk_create(
+                [User(username=f"loadtest_{n}", password="!") for n in range(options["users"])]
+            )
+            UserStats.objects.using(ALIAS).bulk_create([UserStats(user=u) for u in users], ignore_conflicts=True)
+            movies = Movie.objects.db_manager(ALIAS).resolve(
+                [f"loadtest_{n}" for n in range(options["movies"])], create=True
+            )
+        finally:
+            connections[ALIAS].close()
+            del connections[ALIAS]
+            del connections.settings[ALIAS]
+        return [u.pk for u in users], [m.pk for m in movies.values()]
+
+    def run(self, database, user_ids, movie_ids, options):
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        start_at = time.time() + 2  # a processzek indulása (django.setup) ne számítson bele
+        processes = [
+            context.Process(target=worker, args=(database, n, start_at, options["seconds"], options["write_ratio"],
+                                                 user_ids, movie_ids, results))
+            for n in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        latencies = {kind: [ms for result, _ in collected for ms in result[kind]] for kind in ("read", "write")}
+        return latencies, sum(errors for _, errors in collected), options["seconds"]
+
+    def report(self, name, result):
+        latencies, errors, seconds = result
+        self.stdout.write(f"  {name}: {errors} lock error(s)")
+        for kind, values in latencies.items():
+            if not values:
+                continue
+            quantiles = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+            self.stdout.write(
+                f"    {kind:<6} {len(values) / seconds:9.1f} ops/s   p50 {quantiles[49]:7.2f} ms   "
+                f"p95 {quantiles[94]:7.2f} ms   p99 {quantiles[98]:7.2f} ms"
+            )
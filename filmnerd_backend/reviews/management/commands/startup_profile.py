@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# friss interpreterben: wsgi betöltés (bemelegítés nélkül), opcionálisan warm_up(), majd két kérés
+PROBE = """
+import io, json, sys, time
+start = time.perf_counter()
+module = __import__(sys.argv[1], fromlist=["application"])
+loaded = time.perf_counter()
+warmup = {}
+if sys.argv[4] == "1":
+    from reviews.warmup import warm_up
+    warmup = warm_up()
+ready = time.perf_counter()
+
+def request():
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": sys.argv[2], "QUERY_STRING": sys.argv[3], "SCRIPT_NAME": "",
+               "SERVER_NAME": "localhost", "SERVER_PORT": "80", "HTTP_HOST": "localhost", "wsgi.input": io.BytesIO(),
+               "wsgi.url_scheme": "http", "wsgi.errors": sys.stderr}
+    status = []
+    t = time.perf_counter()
+    b"".join(module.application(environ, lambda s, headers, exc_info=None: status.append(s)))
+    return (time.perf_counter() - t) * 1000, status[0]
+
+first, status = request()
+second, _ = request()
+print(json.dumps({"setup_ms": (loaded - start) * 1000, "warmup_ms": (ready - loaded) * 1000, "warmup": warmup,
+                  "first_ms": first, "second_ms": second, "status": status}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Cold-start profile: import time per module, and time to first response with and without warm-up."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wsgi", default="filmnerd_backend.wsgi", help="WSGI module to load.")
+        parser.add_argument("--path", default="/api/reviews/", help="Request path for the first-response probe.")
+        parser.add_argument("--query", default="movie_id=603")
+        parser.add_argument("--runs", type=int, default=3, help="Fresh processes per mode (median is reported).")
+        parser.add_argument("--top", type=int, default=20, help="Slowest modules / packages to list.")
+
+    def env(self):
+        # a probe maga hívja a warm_up()-ot, hogy külön mérhető legyen
+        return {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE, "WARMUP_ON_LOAD": "0"}
+
+    def run(self, args):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, *args], cwd=settings.BASE_DIR, env=self.env(),
+                                capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "probe failed")
+        return result, (time.perf_counter() - start) * 1000
+
+    def handle(self, *args, **options):
+        self.import_times(options)
+        self.first_response(options)
+
+    def import_times(self, options):
+        code = f"import {options['wsgi']}; from django.urls import get_resolver; get_resolver().url_patterns"
+        result, _ = self.run(["-X", "importtime", "-c", code])
+        modules, packages = {}, Counter()
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                self_us, cumulative_us, name = int(match[1]), int(match[2]), match[4]
+                modules[name] = (self_us, cumulative_us)
+                packages[name.split(".")[0]] += self_us
+        total = sum(self_us for self_us, _ in modules.values())
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Import time: {len(modules)} modules, {total / 1000:.1f} ms (wsgi + URLconf, no warm-up)"
+        ))
+        self.stdout.write("  by top-level package (self time):")
+        for name, us in packages.most_common(options["top"]):
+            self.stdout.write(f"    {name:<45} {us / 1000:8.1f} ms  {us * 100 / total:5.1f}%")
+        self.stdout.write("  slowest modules (self / cumulative):")
+        slowest = sorted(modules.items(), key=lambda item: -item[1][0])[:options["top"]]
+        for name, (self_us, cumulative_us) in slowest:
+            self.stdout.write(f"    {name:<45} {self_us / 1000:8.1f} ms  {cumulative_us / 1000:8.1f} ms")
+
+    def first_response(self, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Time to first response: GET {options['path']}?{options['query']}, median of {options['runs']} runs"
+        ))
+        for mode, flag in (("cold", "0"), ("warm-up", "1")):
+            runs = []
+            for _ in range(options["runs"]):
+                result, process_ms = self.run(["-c", PROBE, options["wsgi"], options["path"], options["query"], flag])
+                runs.append({**json.loads(result.stdout.strip().splitlines()[-1]), "process_ms": process_ms})
+
+            def median(key):
+                return statistics.median(run[key] for run in runs)
+
+            self.stdout.write(f"  {mode} ({runs[0]['status']}):")
+            self.stdout.write(f"    {'django setup + wsgi import':<40} {median('setup_ms'):8.1f} ms")
+            for step in runs[0]["warmup"]:
+                value = statistics.median(run["warmup"][step] for run in runs)
+                self.stdout.write(f"      warm-up: {step:<31} {value:8.1f} ms")
+            self.stdout.write(f"    {'warm-up total':<40} {median('warmup_ms'):8.1f} ms")
+            self.stdout.write(f"    {'first request':<40} {median('first_ms'):8.1f} ms")
+            self.stdout.write(f"    {'second request':<40} {median('second_ms'):8.1f} ms")
+            self.stdout.write(f"    {'process start -> first response':<40} {median('process_ms'):8.1f} ms")
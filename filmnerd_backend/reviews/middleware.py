@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .routers import choose_replica, read_alias
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaRoutingMiddleware:
+    """
+    GET a reviews view-kra -> replika; írás után REPLICA_PIN_SECONDS-ig az
+    adott kliens (JWT user id, ennek híján IP) a primaryről olvas,
+    hogy lássa a saját friss review-ját.
+
+    A pin a cache-ben van, ezért csak közös cache-sel (Redis) ér el minden
+    workert; REPLICA_ROUTING nélkül (a settings alapból csak REDIS_URL mellett
+    kapcsolja be) minden olvasás a primaryn marad.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, "_read_alias_token", None)
+            if token is not None:
+                read_alias.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and self.enabled():
+            cache.set(self.pin_key(request), True, getattr(settings, "REPLICA_PIN_SECONDS", 5))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ("GET", "HEAD") or view_func.__module__ != "reviews.views" or not self.enabled():
+            return None
+        alias = choose_replica()
+        if alias is None or cache.get(self.pin_key(request)):
+            return None
+        request._read_alias_token = read_alias.set(alias)
+        return None
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, "REPLICA_ROUTING", False)
+
+    @staticmethod
+    def pin_key(request):
+        # a DRF auth csak a view-ban fut, ezért itt magunk nézzük meg a tokent (DB nélkül)
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        if header.startswith("Bearer "):
+            try:
+                return f"replica-pin:user:{AccessToken(header[7:])[jwt_settings.USER_ID_CLAIM]}"
+            except (TokenError, KeyError):
+                pass
+        return f"replica-pin:ip:{request.META.get('REMOTE_ADDR', '')}"
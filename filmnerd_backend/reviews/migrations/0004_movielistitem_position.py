@@ -0,0 +1,40 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:07
+
+from django.db import migrations, models
+
+from reviews.positions import spaced_keys
+
+
+def backfill_positions(apps, schema_editor):
+    # a meglévő elemek sorrendje marad (added_at), egyenletesen elosztott kulcsokkal
+    MovieListItem = apps.get_model("reviews", "MovieListItem")
+    list_ids = MovieListItem.objects.values_list("movie_list_id", flat=True).order_by("movie_list_id").distinct()
+    for list_id in list_ids.iterator():
+        items = list(MovieListItem.objects.filter(movie_list_id=list_id).order_by("added_at", "id"))
+        for item, key in zip(items, spaced_keys(len(items))):
+            item.position = key
+        MovieListItem.objects.bulk_update(items, ["position"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_review_created_at_db_default'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='movielistitem',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddField(
+            model_name='movielistitem',
+            name='position',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.RunPython(backfill_positions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='movielistitem',
+            index=models.Index(fields=['movie_list', 'position'], name='listitem_list_position_idx'),
+        ),
+    ]
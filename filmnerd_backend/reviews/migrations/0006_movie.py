@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_userstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Movie',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('external_id', models.CharField(max_length=20, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='favourite',
+            name='movie_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='reviews.movie'),
+        ),
+        migrations.AddField(
+            model_name='movielistitem',
+            name='movie_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='reviews.movie'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='movie_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='reviews.movie'),
+        ),
+        migrations.AddField(
+            model_name='watchlist',
+            name='movie_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='reviews.movie'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 5000
+MODELS = ["Review", "Favourite", "MovieListItem", "Watchlist"]
+
+
+def backfill_movie_refs(apps, schema_editor):
+    """
+    movie_id (varchar) -> movie_ref (Movie FK), pk-tartományonként.
+    Nem atomikus migráció: minden batch külön, rövid tranzakció, így élő
+    táblán sem tart sokáig zárat. Újrafuttatható (csak a NULL sorokat nézi).
+    """
+    Movie = apps.get_model("reviews", "Movie")
+    db = schema_editor.connection.alias
+    for name in MODELS:
+        model = apps.get_model("reviews", name)
+        last_pk = 0
+        while True:
+            rows = list(
+                model.objects.using(db)
+                .filter(pk__gt=last_pk, movie_ref__isnull=True)
+                .order_by("pk")
+                .values_list("pk", "movie_id")[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            Movie.objects.using(db).bulk_create(
+                [Movie(external_id=movie_id) for movie_id in {movie_id for _, movie_id in rows}],
+                ignore_conflicts=True,
+            )
+            model.objects.using(db).filter(pk__gt=last_pk, pk__lte=rows[-1][0], movie_ref__isnull=True).update(
+                movie_ref=Subquery(Movie.objects.filter(external_id=OuterRef("movie_id")).values("pk")[:1])
+            )
+            last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('reviews', '0006_movie'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_movie_refs, migrations.RunPython.noop),
+    ]
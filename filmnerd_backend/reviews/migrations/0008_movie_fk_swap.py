@@ -0,0 +1,108 @@
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def final_sweep(apps, schema_editor):
+    # a 0007 óta (régi kóddal) beszúrt sorok is kapjanak movie_ref-et
+    import_module("reviews.migrations.0007_backfill_movie_refs").backfill_movie_refs(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_backfill_movie_refs'),
+    ]
+
+    operations = [
+        migrations.RunPython(final_sweep, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='review',
+            name='unique_review_per_user_and_movie',
+        ),
+        migrations.RemoveConstraint(
+            model_name='favourite',
+            name='unique_favourite_user_movie',
+        ),
+        migrations.RemoveConstraint(
+            model_name='movielistitem',
+            name='unique_movie_in_list',
+        ),
+        migrations.RemoveConstraint(
+            model_name='watchlist',
+            name='unique_watchlist_user_movie',
+        ),
+        migrations.RemoveField(
+            model_name='review',
+            name='movie_id',
+        ),
+        migrations.RemoveField(
+            model_name='favourite',
+            name='movie_id',
+        ),
+        migrations.RemoveField(
+            model_name='movielistitem',
+            name='movie_id',
+        ),
+        migrations.RemoveField(
+            model_name='watchlist',
+            name='movie_id',
+        ),
+        migrations.RenameField(
+            model_name='review',
+            old_name='movie_ref',
+            new_name='movie',
+        ),
+        migrations.RenameField(
+            model_name='favourite',
+            old_name='movie_ref',
+            new_name='movie',
+        ),
+        migrations.RenameField(
+            model_name='movielistitem',
+            old_name='movie_ref',
+            new_name='movie',
+        ),
+        migrations.RenameField(
+            model_name='watchlist',
+            old_name='movie_ref',
+            new_name='movie',
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reviews', to='reviews.movie'),
+        ),
+        migrations.AlterField(
+            model_name='favourite',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='favourites', to='reviews.movie'),
+        ),
+        migrations.AlterField(
+            model_name='movielistitem',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='list_items', to='reviews.movie'),
+        ),
+        migrations.AlterField(
+            model_name='watchlist',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='watchlist_entries', to='reviews.movie'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('user', 'movie'), name='unique_review_per_user_and_movie'),
+        ),
+        migrations.AddConstraint(
+            model_name='favourite',
+            constraint=models.UniqueConstraint(fields=('user', 'movie'), name='unique_favourite_user_movie'),
+        ),
+        migrations.AddConstraint(
+            model_name='movielistitem',
+            constraint=models.UniqueConstraint(fields=('movie_list', 'movie'), name='unique_movie_in_list'),
+        ),
+        migrations.AddConstraint(
+            model_name='watchlist',
+            constraint=models.UniqueConstraint(fields=('user', 'movie'), name='unique_watchlist_user_movie'),
+        ),
+    ]
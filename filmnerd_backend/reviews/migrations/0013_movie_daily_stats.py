@@ -0,0 +1,84 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_profilereport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reviews_added', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.FloatField(default=0)),
+                ('favourites_added', models.PositiveIntegerField(default=0)),
+                ('watchlist_added', models.PositiveIntegerField(default=0)),
+                ('list_adds', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        # a meglévő sorok NULL-t kapnak (nem tudjuk, mikor kerültek be), csak az újak időbélyeget
+        migrations.AddField(
+            model_name='favourite',
+            name='created_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='favourite',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, null=True),
+        ),
+        # a meglévő sorok NULL-t kapnak (nem tudjuk, mikor kerültek be), csak az újak időbélyeget
+        migrations.AddField(
+            model_name='watchlist',
+            name='created_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='watchlist',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='favourite',
+            index=models.Index(fields=['created_at'], name='favourite_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movielistitem',
+            index=models.Index(fields=['added_at'], name='listitem_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['created_at'], name='watchlist_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='moviedailystats',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='reviews.movie'),
+        ),
+        migrations.AddConstraint(
+            model_name='moviedailystats',
+            constraint=models.UniqueConstraint(fields=('movie', 'day'), name='unique_movie_daily_stats'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_movie_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YearInReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('data', models.JSONField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='years_in_review', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-year'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='yearinreview',
+            constraint=models.UniqueConstraint(fields=('user', 'year'), name='unique_year_in_review'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:50
+
+from django.db import migrations, models
+
+
+def backfill_queued_keys(apps, schema_editor):
+    # kulcsonként a legrégebbi várakozó job kapja; MySQL-en a részleges index nélkül lehettek duplikátumok
+    Job = apps.get_model("reviews", "Job")
+    seen = set()
+    queued = Job.objects.filter(status="queued", dedupe_key__isnull=False).order_by("id")
+    for job_id, key in queued.values_list("id", "dedupe_key").iterator():
+        if key not in seen:
+            seen.add(key)
+            Job.objects.filter(pk=job_id).update(queued_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0014_yearinreview'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='job',
+            name='unique_queued_job_dedupe_key',
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='queued_key',
+            field=models.CharField(blank=True, editable=False, max_length=200, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_queued_keys, migrations.RunPython.noop),
+    ]
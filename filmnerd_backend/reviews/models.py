@@ -1,7 +1,12 @@
 from django.db import models
+from django.db.models import Avg, Count, F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest, Now
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from .positions import key_between
 
 
 class User(AbstractUser):
@@ -12,27 +17,112 @@ class User(AbstractUser):
         return self.username
 
 
+class MovieQuerySet(models.QuerySet):
+    def resolve(self, external_ids, create=False):
+        """
+        {external_id: Movie} egy SELECT-tel; create=True esetén a hiányzókat
+        INSERT ... ON CONFLICT DO NOTHING-gal létrehozza (+1 INSERT, +1 SELECT).
+        """
+        external_ids = set(external_ids)
+        movies = {m.external_id: m for m in self.filter(external_id__in=external_ids)}
+        missing = external_ids - movies.keys()
+        if create and missing:
+            self.bulk_create([Movie(external_id=e) for e in missing], ignore_conflicts=True)
+            movies.update((m.external_id, m) for m in self.filter(external_id__in=missing))
+        return movies
+
+    def get_for(self, external_id):
+        """Egy film (létrehozva, ha még nincs) – írási útvonalakhoz."""
+        return self.resolve([external_id], create=True)[external_id]
+
+
+class Movie(models.Model):
+    """
+    Külső (TMDB) movie id -> kompakt egész kulcs. A Review/Favourite/
+    MovieListItem/Watchlist ide mutat; az API továbbra is a külső stringet
+    fogadja és adja vissza (`movie_id`).
+    """
+    id = models.AutoField(primary_key=True)
+    external_id = models.CharField(max_length=20, unique=True)
+
+    objects = MovieQuerySet.as_manager()
+
+    def __str__(self):
+        return self.external_id
+
+
+class ReviewQuerySet(models.QuerySet):
+    def upsert(self, user, movie, rating, text):
+        """
+        INSERT ... ON CONFLICT (user, movie) DO UPDATE egyetlen utasításban.
+
+        A created_at-et mi adjuk meg és a DB visszaadja (RETURNING); ha a
+        visszakapott érték a miénk, a sor most jött létre, különben frissült.
+        Returns (obj, created).
+        """
+        now = timezone.now()
+        obj = Review(
+            user=user,
+            movie=movie,
+            rating=rating,
+            text=text,
+            created_at=now,
+        )
+        self.bulk_create(
+            [obj],
+            update_conflicts=True,
+            unique_fields=["user", "movie"],
+            update_fields=["rating", "text", "updated_at"],
+        )
+        if obj.pk is None:
+            # MySQL: nincs RETURNING, egy plusz lekérdezés kell
+            obj.pk, obj.created_at = self.filter(user=user, movie=movie).values_list(
+                "pk", "created_at"
+            ).get()
+        return obj, obj.created_at == now
+
+    def previous_rating(self, **lookup):
+        """
+        A review jelenlegi ratingje sorzárral (a UserStats delta-hoz), None, ha nincs ilyen sor.
+        Tranzakción belül hívandó; a zár a commitig tart, így párhuzamos írás nem csúsztatja el a deltát.
+        """
+        return self.select_for_update().filter(**lookup).values_list("rating", flat=True).first()
+
+    def summary(self, movie_id):
+        agg = self.filter(movie__external_id=movie_id).aggregate(count=Count("id"), avg=Avg("rating"))
+        return {
+            "movie_id": movie_id,              # ← ne erőltesd int-re
+            "count": int(agg["count"] or 0),
+            "avg": round((agg["avg"] or 0), 1),
+        }
+
+
 class Review(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="reviews",
     )
-    movie_id = models.CharField(max_length=20, db_index=True)
+    movie = models.ForeignKey(Movie, on_delete=models.PROTECT, related_name="reviews")
     rating = models.FloatField(
         default=0,
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
     text = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # db_default miatt a created_at is visszajön INSERT ... RETURNING-gel (lásd upsert)
+    created_at = models.DateTimeField(default=timezone.now, db_default=Now(), editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReviewQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
-                fields=["user", "movie_id"], name="unique_review_per_user_and_movie"
+                fields=["user", "movie"], name="unique_review_per_user_and_movie"
             )
         ]
+        # a napi összesítők időablakai (reviews.rollups)
+        indexes = [models.Index(fields=["created_at"], name="review_created_idx")]
         ordering = ["-created_at"]
 
     def __str__(self):
@@ -41,12 +131,15 @@ class Review(models.Model):
 
 class Favourite(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="favourites")
-    movie_id = models.CharField(max_length=20, db_index=True)
+    movie = models.ForeignKey(Movie, on_delete=models.PROTECT, related_name="favourites")
+    # a régi soroknál NULL (nem tudjuk, mikor kerültek be); a napi összesítők kihagyják őket
+    created_at = models.DateTimeField(default=timezone.now, null=True, editable=False)
 
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=["user", "movie_id"], name="unique_favourite_user_movie")
+            models.UniqueConstraint(fields=["user", "movie"], name="unique_favourite_user_movie")
         ]
+        indexes = [models.Index(fields=["created_at"], name="favourite_created_idx")]
         ordering = ["id"]
 
     def __str__(self):
@@ -69,16 +162,86 @@ class MovieList(models.Model):
         return f"MovieList(user={self.user.username}, name={self.name})"
 
 
+class MovieListItemQuerySet(models.QuerySet):
+    def tails(self, list_ids):
+        """{list_id: utolsó position} – az új elemek ez után kerülnek."""
+        return dict(
+            self.filter(movie_list_id__in=list_ids)
+            .values_list("movie_list_id")
+            .annotate(tail=Max("position"))
+        )
+
+    def add_many(self, list_ids, movie_ids, tails=None):
+        """
+        Minden (list_id, movie_id) párt a lista végére szúr, ami még nincs meg.
+        Egy SELECT a meglévő párokra + egy INSERT ... ON CONFLICT DO NOTHING;
+        a közben párhuzamosan beszúrt duplikátumok sem buktatják el a tranzakciót.
+        Az ignore_conflicts nem adja vissza, mi került be, ezért egy második SELECT
+        a beszúrt párok (position, added_at) értékét veti össze a sajátunkkal: ami
+        eltér, azt egy párhuzamos kérés szúrta be, az duplikátum.
+        `tails`-t átadhatja a hívó, ha már lekérdezte (pl. az ownership lookupban).
+        movie_ids külső id-k; Returns (added, duplicates) – (list_id, movie_id) párok listái.
+        """
+        if tails is None:
+            tails = self.tails(list_ids)
+        movies = Movie.objects.resolve(movie_ids, create=True)
+        wanted = [(list_id, movie_id) for list_id in list_ids for movie_id in movie_ids]
+        existing = set(
+            self.filter(movie_list_id__in=list_ids, movie__in=movies.values())
+            .values_list("movie_list_id", "movie__external_id")
+        )
+        duplicates = [pair for pair in wanted if pair in existing]
+        objs = {}
+        for list_id, movie_id in wanted:
+            if (list_id, movie_id) in existing:
+                continue
+            tails[list_id] = key_between(tails.get(list_id), None)
+            objs[list_id, movie_id] = MovieListItem(
+                movie_list_id=list_id, movie=movies[movie_id], position=tails[list_id]
+            )
+        if not objs:
+            return [], duplicates
+        self.bulk_create(objs.values(), ignore_conflicts=True)
+        stored = {
+            (list_id, movie_id): (position, added_at)
+            for list_id, movie_id, position, added_at in self.filter(
+                movie_list_id__in=list_ids, movie__in=[obj.movie for obj in objs.values()]
+            ).values_list("movie_list_id", "movie__external_id", "position", "added_at")
+        }
+        added = []
+        for pair, obj in objs.items():
+            if stored.get(pair) == (obj.position, obj.added_at):
+                added.append(pair)
+            else:
+                duplicates.append(pair)
+        return added, duplicates
+
+
 class MovieListItem(models.Model):
     movie_list = models.ForeignKey(MovieList, on_delete=models.CASCADE, related_name="items")
-    movie_id = models.CharField(max_length=20, db_index=True)
+    movie = models.ForeignKey(Movie, on_delete=models.PROTECT, related_name="list_items")
+    # frakcionális kulcs (lásd positions.py): mozgatáskor csak az adott sor változik
+    position = models.CharField(max_length=64, default="")
     added_at = models.DateTimeField(auto_now_add=True)
 
+    objects = MovieListItemQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        if not self.position:
+            # pl. adminból position nélkül: a lista végére kerül
+            tail = MovieListItem.objects.tails([self.movie_list_id]).get(self.movie_list_id)
+            self.position = key_between(tail, None)
+        super().save(*args, **kwargs)
+
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=["movie_list", "movie_id"], name="unique_movie_in_list")
+            models.UniqueConstraint(fields=["movie_list", "movie"], name="unique_movie_in_list")
+        ]
+        indexes = [
+            models.Index(fields=["movie_list", "position"], name="listitem_list_position_idx"),
+            models.Index(fields=["added_at"], name="listitem_added_idx"),
         ]
-        ordering = ["added_at"]
+        ordering = ["position", "id"]
 
     def __str__(self):
         return f"MovieListItem(list={self.movie_list_id}, movie={self.movie_id})"
@@ -109,13 +272,255 @@ class Follow(models.Model):
 
 class Watchlist(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="watchlist")
-    movie_id = models.CharField(max_length=20, db_index=True)
+    movie = models.ForeignKey(Movie, on_delete=models.PROTECT, related_name="watchlist_entries")
+    # mint a Favourite-nál: a régi soroknál NULL
+    created_at = models.DateTimeField(default=timezone.now, null=True, editable=False)
 
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=["user", "movie_id"], name="unique_watchlist_user_movie")
+            models.UniqueConstraint(fields=["user", "movie"], name="unique_watchlist_user_movie")
         ]
+        indexes = [models.Index(fields=["created_at"], name="watchlist_created_idx")]
         ordering = ["id"]
 
     def __str__(self):
         return f"Watchlist(user={self.user_id}, movie={self.movie_id})"
+
+
+class FollowSuggestion(models.Model):
+    """
+    Előre kiszámolt "people you may know" sorok (reviews.suggestions, periodikus job):
+    userenként a legjobb N jelölt, a közös ismerősök száma és az ízlés-egyezés alapján.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="follow_suggestions")
+    suggested = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    # hány általam követett user követi
+    mutual_count = models.PositiveIntegerField()
+    taste = models.FloatField(default=0)
+    score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "suggested"], name="unique_follow_suggestion")
+        ]
+        indexes = [models.Index(fields=["user", "-score"], name="suggestion_user_score_idx")]
+        ordering = ["-score"]
+
+    def __str__(self):
+        return f"FollowSuggestion({self.user_id} -> {self.suggested_id}, {self.score:.2f})"
+
+
+class MovieDailyStats(models.Model):
+    """
+    Filmenkénti napi összesítő az idősoros grafikonokhoz (reviews.rollups,
+    periodikus job): aznap hozzáadott review-k és a ratingjük összege,
+    kedvencek, watchlist és lista bejegyzések, a napon létrehozott és még meglévő
+    forrássorokból. Egy nap minden újraszámoláskor a forrástáblák aktuális
+    állapotát kapja: a build a watermark előtti LOOKBACK-től számol újra, a
+    történeti dátumú importok napjait a `rollups.refresh` frissíti. Egy régebbi
+    napot érintő törlés vagy átértékelés a következő `--rebuild`-ig nem látszik.
+    """
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="daily_stats")
+    day = models.DateField()
+    reviews_added = models.PositiveIntegerField(default=0)
+    rating_sum = models.FloatField(default=0)
+    favourites_added = models.PositiveIntegerField(default=0)
+    watchlist_added = models.PositiveIntegerField(default=0)
+    list_adds = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["movie", "day"], name="unique_movie_daily_stats")
+        ]
+        ordering = ["day"]
+
+    def __str__(self):
+        return f"MovieDailyStats(movie={self.movie_id}, {self.day})"
+
+
+class RollupWatermark(models.Model):
+    """Meddig (kizárólag) dolgozta fel egy összesítő a forrástáblákat; a következő futás innen folytatja."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"RollupWatermark({self.name}: {self.value})"
+
+
+class YearInReview(models.Model):
+    """
+    Egy user éves összefoglalója ("wrapped") kész JSON-ként (reviews.wrapped,
+    batch job user id tartományonként); az /api/users/<username>/wrapped/<year>/
+    egyetlen sorként olvassa.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="years_in_review")
+    year = models.PositiveSmallIntegerField()
+    data = models.JSONField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "year"], name="unique_year_in_review")
+        ]
+        ordering = ["-year"]
+
+    def __str__(self):
+        return f"YearInReview(user={self.user_id}, {self.year})"
+
+
+class UserStatsQuerySet(models.QuerySet):
+    def bump(self, user_id, **deltas):
+        """
+        Számlálók atomi növelése/csökkentése: UPDATE ... SET x = x + d.
+        Ha a usernek még nincs sora (régi user), létrehozzuk. Nullá alá nem megy;
+        az esetleges driftet a rebuild_user_stats javítja.
+        """
+        deltas = {field: d for field, d in deltas.items() if d}
+        if not deltas:
+            return
+        updates = {
+            field: F(field) + d if d > 0 else Greatest(F(field) + d, 0)
+            for field, d in deltas.items()
+        }
+        if not self.filter(user_id=user_id).update(**updates):
+            self.get_or_create(user_id=user_id)
+            self.filter(user_id=user_id).update(**updates)
+
+    def recount_reviews(self, user_id):
+        """
+        reviews_count és rating_sum újraszámolása egy UPDATE-ben (korrelált subquery).
+        Az írási útvonalak delta-t használnak (bump); ez a javításhoz és arra az
+        esetre marad, amikor a régi rating nem ismert.
+        """
+        reviews = Review.objects.filter(user_id=OuterRef("user_id")).order_by().values("user_id")
+        updates = {
+            "reviews_count": Coalesce(Subquery(reviews.annotate(c=Count("id")).values("c")), 0),
+            "rating_sum": Coalesce(Subquery(reviews.annotate(s=Sum("rating")).values("s")), 0.0),
+        }
+        if not self.filter(user_id=user_id).update(**updates):
+            self.get_or_create(user_id=user_id)
+            self.filter(user_id=user_id).update(**updates)
+
+
+class UserStats(models.Model):
+    """
+    Denormalizált számlálók a publikus profilhoz; a views.py írási útvonalai
+    tartják karban, eltérés esetén: manage.py rebuild_user_stats.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    reviews_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.FloatField(default=0)
+    favourites_count = models.PositiveIntegerField(default=0)
+    watchlist_count = models.PositiveIntegerField(default=0)
+    lists_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    objects = UserStatsQuerySet.as_manager()
+
+    def __str__(self):
+        return f"UserStats(user={self.user_id}, reviews={self.reviews_count})"
+
+
+class Job(models.Model):
+    """
+    Háttérfeladat az adatbázisban tárolt sorban: `reviews.jobs.enqueue()` teszi
+    be, a `manage.py runworker` futtatja. Sikeres futás után a sor törlődik,
+    a véglegesen hibás (FAILED) sorok megmaradnak az adminban.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (FAILED, "Failed")]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # várakozó (QUEUED) jobok közt egyedi; futás közben már jöhet új ugyanazzal a kulccsal
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    # QUEUED alatt = dedupe_key, egyébként NULL: sima unique, minden backenden érvényes (lásd jobs.py)
+    queued_key = models.CharField(max_length=200, null=True, blank=True, unique=True, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"], name="job_status_run_at_idx")]
+        ordering = ["run_at", "id"]
+
+    def __str__(self):
+        return f"Job({self.task}, {self.status})"
+
+
+class CsvImport(models.Model):
+    """
+    Egy feltöltött Letterboxd/IMDb CSV export feldolgozása (reviews.imports).
+    A háttérjob darabonként frissíti a számlálókat; a kliens ezt pollozza.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+    KIND_CHOICES = [
+        ("ratings", "Ratings"),
+        ("reviews", "Reviews"),
+        ("watchlist", "Watchlist"),
+        ("favourites", "Favourites"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="csv_imports")
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    source = models.CharField(max_length=20, blank=True)
+    # a feltöltött fájl neve a default storage-ban (feldolgozás után törlődik)
+    file_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    rows_processed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    # [{"line": n, "title": ..., "error": ...}], az első MAX_ERRORS darab
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+
+    def __str__(self):
+        return f"CsvImport(user={self.user_id}, {self.kind}, {self.status})"
+
+
+class ProfileReport(models.Model):
+    """
+    Egy staff által kért, profilozott kérés eredménye (reviews.profiling):
+    mintavételezett stackek "collapsed" formában (flamegraph.pl / speedscope)
+    és az SQL napló időkkel és a hívó kódsorral. Az adminból letölthető.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="profile_reports")
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    cpu_ms = models.FloatField()
+    sql_count = models.PositiveIntegerField()
+    sql_ms = models.FloatField()
+    samples = models.PositiveIntegerField()
+    # "frame;frame;frame count" soronként
+    collapsed = models.TextField(blank=True)
+    # [{"alias", "sql", "ms", "many", "origin": ["reviews/views.py:123 in get", ...]}]
+    sql_log = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-id"]
+
+    def __str__(self):
+        return f"ProfileReport({self.method} {self.path}, {self.duration_ms:.0f} ms)"
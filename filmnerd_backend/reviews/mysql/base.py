@@ -0,0 +1,11 @@
+"""
+MySQL backend opcionális poollal: ENGINE = "reviews.mysql", OPTIONS = {"pool": {...}}.
+A mysqlclient-nek nincs saját poolja, ez a reviews/dbpool.py shimjét használja.
+"""
+from django.db.backends.mysql import base
+
+from ..dbpool import PooledDatabaseMixin
+
+
+class DatabaseWrapper(PooledDatabaseMixin, base.DatabaseWrapper):
+    pass
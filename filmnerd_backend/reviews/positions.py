@@ -0,0 +1,89 @@
+"""
+Fractional (lexicographic) position keys for ranked lists.
+
+A key is a base-36 string read as a fraction 0.k1k2k3..., so string order is
+number order and there is always a key between two others. Moving an item
+only rewrites that one row; keys grow slowly and `rebalance` (run by the
+`rebalance_positions` command) shortens them again.
+
+Appending steps the tail by one unit at its own width; only an all-'z' tail
+doubles the width. n appends therefore need O(log n) digits, not O(n).
+
+The empty key is 0 itself: nothing sorts before it, so a list holding one
+(e.g. a row saved with the old model default) has to be rebalanced before
+anything can be placed in front of it.
+"""
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+# MovieListItem.position max_length
+MAX_KEY_LENGTH = 64
+
+
+def _midpoint(a, b):
+    # a < b, egyik sem végződik '0'-ra; b=None jelentése 1
+    if b is not None:
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(a, b):
+    """Key strictly between a and b; None means the start / end of the list."""
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"{a!r} >= {b!r}")
+    if b == "":
+        raise ValueError("no key sorts before ''")
+    if b is None and a:
+        return _after(a)
+    return _midpoint(a or "", b)
+
+
+def _digits(value, width):
+    digits = []
+    for _ in range(width):
+        value, d = divmod(value, BASE)
+        digits.append(DIGITS[d])
+    return "".join(reversed(digits))
+
+
+def _after(a):
+    # hozzáfűzés a végére: +1 a kulcs saját szélességén (a '0'-ra végződőt átlépve);
+    # a csupa 'z' kulcs után dupla szélesség, így a következő 36**len(a) hozzáfűzés nem hosszabbít
+    width = len(a)
+    if a == "z" * width:
+        return a + "0" * (width - 1) + "1"
+    value = int(a, BASE) + 1
+    if value % BASE == 0:
+        value += 1
+    return _digits(value, width)
+
+
+def spaced_keys(n):
+    """n evenly spaced keys of equal width, leaving room around each."""
+    width = 1
+    while BASE ** width < (n + 1) * BASE:
+        width += 1
+    keys = []
+    for i in range(1, n + 1):
+        keys.append(_digits(i * BASE ** width // (n + 1), width).rstrip("0"))
+    return keys
+
+
+def rebalance(movie_list_id):
+    """Rewrite every position in one list with short, evenly spaced keys."""
+    from .models import MovieListItem
+
+    items = list(MovieListItem.objects.filter(movie_list_id=movie_list_id).only("id", "position"))
+    for item, key in zip(items, spaced_keys(len(items))):
+        item.position = key
+    MovieListItem.objects.bulk_update(items, ["position"], batch_size=500)
+    return len(items)
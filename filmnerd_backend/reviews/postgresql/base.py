@@ -0,0 +1,12 @@
+"""
+PostgreSQL backend opcionális poollal: ENGINE = "reviews.postgresql",
+OPTIONS = {"pool": {...}}. A requirements psycopg2-t rögzít, ennek nincs
+poolja: ez is a reviews/dbpool.py shimjét használja.
+"""
+from django.db.backends.postgresql import base
+
+from ..dbpool import PooledDatabaseMixin
+
+
+class DatabaseWrapper(PooledDatabaseMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,221 @@
+"""
+Kérésenkénti profilozás élesben, staff usereknek.
+
+Bekapcsolás: `X-Profile: 1` fejléc vagy `?profile=1`, staff (és aktív) user
+JWT tokenjével vagy admin sessionnel; másnak a kapcsoló hatástalan. A kérés
+alatt:
+
+- egy háttérszál PROFILING_INTERVAL másodpercenként mintát vesz a kérést
+  kiszolgáló szál stackjéből (sys._current_frames) -> "collapsed" stackek,
+  amit a flamegraph.pl és a speedscope közvetlenül megnyit;
+- minden adatbázis-kapcsolaton execute_wrapper méri az SQL-eket, a
+  projekten belüli hívó kódsorokkal együtt.
+
+Az eredmény egy ProfileReport sor (adminból letölthető); a válasz
+`X-Profile-Id` fejlécben kapja az azonosítóját. Terhelés-erősítés ellen:
+processzenként egyszerre egy (`X-Profile: busy`), useronként
+PROFILING_MAX_PER_HOUR profil óránként (`X-Profile: rate-limited`); e fölött
+a kérés profil nélkül fut. A keretből csak a ténylegesen elkészült profil
+fogy: a foglalt zárnál elutasított kérés nem.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import ProfileReport, User
+
+DEFAULT_INTERVAL = 0.001
+DEFAULT_MAX_PER_HOUR = 10
+DEFAULT_KEEP = 500
+MAX_SQL = 2000
+MAX_SQL_LENGTH = 2000
+ORIGIN_DEPTH = 3
+
+PROJECT_DIR = str(Path(__file__).resolve().parent.parent)
+
+_busy = threading.Lock()
+
+
+def _is_project_file(filename):
+    return filename.startswith(PROJECT_DIR) and "site-packages" not in filename
+
+
+def _short(filename):
+    return filename[len(PROJECT_DIR) + 1:] if filename.startswith(PROJECT_DIR) else filename
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    # a ";" a collapsed formátum elválasztója
+    return f"{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class Sampler:
+    """Mintavételező profiler egy másik szál stackjére; `stacks`: Counter(collapsed stack -> minták)."""
+
+    def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class QueryLog:
+    """execute_wrapper: SQL, idő (ms) és a projekten belüli legközelebbi hívók."""
+
+    def __init__(self):
+        self.queries = []
+        self.total_ms = 0.0
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.total_ms += ms
+            self.count += 1
+            if len(self.queries) < MAX_SQL:
+                self.queries.append({
+                    "alias": context["connection"].alias,
+                    "sql": sql[:MAX_SQL_LENGTH],
+                    "ms": round(ms, 3),
+                    "many": many,
+                    "origin": self._origin(),
+                })
+
+    @staticmethod
+    def _origin():
+        origin, frame = [], sys._getframe(2)
+        while frame is not None and len(origin) < ORIGIN_DEPTH:
+            code = frame.f_code
+            if _is_project_file(code.co_filename) and code.co_filename != __file__:
+                origin.append(f"{_short(code.co_filename)}:{frame.f_lineno} in {code.co_name}")
+            frame = frame.f_back
+        return origin
+
+
+def requested(request):
+    return request.META.get("HTTP_X_PROFILE") == "1" or request.GET.get("profile") == "1"
+
+
+def staff_user_id(request):
+    """A kérő staff user id-ja (JWT vagy admin session), különben None. Csak kapcsolónál fut (1 lekérdezés)."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.pk if user.is_staff and user.is_active else None
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if not header.startswith("Bearer "):
+        return None
+    try:
+        user_id = AccessToken(header[7:])[jwt_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+    return user_id if User.objects.filter(pk=user_id, is_staff=True, is_active=True).exists() else None
+
+
+def allow(user_id):
+    """Óránkénti keret useronként (cache számláló, ablak az első profiltól)."""
+    key = f"profile-rate:{user_id}"
+    cache.add(key, 0, 3600)
+    try:
+        used = cache.incr(key)
+    except ValueError:  # közben lejárt
+        cache.set(key, 1, 3600)
+        used = 1
+    return used <= getattr(settings, "PROFILING_MAX_PER_HOUR", DEFAULT_MAX_PER_HOUR)
+
+
+def profile(request, get_response, user_id):
+    """A kérés kiszolgálása profilozva; a ProfileReport a válasz után íródik."""
+    log = QueryLog()
+    interval = getattr(settings, "PROFILING_INTERVAL", DEFAULT_INTERVAL)
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        sampler = stack.enter_context(Sampler(threading.get_ident(), interval))
+        response = get_response(request)
+        # streaming válasz törzse a profil után készül; a mérés a view-ig tart
+    duration, cpu = time.perf_counter() - start, time.thread_time() - cpu_start
+
+    report = ProfileReport.objects.create(
+        user_id=user_id,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        status_code=response.status_code,
+        duration_ms=round(duration * 1000, 3),
+        cpu_ms=round(cpu * 1000, 3),
+        sql_count=log.count,
+        sql_ms=round(log.total_ms, 3),
+        samples=sum(sampler.stacks.values()),
+        collapsed=sampler.collapsed(),
+        sql_log=log.queries,
+    )
+    keep = getattr(settings, "PROFILING_KEEP", DEFAULT_KEEP)
+    oldest_kept = ProfileReport.objects.order_by("-id").values_list("id", flat=True)[keep - 1:keep].first()
+    if oldest_kept is not None:
+        ProfileReport.objects.filter(pk__lt=oldest_kept).delete()
+    response["X-Profile-Id"] = str(report.pk)
+    return response
+
+
+class ProfilingMiddleware:
+    """Lásd a modul docstringjét; kapcsoló nélkül egyetlen dict lookup kérésenként."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not requested(request):
+            return self.get_response(request)
+        user_id = staff_user_id(request)
+        if user_id is None:
+            return self.get_response(request)
+        # előbb a zár: a keret csak akkor fogy, ha a profil tényleg lefut
+        if not _busy.acquire(blocking=False):
+            return self.unprofiled(request, "busy")
+        try:
+            if not allow(user_id):
+                return self.unprofiled(request, "rate-limited")
+            return profile(request, self.get_response, user_id)
+        finally:
+            _busy.release()
+
+    def unprofiled(self, request, reason):
+        response = self.get_response(request)
+        response["X-Profile"] = reason
+        return response
@@ -0,0 +1,94 @@
+"""
+Válasz cache a publikus /api/users/<username>/... view-khoz, userenkénti
+generációval.
+
+A kulcs a user generációját is tartalmazza: `public:<gen>:<url hash>`. Ha a
+user review-i, kedvencei, watchlistje, listái vagy követései (vagy a
+profilján látszó számlálói) változnak, az író út commitkor egyetlen
+`incr`-rel lépteti a generációt (`invalidate`); a régi kulcsokat senki nem
+kérdezi többé, a TTL takarítja el őket. Kulcs szkennelés nincs.
+
+Találatnál a view két cache olvasással (generáció, válasz) és ORM nélkül
+válaszol; a tárolt adat a serializer kimenete, csak a renderelés fut.
+
+A generáció kulcsa a kisbetűs username (az URL-ben csak ez van, és így
+nem kell username -> id feloldás). Hiányzó (kilakoltatott) generáció
+helyett időbélyeg alapú új indul, így egy régi generáció válasza nem
+éledhet fel. Az olvasó a generációt a lekérdezés előtt veszi fel: ha közben
+írás commitol, a friss adatot a régi generáció alá teszi, ahol már nem
+olvassák.
+
+Amit nem az író utak léptetnek (admin szerkesztés, stats rebuild), azt a
+PUBLIC_CACHE_SECONDS TTL korlátozza; 0 = kikapcsolva.
+
+A generáció csak akkor ér el minden workert, ha a cache közös (Redis): a
+LocMem processzenként külön van, egy másik worker írása után a többi a
+TTL-ig a régi választ adná. Ezért a settings alapból csak REDIS_URL mellett
+kapcsolja be.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+DEFAULT_SECONDS = 0
+
+
+def _generation_key(username):
+    return f"public-gen:{username.lower()}"
+
+
+def generation(username):
+    key = _generation_key(username)
+    gen = cache.get(key)
+    if gen is None:
+        gen = time.time_ns() // 1000
+        if not cache.add(key, gen, None):  # közben más beállította
+            gen = cache.get(key)
+    return gen
+
+
+def _bump(usernames):
+    for username in usernames:
+        try:
+            cache.incr(_generation_key(username))
+        except ValueError:  # nincs generáció: nincs mit érvényteleníteni
+            pass
+
+
+def invalidate(*usernames):
+    """A userek publikus válaszai elavulnak; commitkor fut (tranzakción kívül azonnal)."""
+    usernames = [u for u in usernames if u]
+    if usernames:
+        transaction.on_commit(lambda: _bump(usernames))
+
+
+def invalidate_ids(user_ids):
+    """Mint az `invalidate`, ha csak az id-k ismertek (egy lekérdezés)."""
+    from .models import User
+
+    user_ids = list(user_ids)
+    if user_ids:
+        invalidate(*User.objects.filter(pk__in=user_ids).values_list("username", flat=True))
+
+
+class PublicCacheMixin:
+    """GET válasz cache-elése a view `username` URL paramétere szerinti generációval."""
+
+    def get(self, request, *args, **kwargs):
+        seconds = getattr(settings, "PUBLIC_CACHE_SECONDS", DEFAULT_SECONDS)
+        if not seconds:
+            return super().get(request, *args, **kwargs)
+        # a teljes URL: host (lapozó linkek), path, ?fields=/?omit=/?page=
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        key = f"public:{generation(self.kwargs['username'])}:{url}"
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, seconds)
+        return response
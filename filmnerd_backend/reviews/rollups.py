@@ -0,0 +1,177 @@
+"""
+Filmenkénti napi összesítők (MovieDailyStats) inkrementális építése és az
+idősoros lekérdezés.
+
+A periodikus job egész (TIME_ZONE szerinti) napokat számol újra a
+forrástáblákból, (film, nap) szerint, forrásonként egy GROUP BY-jal, és a
+napi sorokat a friss összegekre cseréli (nem ad hozzá), így ugyanaz a nap
+akárhányszor újraszámolható. Minden futás a watermark előtti LOOKBACK-kel
+kezd: ami az időbélyegénél később commitolt, a következő futásnál bekerül.
+A watermark sora a futás alatt zárolva van.
+
+Ami a watermark mögé, régi napra kerül (CSV import történeti dátummal),
+azt az író a `refresh`-sel számoltatja újra, a (film, nap) párjaira.
+
+Az első futás a legrégebbi forrássortól indul, CHUNK_DAYS naponként egy
+tranzakcióval. Újraépítés: `manage.py build_rollups --rebuild`.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Favourite, MovieDailyStats, MovieListItem, Review, RollupWatermark, Watchlist
+
+WATERMARK = "movie_daily_stats"
+LOOKBACK = datetime.timedelta(days=1)
+CHUNK_DAYS = 30
+# MovieDailyStats mező -> (forrás model, időbélyeg oszlop)
+SOURCES = {
+    "reviews_added": (Review, "created_at"),
+    "favourites_added": (Favourite, "created_at"),
+    "watchlist_added": (Watchlist, "created_at"),
+    "list_adds": (MovieListItem, "added_at"),
+}
+FIELDS = ("reviews_added", "rating_sum", "favourites_added", "watchlist_added", "list_adds")
+
+BUCKETS = {"day": F, "week": TruncWeek, "month": TruncMonth}
+MAX_POINTS = 1000
+
+
+def _earliest():
+    starts = [model.objects.aggregate(m=Min(column))["m"] for model, column in SOURCES.values()]
+    starts = [s for s in starts if s is not None]
+    return min(starts) if starts else None
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+
+
+def _window(start=None, end=None, movie_ids=None, days=None):
+    """{(movie_id, nap): {mező: érték}} a [start, end) ablakra, vagy a movie_ids x days rácsra."""
+    rows = {}
+    for field, (model, column) in SOURCES.items():
+        if days is None:
+            lookup = {f"{column}__gte": start, f"{column}__lt": end}
+        else:
+            lookup = {"movie_id__in": movie_ids, f"{column}__date__in": days}
+        queryset = (
+            model.objects.filter(**lookup).order_by()
+            .values("movie_id", day=TruncDate(column)).annotate(n=Count("id"))
+        )
+        if model is Review:
+            queryset = queryset.annotate(s=Sum("rating"))
+        for row in queryset:
+            counts = rows.setdefault((row["movie_id"], row["day"]), dict.fromkeys(FIELDS, 0))
+            counts[field] = row["n"]
+            if "s" in row:
+                counts["rating_sum"] = row["s"] or 0
+    return rows
+
+
+def _replace(rows, scope):
+    """A scope napi sorainak cseréje a friss összegekre (bulk_update + bulk_create); a forrás nélküliek törlődnek."""
+    existing = {(s.movie_id, s.day): s for s in scope}
+    changed, created = [], []
+    for (movie_id, day), counts in rows.items():
+        stats = existing.pop((movie_id, day), None)
+        if stats is None:
+            created.append(MovieDailyStats(movie_id=movie_id, day=day, **counts))
+        elif any(getattr(stats, field) != value for field, value in counts.items()):
+            for field, value in counts.items():
+                setattr(stats, field, value)
+            changed.append(stats)
+    if existing:
+        MovieDailyStats.objects.filter(pk__in=[s.pk for s in existing.values()]).delete()
+    MovieDailyStats.objects.bulk_update(changed, FIELDS, batch_size=500)
+    MovieDailyStats.objects.bulk_create(created, batch_size=500)
+
+
+def build_movie_stats(until=None):
+    """A watermark előtti naptól until-ig (alapból most) a napok újraszámolása; visszaadja a napi sorok számát."""
+    end = until or timezone.now()
+    mark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK, defaults={"value": _earliest() or end})
+    day = timezone.localdate(mark.value - LOOKBACK)
+    touched = 0
+    while _day_start(day) < end:
+        stop = min(_day_start(day + datetime.timedelta(days=CHUNK_DAYS)), end)
+        with transaction.atomic():
+            mark = RollupWatermark.objects.select_for_update().get(name=WATERMARK)
+            rows = _window(_day_start(day), stop)
+            last = timezone.localdate(stop - datetime.timedelta(microseconds=1))
+            _replace(rows, MovieDailyStats.objects.filter(day__gte=day, day__lte=last))
+            if stop > mark.value:
+                mark.value = stop
+                mark.save(update_fields=["value"])
+        touched += len(rows)
+        day += datetime.timedelta(days=CHUNK_DAYS)
+    return touched
+
+
+def refresh(pairs):
+    """
+    A (movie_id, nap) párok napi sorainak újraszámolása, pl. import után, aminek
+    a sorai történeti dátummal a watermark mögé kerültek. A movie_ids x napok
+    rácsot számolja (a párok fölött is helyes). Visszaadja a napi sorok számát.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    movie_ids, days = {movie_id for movie_id, _ in pairs}, {day for _, day in pairs}
+    with transaction.atomic():
+        if RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first() is None:
+            return 0  # még nem futott build: az első a legrégebbi sortól indul
+        rows = _window(movie_ids=movie_ids, days=days)
+        _replace(rows, MovieDailyStats.objects.filter(movie_id__in=movie_ids, day__in=days))
+    return len(rows)
+
+
+def rebuild_movie_stats():
+    """Minden napi sor eldobása és újraszámolása a teljes történetből."""
+    with transaction.atomic():
+        MovieDailyStats.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).delete()
+    return build_movie_stats()
+
+
+def bucket_starts(start, end, bucket):
+    """A [start, end] napjait lefedő bucketek első napjai (a hét hétfővel kezdődik, mint a TruncWeek)."""
+    if bucket == "week":
+        day, step = start - datetime.timedelta(days=start.weekday()), datetime.timedelta(days=7)
+    elif bucket == "month":
+        day, step = start.replace(day=1), None
+    else:
+        day, step = start, datetime.timedelta(days=1)
+    starts = []
+    while day <= end:
+        starts.append(day)
+        if step is None:
+            day = (day + datetime.timedelta(days=32)).replace(day=1)
+        else:
+            day += step
+    return starts
+
+
+def timeseries(external_id, start, end, bucket):
+    """
+    A film [start, end] napjai bucketenként összegezve, egy lekérdezéssel; az
+    üres bucketek nullával. A szélső bucketek csak a tartományba eső napokat számolják.
+    """
+    rows = {
+        row.pop("start"): row
+        for row in MovieDailyStats.objects.filter(movie__external_id=external_id, day__gte=start, day__lte=end)
+        .order_by().values(start=BUCKETS[bucket]("day")).annotate(**{field: Sum(field) for field in FIELDS})
+    }
+    points = []
+    for day in bucket_starts(start, end, bucket):
+        counts = rows.get(day, dict.fromkeys(FIELDS, 0))
+        reviews = counts["reviews_added"]
+        points.append({
+            "start": day,
+            **counts,
+            "rating_avg": round(counts["rating_sum"] / reviews, 2) if reviews else None,
+        })
+    return points
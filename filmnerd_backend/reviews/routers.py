@@ -0,0 +1,42 @@
+"""
+Read-replica routing.
+
+A ReplicaRoutingMiddleware (reviews/middleware.py) kérésenként eldönti, hogy
+az olvasások mehetnek-e replikára: csak a reviews view-k GET/HEAD kérései,
+és csak ha a kliens nincs a primaryhez ragasztva (friss írás után). Írás,
+migráció és minden `transaction.atomic` blokk a primaryn marad.
+"""
+import random
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# az aktuális kérés olvasásaihoz választott replika aliasa (None = primary)
+read_alias = ContextVar("read_alias", default=None)
+
+
+def replica_aliases():
+    return [alias for alias in connections if alias.startswith("replica")]
+
+
+def choose_replica():
+    replicas = replica_aliases()
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # ugyanaz az adat mindenhol, csak késleltetve
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
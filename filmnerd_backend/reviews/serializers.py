@@ -1,11 +1,132 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Review, Favourite, MovieList, MovieListItem, Follow, Watchlist
+from rest_framework.permissions import SAFE_METHODS
+from .models import CsvImport, Review, Favourite, MovieList, MovieListItem, Follow, Watchlist, UserStats
 from django.contrib.auth import authenticate, get_user_model
+from .loaders import BatchedMixin, BatchListSerializer
 
 User = get_user_model()
 
 
-class RegisterSerializer(serializers.ModelSerializer):
+# --- Sparse fieldsets ---
+def _field_paths(request, param):
+    """"id,from_user.username" -> {("id",), ("from_user", "username")}"""
+    value = request.query_params.get(param, "") if hasattr(request, "query_params") else ""
+    return {tuple(part.split(".")) for part in value.replace(" ", "").split(",") if part}
+
+
+class SparseFieldsMixin:
+    """
+    GET/HEAD kéréseknél `?fields=id,rating` csak a felsorolt mezőket adja,
+    `?omit=text` a felsoroltakat hagyja ki; beágyazott serializerek mezői
+    ponttal: `?fields=id,from_user.username`. A kérést a context-ből veszi
+    (generic view-k automatikusan átadják). Írásnál nincs szűkítés, mert a
+    validáláshoz minden mező kell.
+
+    A `sparse_queryset` ugyanebből a mezőlistából only()-t és select_relatedet
+    számol, így a ki nem kért oszlopok (pl. review text) be sem töltődnek.
+    Oszlop nélküli (`source="*"`) mezők oszlopai a Meta.sparse_requires-ben
+    adhatók meg.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+        path = self._sparse_path()
+        depth = len(path)
+        wanted = {w for w in _field_paths(request, "fields") if w[:depth] == path[:len(w)]}
+        omitted = {o[depth] for o in _field_paths(request, "omit") if len(o) == depth + 1 and o[:depth] == path}
+        # ha a szülő egészében kérte ezt a serializert (fields=from_user), nincs szűkítés
+        names = None if not wanted or any(len(w) <= depth for w in wanted) else {w[depth] for w in wanted}
+        unknown = ((names or set()) | omitted) - fields.keys()
+        if unknown:
+            prefix = "".join(f"{p}." for p in path)
+            raise serializers.ValidationError(
+                {"fields": f"Unknown field(s): {', '.join(sorted(prefix + u for u in unknown))}."}
+            )
+        return {name: f for name, f in fields.items() if (names is None or name in names) and name not in omitted}
+
+    def _sparse_path(self):
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name:  # a ListSerializer gyereke üres field_name-mel kötődik
+                path.append(node.field_name)
+            node = node.parent
+        return tuple(reversed(path))
+
+
+def _columns(serializer, model):
+    """
+    (only, select_related, prefetch gyökerek) a serializer olvasható mezőiből;
+    None, ha valamelyik mező forrása nem vezethető vissza oszlopra.
+    """
+    only, related, prefetched = [], [], set()
+    requires = getattr(getattr(serializer, "Meta", None), "sparse_requires", {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == "*":
+            if name not in requires:
+                return None
+            only += requires[name]
+            continue
+        current, path = model, []
+        for n, attr in enumerate(field.source_attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            path.append(model_field.name)
+            last = n == len(field.source_attrs) - 1
+            if model_field.one_to_many or model_field.many_to_many:
+                prefetched.add(path[0])
+                break
+            if not model_field.is_relation:
+                only.append("__".join(path))
+                break
+            if last and not isinstance(field, serializers.BaseSerializer):
+                if not model_field.concrete:
+                    return None
+                only.append("__".join(path))  # user_id: csak az FK oszlop
+                break
+            related.append("__".join(path))
+            current = model_field.related_model
+            if last:
+                nested = _columns(field, current)
+                if nested is None:
+                    return None
+                prefix = "__".join(path)
+                only += [f"{prefix}__{column}" for column in nested[0]]
+                related += [f"{prefix}__{r}" for r in nested[1]]
+    return only, related, prefetched
+
+
+def sparse_queryset(queryset, serializer):
+    """
+    A queryset szűkítése a serializer (már ?fields/?omit szerint szűrt)
+    mezőire: only() a használt oszlopokra, select_related csak a kellő
+    kapcsolatokra, a ki nem kért prefetch-ek elhagyása.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    columns = _columns(serializer, queryset.model)
+    if columns is None:
+        return queryset
+    only, related, prefetched = columns
+    lookups = [
+        lookup for lookup in queryset._prefetch_related_lookups
+        if (lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup).split("__")[0] in prefetched
+    ]
+    queryset = queryset.select_related(None).prefetch_related(None).prefetch_related(*lookups)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*only) if only else queryset.only("pk")
+
+
+class RegisterSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -20,10 +141,11 @@ class RegisterSerializer(serializers.ModelSerializer):
         )
         user.set_password(validated_data["password"])
         user.save()
+        UserStats.objects.create(user=user)
         return user
 
 
-class LoginSerializer(serializers.Serializer):
+class LoginSerializer(SparseFieldsMixin, serializers.Serializer):
     username = serializers.CharField()              # <-- email helyett username
     password = serializers.CharField(write_only=True)
 
@@ -38,22 +160,45 @@ class LoginSerializer(serializers.Serializer):
         return data
 
 
-class MeSerializer(serializers.ModelSerializer):
+class MeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "email", "name", "token_expiration"]
 
 
-class ReviewSerializer(serializers.ModelSerializer):
-    user_username = serializers.CharField(source="user.username", read_only=True)
+class MovieIdField(BatchedMixin, serializers.CharField):
+    """
+    A külső movie id string (Movie.external_id) – az API ezt látja, nem a belső kulcsot.
+    Olvasáskor a film a kérés loaderéből jön (reviews/loaders.py).
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("source", "movie.external_id")
+        kwargs.setdefault("max_length", 20)
+        super().__init__(**kwargs)
+
+
+class BatchedCharField(BatchedMixin, serializers.CharField):
+    pass
+
+
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user_username = BatchedCharField(source="user.username", read_only=True)
+    movie_id = MovieIdField()
 
     class Meta:
         model = Review
         fields = ["id", "user_id", "user_username", "movie_id", "rating", "text", "created_at", "updated_at"]
         read_only_fields = ["id", "user_id", "created_at", "updated_at"]
+        list_serializer_class = BatchListSerializer
 
+    def update(self, instance, validated_data):
+        # a review filmje nem cserélhető; új filmhez új review kell
+        validated_data.pop("movie", None)
+        return super().update(instance, validated_data)
 
-class UserPublicSerializer(serializers.ModelSerializer):
+
+class UserPublicSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "name", "email"]  # vagy amit publikusan szeretnél
@@ -62,7 +207,35 @@ class UserPublicSerializer(serializers.ModelSerializer):
         }
 
 
-class FavouriteSerializer(serializers.ModelSerializer):
+class BatchedUserSerializer(BatchedMixin, UserPublicSerializer):
+    """UserPublicSerializer egy FK mögött (from_user, to_user), a kérés loaderéből."""
+
+
+class UserStatsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    rating_avg = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UserStats
+        fields = ["reviews_count", "rating_avg", "favourites_count", "watchlist_count",
+                  "lists_count", "followers_count", "following_count"]
+        sparse_requires = {"rating_avg": ["rating_sum", "reviews_count"]}
+
+    def get_rating_avg(self, obj):
+        if not obj.reviews_count:
+            return 0
+        return round(obj.rating_sum / obj.reviews_count, 1)
+
+
+class UserProfileSerializer(UserPublicSerializer):
+    stats = UserStatsSerializer(read_only=True, allow_null=True)
+
+    class Meta(UserPublicSerializer.Meta):
+        fields = UserPublicSerializer.Meta.fields + ["stats"]
+
+
+class FavouriteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    movie_id = MovieIdField()
+
     class Meta:
         model = Favourite
         fields = ["id", "user_id", "movie_id"]
@@ -76,43 +249,65 @@ class FavouriteSerializer(serializers.ModelSerializer):
 
 
 # for MovieList and MovieListItem
-class MovieListItemSerializer(serializers.ModelSerializer):
+class MovieListItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    movie_id = MovieIdField(read_only=True)
+
     class Meta:
         model = MovieListItem
-        fields = ['movie_id', 'added_at']
+        fields = ['movie_id', 'position', 'added_at']
 
 
-class MovieListSerializer(serializers.ModelSerializer):
+class MovieListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = MovieListItemSerializer(many=True, read_only=True)
-    user = serializers.ReadOnlyField(source='user.username')
+    user = BatchedCharField(source='user.username', read_only=True)
 
     class Meta:
         model = MovieList
         fields = ['id', 'user', 'name', 'created_at', 'items']
+        list_serializer_class = BatchListSerializer
 
 
-class MovieListCreateUpdateSerializer(serializers.ModelSerializer):
+class MovieListCreateUpdateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = MovieList
         fields = ['name']
 
 
-class MovieListItemCreateSerializer(serializers.ModelSerializer):
+class MovieListItemCreateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    movie_id = MovieIdField()
+
     class Meta:
         model = MovieListItem
         fields = ['movie_id']
 
 
-class FollowSerializer(serializers.ModelSerializer):
-    from_user = UserPublicSerializer(read_only=True)
-    to_user = UserPublicSerializer(read_only=True)
+class MovieListItemBulkCreateSerializer(SparseFieldsMixin, serializers.Serializer):
+    list_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=50)
+    movie_ids = serializers.ListField(
+        child=serializers.CharField(max_length=20), allow_empty=False, max_length=100
+    )
+
+    def validate_movie_ids(self, v):
+        v = [m.strip() for m in v if m.strip()]
+        if not v:
+            raise serializers.ValidationError("movie_ids required")
+        return list(dict.fromkeys(v))
+
+    def validate_list_ids(self, v):
+        return list(dict.fromkeys(v))
+
+
+class FollowSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    from_user = BatchedUserSerializer(read_only=True)
+    to_user = BatchedUserSerializer(read_only=True)
 
     class Meta:
         model = Follow
         fields = ["id", "from_user", "to_user", "created_at"]
+        list_serializer_class = BatchListSerializer
 
 
-class FollowCreateSerializer(serializers.ModelSerializer):
+class FollowCreateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Follow
         fields = ["to_user"]
@@ -126,7 +321,9 @@ class FollowCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class WatchlistSerializer(serializers.ModelSerializer):
+class WatchlistSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    movie_id = MovieIdField()
+
     class Meta:
         model = Watchlist
         fields = ["id", "user_id", "movie_id"]
@@ -137,3 +334,23 @@ class WatchlistSerializer(serializers.ModelSerializer):
         if not v:
             raise serializers.ValidationError("movie_id required")
         return v
+
+
+class CsvImportSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = CsvImport
+        fields = ["id", "kind", "source", "status", "rows_processed", "created_count", "updated_count",
+                  "error_count", "errors", "created_at", "finished_at"]
+        read_only_fields = fields
+
+
+class CsvImportCreateSerializer(SparseFieldsMixin, serializers.Serializer):
+    MAX_BYTES = 20 * 1024 * 1024
+
+    file = serializers.FileField()
+    kind = serializers.ChoiceField(choices=CsvImport.KIND_CHOICES)
+
+    def validate_file(self, f):
+        if f.size > self.MAX_BYTES:
+            raise serializers.ValidationError("File too large (max 20 MB).")
+        return f
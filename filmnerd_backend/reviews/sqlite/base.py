@@ -0,0 +1,67 @@
+"""
+SQLite backend egy gépes, több workeres telepítéshez: ENGINE = "reviews.sqlite".
+
+A gyári sqlite3 backend a rollback journalt és a deferred BEGIN-t hagyja
+meg: több processz párhuzamos írásánál "database is locked", és az
+olvasások is megállnak a commitoló író mögött. Itt minden új kapcsolaton:
+
+- journal_mode=WAL: az olvasók nem várnak az íróra (és fordítva);
+- synchronous=NORMAL: WAL mellett biztonságos, commitonként nincs fsync;
+- busy_timeout: zárolásnál ennyi ms-ig vár, mielőtt hibát adna;
+- mmap_size / cache_size: olvasások memóriából, kevesebb read() hívás.
+
+A tranzakciók (`transaction.atomic`) `BEGIN IMMEDIATE`-tel indulnak: az
+írási zárat az elején kérik, ahol a busy_timeout érvényesül. Deferred
+BEGIN-nél egy olvasással kezdő tranzakció írásra váltáskor azonnal
+SQLITE_BUSY-t kap, várakozás nélkül. Az olvasások tranzakción kívül
+(autocommit) futnak, őket ez nem érinti.
+
+Felülírás: OPTIONS = {"pragmas": {"mmap_size": 0}, "transaction_mode": "DEFERRED"}.
+(Django 5.1-től a gyári backend is tud transaction_mode-ot és init_commandot.)
+
+OPTIONS = {"pool": {...}} mellett a kapcsolatok a PRAGMA-kkal együtt
+poolból jönnek (reviews/dbpool.py); memóriabeli adatbázissal ne használd.
+"""
+from django.db.backends.sqlite3 import base
+
+from ..dbpool import PooledDatabaseMixin
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 128 * 1024 * 1024,
+    "cache_size": -16000,  # negatív: KiB
+}
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class TunedDatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        options = settings_dict.get("OPTIONS", {})
+        self.pragmas = {**PRAGMAS, **options.get("pragmas", {})}
+        self.transaction_mode = options.get("transaction_mode", "IMMEDIATE").upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ValueError(f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}")
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # a saját opciók nem mehetnek a sqlite3.connect()-nek
+        params.pop("pragmas", None)
+        params.pop("transaction_mode", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
+
+
+class DatabaseWrapper(PooledDatabaseMixin, TunedDatabaseWrapper):
+    # a pool a teljes (PRAGMA-s) get_new_connection-t hívja, így az újrahasznált kapcsolaton nem fut újra
+    pass
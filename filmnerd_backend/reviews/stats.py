@@ -0,0 +1,53 @@
+"""
+UserStats újraépítése a nyers táblákból (drift javítás, migráció).
+
+`get_model` cserélhető, így a migráció a historikus modellekkel hívhatja.
+"""
+from django.apps import apps
+from django.db.models import Count, Sum
+
+COUNTED = {
+    "favourites_count": ("Favourite", "user_id"),
+    "watchlist_count": ("Watchlist", "user_id"),
+    "lists_count": ("MovieList", "user_id"),
+    "followers_count": ("Follow", "to_user_id"),
+    "following_count": ("Follow", "from_user_id"),
+}
+
+
+def rebuild_user_stats(user_ids=None, get_model=apps.get_model, batch_size=1000):
+    """Recompute every counter for the given users (default: all), batch by batch."""
+    User = get_model("reviews", "User")
+    UserStats = get_model("reviews", "UserStats")
+    Review = get_model("reviews", "Review")
+
+    users = User.objects.order_by("pk").values_list("pk", flat=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    ids = list(users)
+
+    done = 0
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        rows = {pk: UserStats(user_id=pk) for pk in batch}
+        for user_id, count, total in (
+            Review.objects.filter(user_id__in=batch).order_by().values("user_id")
+            .annotate(c=Count("id"), s=Sum("rating")).values_list("user_id", "c", "s")
+        ):
+            rows[user_id].reviews_count = count
+            rows[user_id].rating_sum = total or 0
+        for field, (model_name, user_field) in COUNTED.items():
+            model = get_model("reviews", model_name)
+            for user_id, count in (
+                model.objects.filter(**{f"{user_field}__in": batch}).order_by().values(user_field)
+                .annotate(c=Count("pk")).values_list(user_field, "c")
+            ):
+                setattr(rows[user_id], field, count)
+        UserStats.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["reviews_count", "rating_sum", *COUNTED],
+        )
+        done += len(batch)
+    return done
@@ -0,0 +1,109 @@
+"""
+"People you may know": másodfokú kapcsolatok a Follow gráfból.
+
+Az éleket egyszer töltjük be, és CSR alakba rendezzük (indptr/indices NumPy
+tömbök, a user id-k sűrű 0..n-1 indexekre képezve), így egy user követettjeinek
+követettjei néhány tömbművelet, lekérdezés nélkül. Jelölt: akit legalább egy
+általam követett user követ, de én még nem. Pontszám: közös kapcsolatok
+(log skálán) + TASTE_WEIGHT * ízlés-egyezés (reviews.compatibility); az
+ízlést csak a közös kapcsolatok szerinti rövidlistára számoljuk.
+
+A `build_suggestions` periodikus job userenként TOP_N sort ír a
+FollowSuggestion táblába; a /api/social/suggestions/ ebből olvas. A numpy
+import lusta (a views csak a TOP_N-t használja innen), lásd compatibility.
+"""
+import math
+
+from django.db import transaction
+
+from . import compatibility
+from .models import Follow, FollowSuggestion
+
+TOP_N = 20
+SHORTLIST = 3 * TOP_N
+TASTE_WEIGHT = 2.0
+WRITE_BATCH = 500
+
+
+class FollowGraph:
+    """Irányított követési gráf CSR-ben: user i követettjei indices[indptr[i]:indptr[i + 1]]."""
+
+    def __init__(self, edges):
+        import numpy as np
+
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        self.user_ids, dense = np.unique(edges, return_inverse=True)
+        dense = dense.reshape(-1, 2)
+        order = np.argsort(dense[:, 0], kind="stable")
+        self.indices = dense[order, 1]
+        counts = np.bincount(dense[:, 0], minlength=len(self.user_ids))
+        self.indptr = np.concatenate(([0], np.cumsum(counts)))
+
+    @classmethod
+    def load(cls):
+        # aktív userek közti élek; a törlés alatt álló (inaktivált) userek kimaradnak
+        rows = Follow.objects.filter(from_user__is_active=True, to_user__is_active=True).values_list(
+            "from_user_id", "to_user_id"
+        )
+        return cls(list(rows.iterator(chunk_size=10000)))
+
+    def following(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def second_degree(self, i):
+        """(jelölt indexek, közös kapcsolatok száma): követettjeim követettjei, nélkülem és a már követettek nélkül."""
+        import numpy as np
+
+        first = self.following(i)
+        starts, lengths = self.indptr[first], self.indptr[first + 1] - self.indptr[first]
+        if not lengths.sum():
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # a szomszéd-szeletek összefűzése ciklus nélkül
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        candidates, counts = np.unique(self.indices[offsets + np.arange(lengths.sum())], return_counts=True)
+        keep = (candidates != i) & ~np.isin(candidates, first)
+        return candidates[keep], counts[keep]
+
+
+def rank(graph, i):
+    """[(suggested user id, mutual, taste, score)] csökkenő pontszám szerint, legfeljebb TOP_N."""
+    import numpy as np
+
+    candidates, mutual = graph.second_degree(i)
+    if not len(candidates):
+        return []
+    if len(candidates) > SHORTLIST:
+        top = np.argpartition(-mutual, SHORTLIST)[:SHORTLIST]
+        candidates, mutual = candidates[top], mutual[top]
+    user_id = int(graph.user_ids[i])
+    candidate_ids = [int(c) for c in graph.user_ids[candidates]]
+    tastes = compatibility.compare_many(user_id, candidate_ids)
+    ranked = []
+    for candidate_id, count in zip(candidate_ids, mutual.tolist()):
+        taste = tastes[candidate_id]["score"] if candidate_id in tastes else 0.0
+        ranked.append((candidate_id, count, taste, math.log1p(count) + TASTE_WEIGHT * taste))
+    ranked.sort(key=lambda row: (-row[3], row[0]))
+    return ranked[:TOP_N]
+
+
+def build_suggestions(progress=None):
+    """Az összes user javaslatainak újraszámolása; WRITE_BATCH userenként egy tranzakció."""
+    graph = FollowGraph.load()
+    users = [i for i in range(len(graph.user_ids)) if graph.indptr[i + 1] > graph.indptr[i]]
+    done = 0
+    for start in range(0, len(users), WRITE_BATCH):
+        batch = users[start:start + WRITE_BATCH]
+        rows = [
+            FollowSuggestion(user_id=int(graph.user_ids[i]), suggested_id=s, mutual_count=m, taste=t, score=score)
+            for i in batch
+            for s, m, t, score in rank(graph, i)
+        ]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=[int(graph.user_ids[i]) for i in batch]).delete()
+            FollowSuggestion.objects.bulk_create(rows, batch_size=1000)
+        done += len(batch)
+        if progress:
+            progress(done, len(users))
+    # akinek már nincs követettje, annak a régi javaslatai is mennek
+    FollowSuggestion.objects.exclude(user_id__in=Follow.objects.values("from_user_id")).delete()
+    return done
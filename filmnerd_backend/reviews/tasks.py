@@ -0,0 +1,58 @@
+"""
+Háttérfeladatok a DB-s job sorhoz (reviews.jobs); a worker ezt a modult tölti be.
+"""
+from django.db import transaction
+
+from . import deletion, imports, public_cache, rollups, suggestions, wrapped
+from .jobs import periodic, task
+from .models import MovieList
+from .positions import rebalance
+from .stats import rebuild_user_stats
+
+
+@task
+def rebalance_list(movie_list_id):
+    """Egy lista pozíciókulcsainak rövidítése (a move view teszi sorba, ha túl hosszúak)."""
+    with transaction.atomic():
+        rebalance(movie_list_id)
+        public_cache.invalidate_ids(MovieList.objects.filter(pk=movie_list_id).values_list("user_id", flat=True))
+
+
+@task
+def rebuild_stats(user_ids=None):
+    """UserStats újraszámolása a megadott (vagy minden) userre."""
+    rebuild_user_stats(user_ids)
+    # mindenkire: a publikus cache-t a TTL frissíti
+    public_cache.invalidate_ids(user_ids or [])
+
+
+@task
+def delete_users(user_ids, chunk_size=1000):
+    """Userek darabolt törlése (az admin "Delete in chunks" actionje teszi sorba)."""
+    deletion.delete_users(user_ids, chunk_size=chunk_size)
+
+
+@task
+def run_import(import_id):
+    """Feltöltött Letterboxd/IMDb CSV feldolgozása (az /api/imports/ upload teszi sorba)."""
+    imports.run_stored(import_id)
+
+
+@periodic(6 * 3600)
+@task
+def build_suggestions():
+    """"People you may know" javaslatok újraszámolása (periodikus, a worker ütemezi)."""
+    suggestions.build_suggestions()
+
+
+@periodic(3600)
+@task
+def build_movie_stats():
+    """Filmenkénti napi összesítők (MovieDailyStats) frissítése a watermark óta (periodikus)."""
+    rollups.build_movie_stats()
+
+
+@task
+def build_wrapped(year, lo, hi):
+    """Egy user id tartomány éves összefoglalói (a `build_wrapped` parancs tartományonként teszi sorba)."""
+    wrapped.build_range(year, lo, hi)
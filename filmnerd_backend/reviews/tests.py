@@ -1,23 +1,63 @@
+import asyncio
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
 from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import sync_to_async
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Review, Favourite  # app label assumed: reviews
+from . import (
+    compatibility, dbpool, deletion, imports, jobs, live, profiling, public_cache, rollups, suggestions, warmup,
+    wrapped,
+)
+from .benchmarks import count_cache_calls, measure
+from .positions import key_between
+from .admin import EstimatedCountPaginator
+from .authentication import is_active, restore, revoke, tokens_for
+from .routers import ReplicaRouter, read_alias
+from .models import (  # app label assumed: reviews
+    Review, CsvImport, Favourite, Follow, FollowSuggestion, Job, Movie, MovieDailyStats, ProfileReport, Watchlist,
+    MovieList, MovieListItem, RollupWatermark, UserStats, YearInReview,
+)
+from .serializers import FollowSerializer, MovieListSerializer, ReviewSerializer
 from .views import (
+    CsvImportViewSet, DatabaseHealthView, FollowingCompatibilityView, FollowSuggestionsView, UserCompatibilityView,
+    UserWrappedView,
     RegisterView, LoginView, MeView,
     ReviewListCreateView, ReviewRetrieveUpdateDestroyView,
-    FavouriteViewSet, review_summary,
+    FavouriteViewSet, MovieTimeseriesView, review_summary,
+    MovieListItemCreateView, MovieListItemBulkCreateView, MovieListItemMoveView,
+    WatchlistViewSet, MovieListViewSet, FollowCreateView, UnfollowView, UserPublicProfileView,
+    FollowingListView,
 )
 
 User = get_user_model()
 
 
+def movie(external_id):
+    return Movie.objects.get_for(external_id)
+
+
 class BaseAPITestCase(TestCase):
     def setUp(self):
+        # a cache-ben (publikus válaszok, throttle vödrök) ne maradjon előző tesztből semmi
+        cache.clear()
         self.factory = APIRequestFactory()
         self.user = User.objects.create_user(
             username="alice", email="alice@example.com", password="pass123", name="Alice"
@@ -25,6 +65,8 @@ class BaseAPITestCase(TestCase):
         self.user2 = User.objects.create_user(
             username="bob", email="bob@example.com", password="pass123", name="Bob"
         )
+        # RegisterView hozza létre; itt create_user-rel megyünk
+        UserStats.objects.bulk_create([UserStats(user=self.user), UserStats(user=self.user2)])
 
 
 class AuthTests(BaseAPITestCase):
@@ -91,7 +133,7 @@ class ReviewTests(BaseAPITestCase):
         force_authenticate(req1, user=self.user)
         resp1 = view(req1)
         self.assertEqual(resp1.status_code, status.HTTP_201_CREATED)
-        r1 = Review.objects.get(user=self.user, movie_id="1359")
+        r1 = Review.objects.get(user=self.user, movie__external_id="1359")
         self.assertEqual(r1.rating, 4)
         self.assertEqual(r1.text, "American Psycho rulez")
 
@@ -104,14 +146,14 @@ class ReviewTests(BaseAPITestCase):
         force_authenticate(req2, user=self.user)
         resp2 = view(req2)
         self.assertEqual(resp2.status_code, status.HTTP_200_OK)
-        r2 = Review.objects.get(user=self.user, movie_id="1359")
+        r2 = Review.objects.get(user=self.user, movie__external_id="1359")
         self.assertEqual(r2.id, r1.id)
         self.assertEqual(r2.rating, 5)
         self.assertEqual(r2.text, "Changed mind")
 
     def test_retrieve_update_destroy_permissions(self):
         # Alice létrehoz
-        r = Review.objects.create(user=self.user, movie_id="999", rating=3, text="init")
+        r = Review.objects.create(user=self.user, movie=movie("999"), rating=3, text="init")
 
         # retrieve bárki (read-only) – itt autentikált Bob
         retrieve = ReviewRetrieveUpdateDestroyView.as_view()
@@ -149,12 +191,109 @@ class ReviewTests(BaseAPITestCase):
         self.assertEqual(resp_del.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Review.objects.filter(id=r.id).exists())
 
+    def test_create_is_single_upsert_and_clears_watchlist(self):
+        view = ReviewListCreateView.as_view()
+        Watchlist.objects.create(user=self.user, movie=movie("550"))
+        old = Review.objects.create(user=self.user, movie=movie("550"), rating=2, text="meh")
+        UserStats.objects.filter(user=self.user).update(reviews_count=1, rating_sum=2, watchlist_count=1)
+
+        req = self.factory.post("/reviews", {"movie_id": "550", "rating": 4, "text": " jobb "}, format="json")
+        force_authenticate(req, user=self.user)
+        # movie lookup + upsert + watchlist DELETE + két UserStats UPDATE (+ savepoint/release a tesztben)
+        with self.assertNumQueries(7):
+            resp = view(req)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["id"], old.id)
+        self.assertEqual(resp.data["text"], "jobb")
+        self.assertEqual(resp.data["user_username"], "alice")
+        self.assertFalse(Watchlist.objects.filter(user=self.user, movie__external_id="550").exists())
+        old.refresh_from_db()
+        self.assertEqual(old.rating, 4)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.reviews_count, stats.rating_sum, stats.watchlist_count), (1, 4, 0))
+
+
+class ReviewConcurrencyTests(TransactionTestCase):
+    def test_parallel_posts_for_same_pair_produce_one_row(self):
+        user = User.objects.create_user(username="carol", password="pass123")
+        # MIRROR beállítás miatt a TransactionTestCase nem flush-ol: magunk takarítunk
+        self.addCleanup(Movie.objects.filter(external_id="603").delete)
+        self.addCleanup(user.delete)
+        factory = APIRequestFactory()
+        view = ReviewListCreateView.as_view()
+        barrier = threading.Barrier(8)
+        statuses = []
+
+        def worker(i):
+            try:
+                req = factory.post("/reviews", {"movie_id": "603", "rating": 1 + i % 5}, format="json")
+                force_authenticate(req, user=user)
+                barrier.wait()
+                statuses.append(view(req).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(statuses), 8)
+        self.assertEqual(statuses.count(status.HTTP_201_CREATED), 1)
+        self.assertEqual(statuses.count(status.HTTP_200_OK), 7)
+        self.assertEqual(Review.objects.filter(user=user, movie__external_id="603").count(), 1)
+
+
+class ReviewScopeTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        carol = User.objects.create_user(username="carol", password="x")
+        dave = User.objects.create_user(username="dave", password="x")
+        Follow.objects.bulk_create([
+            Follow(from_user=self.user, to_user=self.user2),
+            Follow(from_user=self.user2, to_user=self.user),
+            Follow(from_user=self.user, to_user=carol),
+            Follow(from_user=dave, to_user=self.user),
+        ])
+        m = movie("603")
+        for user, rating in ((self.user, 3), (self.user2, 4), (carol, 2), (dave, 5)):
+            Review.objects.create(user=user, movie=m, rating=rating)
+        Review.objects.create(user=carol, movie=movie("550"), rating=1)
+
+    def get(self, params, user=None):
+        req = self.factory.get("/reviews/", params)
+        if user:
+            force_authenticate(req, user=user)
+        return ReviewListCreateView.as_view()(req)
+
+    def test_following_and_friends_scopes_with_average_in_one_page_query(self):
+        # lapozó COUNT + az oldal (window átlaggal)
+        with self.assertNumQueries(2):
+            resp = self.get({"movie_id": "603", "scope": "following"}, self.user)
+        self.assertEqual(sorted(r["user_username"] for r in resp.data["results"]), ["bob", "carol"])
+        self.assertEqual(resp.data["summary"], {"movie_id": "603", "count": 2, "avg": 3.0})
+
+        resp = self.get({"movie_id": "603", "scope": "friends"}, self.user)
+        self.assertEqual([r["user_username"] for r in resp.data["results"]], ["bob"])
+        self.assertEqual(resp.data["summary"], {"movie_id": "603", "count": 1, "avg": 4.0})
+
+        resp = self.get({"movie_id": "603", "scope": "friends"}, self.user2)
+        self.assertEqual(resp.data["summary"]["avg"], 3.0)
+        resp = self.get({"movie_id": "999", "scope": "following"}, self.user)
+        self.assertEqual(resp.data["summary"], {"movie_id": "999", "count": 0, "avg": 0})
+
+    def test_scope_needs_login_and_known_value(self):
+        self.assertEqual(self.get({"movie_id": "603", "scope": "following"}).status_code, 401)
+        self.assertEqual(self.get({"movie_id": "603", "scope": "everyone"}, self.user).status_code, 400)
+        self.assertNotIn("summary", self.get({"movie_id": "603"}).data)
+
 
 class ReviewSummaryTests(BaseAPITestCase):
     def test_review_summary_counts_and_avg_rounded(self):
-        Review.objects.create(user=self.user, movie_id="42", rating=4, text="")
-        Review.objects.create(user=self.user2, movie_id="42", rating=5, text="")
-        Review.objects.create(user=self.user, movie_id="7", rating=1, text="")
+        Review.objects.create(user=self.user, movie=movie("42"), rating=4, text="")
+        Review.objects.create(user=self.user2, movie=movie("42"), rating=5, text="")
+        Review.objects.create(user=self.user, movie=movie("7"), rating=1, text="")
 
         req = self.factory.get("/reviews/summary", {"movie_id": "42"})
         resp = review_summary(req)
@@ -164,6 +303,138 @@ class ReviewSummaryTests(BaseAPITestCase):
         self.assertEqual(resp.data["avg"], 4.5)
 
 
+class MovieTimeseriesTests(BaseAPITestCase):
+    def at(self, day):
+        return timezone.make_aware(datetime.datetime(2024, 1, day, 12))
+
+    def get(self, **params):
+        return MovieTimeseriesView.as_view()(self.factory.get("/movies/tt1/timeseries/", params), movie_id="tt1")
+
+    def setUp(self):
+        super().setUp()
+        m = movie("tt1")
+        Review.objects.bulk_create([
+            Review(user=self.user, movie=m, rating=4, created_at=self.at(1)),  # 2024-01-01 hétfő
+            Review(user=self.user2, movie=m, rating=2, created_at=self.at(3)),
+        ])
+        Favourite.objects.create(user=self.user, movie=m, created_at=self.at(3))
+        Favourite.objects.create(user=self.user2, movie=m, created_at=None)  # migráció előtti sor: kimarad
+        Watchlist.objects.create(user=self.user2, movie=m, created_at=self.at(9))
+        item = MovieListItem.objects.create(movie_list=MovieList.objects.create(user=self.user, name="L"), movie=m)
+        MovieListItem.objects.filter(pk=item.pk).update(added_at=self.at(10))
+
+    def daily(self):
+        return list(MovieDailyStats.objects.values_list(
+            "day__day", "reviews_added", "rating_sum", "favourites_added", "watchlist_added", "list_adds"
+        ))
+
+    def test_build_is_incremental_from_the_watermark(self):
+        rollups.build_movie_stats(until=self.at(5))
+        self.assertEqual(self.daily(), [(1, 1, 4.0, 0, 0, 0), (3, 1, 2.0, 1, 0, 0)])
+        self.assertEqual(RollupWatermark.objects.get().value, self.at(5))
+
+        rollups.build_movie_stats(until=self.at(20))
+        rollups.build_movie_stats(until=self.at(20))  # a napokat újraszámolja, nem ad hozzá: nem számol kétszer
+        expected = [(1, 1, 4.0, 0, 0, 0), (3, 1, 2.0, 1, 0, 0), (9, 0, 0.0, 0, 1, 0), (10, 0, 0.0, 0, 0, 1)]
+        self.assertEqual(self.daily(), expected)
+
+        # a watermark előtti időbélyeggel, később commitolt sor a következő futásnál bekerül
+        late = Review.objects.create(user=self.user, movie=movie("tt2"), rating=5, created_at=self.at(19))
+        rollups.build_movie_stats(until=self.at(21))
+        self.assertEqual(MovieDailyStats.objects.get(movie=late.movie).reviews_added, 1)
+        expected.append((19, 1, 5.0, 0, 0, 0))
+        self.assertEqual(self.daily(), expected)
+
+        call_command("build_rollups", "--rebuild", stdout=StringIO())
+        self.assertEqual(self.daily(), expected)
+
+    def test_import_after_a_rollup_counts_its_historical_days(self):
+        rollups.build_movie_stats()
+        csv_import = CsvImport.objects.create(user=self.user, kind="ratings", file_name="ratings.csv")
+        imports.run_import(csv_import, StringIO(LETTERBOXD_RATINGS))
+        self.assertEqual(csv_import.status, CsvImport.DONE)
+        self.assertEqual(
+            sorted(MovieDailyStats.objects.filter(day__year=2023).values_list(
+                "movie__external_id", "day", "reviews_added", "rating_sum"
+            )),
+            [("550", datetime.date(2023, 1, 3), 1, 1.0), ("603", datetime.date(2023, 1, 6), 1, 5.0)],
+        )
+
+    def test_endpoint_downsamples_in_one_query(self):
+        rollups.build_movie_stats(until=self.at(20))
+        with self.assertNumQueries(1):
+            resp = self.get(**{"from": "2024-01-01", "to": "2024-01-14", "bucket": "week"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["points"], [
+            {"start": datetime.date(2024, 1, 1), "reviews_added": 2, "rating_sum": 6.0, "favourites_added": 1,
+             "watchlist_added": 0, "list_adds": 0, "rating_avg": 3.0},
+            {"start": datetime.date(2024, 1, 8), "reviews_added": 0, "rating_sum": 0.0, "favourites_added": 0,
+             "watchlist_added": 1, "list_adds": 1, "rating_avg": None},
+        ])
+
+        points = self.get(**{"from": "2023-12-15", "to": "2024-01-31", "bucket": "month"}).data["points"]
+        self.assertEqual([(p["start"], p["reviews_added"], p["list_adds"]) for p in points],
+                         [(datetime.date(2023, 12, 1), 0, 0), (datetime.date(2024, 1, 1), 2, 1)])
+
+    def test_endpoint_validates_params(self):
+        for params in ({"bucket": "year"}, {"from": "2024-02-01", "to": "2024-01-01"}, {"from": "jan"},
+                       {"from": "2000-01-01", "bucket": "day"}):
+            self.assertEqual(self.get(**params).status_code, 400, params)
+
+
+class SparseFieldsTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Review.objects.create(user=self.user, movie=movie("1"), rating=4, text="long " * 200)
+        movie_list = MovieList.objects.create(user=self.user, name="Top")
+        MovieListItem.objects.add_many([movie_list.id], ["a", "b"])
+
+    def get(self, view, params, **kwargs):
+        req = self.factory.get("/x", params)
+        force_authenticate(req, user=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = view(req, **kwargs)
+        return resp, [q["sql"] for q in ctx.captured_queries]
+
+    def test_fields_skip_unrequested_columns_and_joins(self):
+        resp, sql = self.get(ReviewListCreateView.as_view(), {"movie_id": "1", "fields": "id,movie_id,rating"})
+        self.assertEqual(resp.data["results"], [{"id": Review.objects.get().id, "movie_id": "1", "rating": 4}])
+        self.assertNotIn('"text"', sql[-1])
+        self.assertNotIn('"reviews_user"', sql[-1].split("WHERE")[0])
+
+        resp, sql = self.get(ReviewListCreateView.as_view(), {"omit": "text,created_at,updated_at"})
+        self.assertEqual(set(resp.data["results"][0]), {"id", "user_id", "user_username", "movie_id", "rating"})
+        self.assertNotIn('"text"', sql[-1])
+
+    def test_nested_fields_and_prefetch_only_when_requested(self):
+        view = MovieListViewSet.as_view({"get": "list"})
+        resp, sql = self.get(view, {"fields": "id,name"})
+        self.assertEqual(resp.data["results"][0], {"id": MovieList.objects.get().id, "name": "Top"})
+        self.assertFalse(any("reviews_movielistitem" in q for q in sql))
+
+        resp, _ = self.get(view, {"fields": "name,items.movie_id"})
+        self.assertEqual(resp.data["results"][0], {"name": "Top", "items": [{"movie_id": "a"}, {"movie_id": "b"}]})
+
+        resp, _ = self.get(UserPublicProfileView.as_view(), {"fields": "username,stats.rating_avg"}, username="alice")
+        self.assertEqual(resp.data, {"username": "alice", "stats": {"rating_avg": 0}})
+
+        Follow.objects.create(from_user=self.user, to_user=self.user2)
+        resp, sql = self.get(FollowingListView.as_view(), {"fields": "username"})
+        self.assertEqual(resp.data, [{"username": "bob"}])
+        self.assertNotIn('"email"', sql[-1])
+
+    def test_unknown_field_is_400_and_writes_are_not_narrowed(self):
+        resp, _ = self.get(ReviewListCreateView.as_view(), {"fields": "id,secret"})
+        self.assertEqual(resp.status_code, 400)
+        resp, _ = self.get(MovieListViewSet.as_view({"get": "list"}), {"omit": "items.nope"})
+        self.assertEqual(resp.status_code, 400)
+
+        req = self.factory.post("/reviews/?fields=id", {"movie_id": "2", "rating": 3}, format="json")
+        force_authenticate(req, user=self.user)
+        resp = ReviewListCreateView.as_view()(req)
+        self.assertEqual((resp.status_code, resp.data["movie_id"]), (201, "2"))
+
+
 class FavouriteTests(BaseAPITestCase):
 
     def test_create_get_or_create_semantics_and_exists(self):
@@ -176,7 +447,7 @@ class FavouriteTests(BaseAPITestCase):
         resp1 = create_view(req1)
         self.assertEqual(resp1.status_code, 200)
         self.assertEqual(resp1.data, {"created": True})
-        self.assertTrue(Favourite.objects.filter(user=self.user, movie_id="777").exists())
+        self.assertTrue(Favourite.objects.filter(user=self.user, movie__external_id="777").exists())
 
         # másodszor created=False
         req2 = self.factory.post("/favourites", {"movie_id": "777"}, format="json")
@@ -193,11 +464,1345 @@ class FavouriteTests(BaseAPITestCase):
         self.assertEqual(resp_ex.data, {"exists": True})
 
     def test_destroy_by_movie_id(self):
-        Favourite.objects.create(user=self.user, movie_id="321")
+        Favourite.objects.create(user=self.user, movie=movie("321"))
         destroy_view = FavouriteViewSet.as_view({"delete": "destroy"})
 
         req = self.factory.delete("/favourites/321")
         force_authenticate(req, user=self.user)
         resp = destroy_view(req, movie_id="321")
         self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertFalse(Favourite.objects.filter(user=self.user, movie_id="321").exists())
+        self.assertFalse(Favourite.objects.filter(user=self.user, movie__external_id="321").exists())
+
+
+class BatchLoaderTests(BaseAPITestCase):
+    def users(self, n):
+        return User.objects.bulk_create([User(username=f"loader_{i}", password="!") for i in range(n)])
+
+    def test_review_list_queries_independent_of_page_size(self):
+        users = self.users(12)
+        for n in (3, 12):
+            Review.objects.all().delete()
+            Review.objects.bulk_create([Review(user=u, movie=movie(f"l{i}"), rating=3)
+                                        for i, u in enumerate(users[:n])])
+            # reviews + userek (IN) + filmek (IN)
+            with self.assertNumQueries(3):
+                data = ReviewSerializer(Review.objects.order_by("id"), many=True).data
+            self.assertEqual(len(data), Review.objects.count())
+        self.assertEqual(data[0]["user_username"], Review.objects.order_by("id")[0].user.username)
+        # select_related: a loader csak memó
+        with self.assertNumQueries(1):
+            ReviewSerializer(Review.objects.select_related("user", "movie"), many=True).data
+
+    def test_follows_share_request_scoped_loader(self):
+        for other in self.users(5):
+            Follow.objects.create(from_user=self.user, to_user=other)
+        request = self.factory.get("/")
+        with self.assertNumQueries(2):
+            data = FollowSerializer(Follow.objects.all(), many=True, context={"request": request}).data
+        self.assertEqual({row["from_user"]["username"] for row in data}, {"alice"})
+        with self.assertNumQueries(1):  # ugyanabban a kérésben a userek már betöltve
+            FollowSerializer(Follow.objects.all(), many=True, context={"request": request}).data
+
+    def test_movie_lists_batch_nested_items(self):
+        for n in range(3):
+            movie_list = MovieList.objects.create(user=self.user if n % 2 else self.user2, name=f"l{n}")
+            MovieListItem.objects.add_many([movie_list.pk], [f"m{n}_{i}" for i in range(4)])
+        # listák + elemek (prefetch) + userek + filmek
+        with self.assertNumQueries(4):
+            data = MovieListSerializer(MovieList.objects.order_by("id").prefetch_related("items"), many=True).data
+        self.assertEqual([item["movie_id"] for item in data[0]["items"]], [f"m0_{i}" for i in range(4)])
+        self.assertEqual(data[0]["user"], "bob")
+
+    def test_bench_counts_queries_past_the_query_log_limit(self):
+        users = self.users(20)
+        for other in users:
+            Follow.objects.create(from_user=self.user, to_user=other)
+
+        def per_row():
+            for follow in Follow.objects.all():
+                follow.to_user.username
+
+        # 21 lekérdezés x 500 > a connection.queries 9000 soros naplója
+        _, _, _, queries = measure("follows, per row", per_row, 500)
+        self.assertEqual(queries, 21)
+
+
+class MovieListItemTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.list1 = MovieList.objects.create(user=self.user, name="Sci-Fi")
+        self.list2 = MovieList.objects.create(user=self.user, name="Comedy")
+        self.bobs = MovieList.objects.create(user=self.user2, name="Bob's")
+
+    def test_add_single_item_and_duplicate(self):
+        view = MovieListItemCreateView.as_view()
+
+        req = self.factory.post("/lists/items", {"movie_id": "603"}, format="json")
+        force_authenticate(req, user=self.user)
+        resp = view(req, list_pk=self.list1.id)
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.data, {"movie_id": "603"})
+
+        req_dup = self.factory.post("/lists/items", {"movie_id": "603"}, format="json")
+        force_authenticate(req_dup, user=self.user)
+        resp_dup = view(req_dup, list_pk=self.list1.id)
+        self.assertEqual(resp_dup.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("already in the list", resp_dup.data["error"])
+        self.assertEqual(MovieListItem.objects.filter(movie_list=self.list1).count(), 1)
+
+    def test_add_to_foreign_list_is_not_found(self):
+        view = MovieListItemCreateView.as_view()
+        req = self.factory.post("/lists/items", {"movie_id": "603"}, format="json")
+        force_authenticate(req, user=self.user2)
+        resp = view(req, list_pk=self.list1.id)
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(MovieListItem.objects.exists())
+
+    def test_bulk_add_reports_duplicates_and_foreign_lists(self):
+        MovieListItem.objects.create(movie_list=self.list1, movie=movie("550"))
+        view = MovieListItemBulkCreateView.as_view()
+        req = self.factory.post(
+            "/lists/bulk-add",
+            {"list_ids": [self.list1.id, self.list2.id, self.bobs.id], "movie_ids": ["550", "603"]},
+            format="json",
+        )
+        force_authenticate(req, user=self.user)
+        # ownership (+ utolsó position) + movie lookup (+ INSERT/SELECT az új "603"-nak)
+        # + meglévő párok + egy INSERT + a ténylegesen beszúrt párok
+        with self.assertNumQueries(7):
+            resp = view(req)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["added"]), 3)
+        self.assertEqual(resp.data["duplicates"], [{"list_id": self.list1.id, "movie_id": "550"}])
+        self.assertEqual(resp.data["missing_lists"], [self.bobs.id])
+        self.assertEqual(MovieListItem.objects.filter(movie_list__user=self.user).count(), 4)
+        self.assertFalse(MovieListItem.objects.filter(movie_list=self.bobs).exists())
+
+    def test_bulk_add_does_not_report_rows_lost_to_a_concurrent_insert(self):
+        racer = MovieListItem(movie_list=self.list1, movie=movie("603"), position="zz")
+        queryset_class = type(MovieListItem.objects.all())
+        bulk_create = queryset_class.bulk_create
+
+        def concurrent(objs, **kwargs):
+            racer.save()  # a másik kérés a SELECT és az INSERT között ért oda
+            return bulk_create(MovieListItem.objects.all(), objs, **kwargs)
+
+        with mock.patch.object(queryset_class, "bulk_create", side_effect=concurrent):
+            added, duplicates = MovieListItem.objects.add_many([self.list1.id, self.list2.id], ["603"])
+        self.assertEqual(added, [(self.list2.id, "603")])
+        self.assertEqual(duplicates, [(self.list1.id, "603")])
+        self.assertEqual(MovieListItem.objects.get(movie_list=self.list1).position, "zz")
+
+
+class MovieListOrderTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.movie_list = MovieList.objects.create(user=self.user, name="Top")
+        MovieListItem.objects.add_many([self.movie_list.id], ["a", "b", "c", "d"])
+
+    def order(self):
+        return list(self.movie_list.items.values_list("movie__external_id", flat=True))
+
+    def move(self, movie_id, after=None, before=None, user=None):
+        req = self.factory.post("/move", {"after": after, "before": before}, format="json")
+        force_authenticate(req, user=user or self.user)
+        return MovieListItemMoveView.as_view()(req, list_pk=self.movie_list.id, movie_id=movie_id)
+
+    def test_appended_items_keep_insertion_order(self):
+        self.assertEqual(self.order(), ["a", "b", "c", "d"])
+
+    def test_move_touches_one_row(self):
+        before = dict(self.movie_list.items.values_list("movie__external_id", "position"))
+        # szomszédok lekérdezése + egy UPDATE
+        with self.assertNumQueries(2):
+            resp = self.move("d", after="a", before="b")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.order(), ["a", "d", "b", "c"])
+        after = dict(self.movie_list.items.values_list("movie__external_id", "position"))
+        self.assertEqual([m for m in after if after[m] != before[m]], ["d"])
+
+        self.assertEqual(self.move("c", before="a").status_code, 200)
+        self.assertEqual(self.order(), ["c", "a", "d", "b"])
+
+    def test_move_rejects_stale_order_and_foreign_user(self):
+        self.assertEqual(self.move("a", after="c", before="b").status_code, 409)
+        self.assertEqual(self.move("a", after="c", user=self.user2).status_code, 404)
+        self.assertEqual(self.order(), ["a", "b", "c", "d"])
+
+    def test_rebalance_command_keeps_order(self):
+        for _ in range(20):
+            items = self.order()
+            self.move(items[-1], after=items[0], before=items[1])
+        expected = self.order()
+        call_command("rebalance_positions", "--max-length", "2", stdout=StringIO())
+        self.assertEqual(self.order(), expected)
+        self.assertTrue(all(len(p) <= 2 for p in self.movie_list.items.values_list("position", flat=True)))
+
+    def test_keys_never_outgrow_the_column(self):
+        longest = 0
+        for _ in range(400):
+            items = self.order()
+            resp = self.move(items[-1], before=items[0])
+            self.assertEqual(resp.status_code, 200)
+            longest = max(longest, len(resp.data["position"]))
+        # a kulcsok elérték a határt (a háttér rebalance itt nem fut), mégsem lépték át
+        self.assertEqual(longest, MovieListItem._meta.get_field("position").max_length)
+        positions = list(self.movie_list.items.values_list("position", flat=True))
+        self.assertLessEqual(max(map(len, positions)), MovieListItem._meta.get_field("position").max_length)
+        self.assertEqual(self.order(), ["a", "b", "c", "d"])
+
+    def test_appending_keeps_keys_short(self):
+        # csak hozzáfűzés (rebalance nélkül): a kulcs hossza logaritmikusan nő
+        view = MovieListItemCreateView.as_view()
+        for batch in range(13):
+            MovieListItem.objects.add_many([self.movie_list.id], [f"m{batch}-{i}" for i in range(100)])
+            req = self.factory.post("/lists/items", {"movie_id": f"single-{batch}"}, format="json")
+            force_authenticate(req, user=self.user)
+            self.assertEqual(view(req, list_pk=self.movie_list.id).status_code, status.HTTP_201_CREATED)
+        positions = list(self.movie_list.items.order_by("id").values_list("position", flat=True))
+        self.assertEqual(len(positions), 1317)
+        self.assertEqual(positions, sorted(set(positions)))  # beszúrási sorrend, ismétlés nélkül
+        self.assertLessEqual(max(map(len, positions)), 8)  # lineáris növekedéssel ~75 lenne
+
+        key = positions[-1]
+        for _ in range(100000):
+            key = key_between(key, None)
+        self.assertEqual(len(key), 8)
+
+    def test_empty_position_is_not_a_dead_end(self):
+        # régi default / admin: ez elé nem fér kulcs, a move előbb rebalance-ol
+        self.movie_list.items.filter(movie__external_id="a").update(position="")
+        resp = self.move("c", before="a")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.order(), ["c", "a", "b", "d"])
+        self.assertNotIn("", self.movie_list.items.values_list("position", flat=True))
+
+    def test_item_saved_without_position_goes_to_the_end(self):
+        item = MovieListItem.objects.create(movie_list=self.movie_list, movie=movie("e"))
+        self.assertNotEqual(item.position, "")
+        self.assertEqual(self.order(), ["a", "b", "c", "d", "e"])
+
+
+class UserStatsTests(BaseAPITestCase):
+    def test_write_paths_keep_counters_and_profile_embeds_them(self):
+        def call(view, method, path, data=None, **kwargs):
+            req = getattr(self.factory, method)(path, data, format="json")
+            force_authenticate(req, user=self.user)
+            return view(req, **kwargs)
+
+        reviews = ReviewListCreateView.as_view()
+        call(reviews, "post", "/reviews", {"movie_id": "1", "rating": 4})
+        call(reviews, "post", "/reviews", {"movie_id": "2", "rating": 3})
+        call(reviews, "post", "/reviews", {"movie_id": "2", "rating": 5})
+        call(FavouriteViewSet.as_view({"post": "create"}), "post", "/favourites", {"movie_id": "1"})
+        call(FavouriteViewSet.as_view({"post": "create"}), "post", "/favourites", {"movie_id": "1"})
+        call(WatchlistViewSet.as_view({"post": "create"}), "post", "/watchlist", {"movie_id": "9"})
+        call(MovieListViewSet.as_view({"post": "create"}), "post", "/lists", {"name": "Top"})
+        call(FollowCreateView.as_view(), "post", "/follow", {"username": "bob"})
+
+        resp = UserPublicProfileView.as_view()(self.factory.get("/users/alice"), username="alice")
+        self.assertEqual(resp.data["stats"], {
+            "reviews_count": 2, "rating_avg": 4.5, "favourites_count": 1, "watchlist_count": 1,
+            "lists_count": 1, "followers_count": 0, "following_count": 1,
+        })
+        self.assertEqual(UserStats.objects.get(user=self.user2).followers_count, 1)
+
+        review_id = Review.objects.get(user=self.user, movie__external_id="1").id
+        call(ReviewRetrieveUpdateDestroyView.as_view(), "delete", "/reviews", pk=review_id)
+        call(UnfollowView.as_view(), "delete", "/unfollow", user_id=self.user2.id)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.reviews_count, stats.rating_sum, stats.following_count), (1, 5, 0))
+        self.assertEqual(UserStats.objects.get(user=self.user2).followers_count, 0)
+
+    def test_review_writes_apply_deltas_without_rescanning_reviews(self):
+        for i in range(5):
+            Review.objects.create(user=self.user, movie=movie(f"old{i}"), rating=1)
+        UserStats.objects.filter(user=self.user).update(reviews_count=5, rating_sum=5)
+
+        def call(view, method, data=None, **kwargs):
+            req = getattr(self.factory, method)("/reviews", data, format="json")
+            force_authenticate(req, user=self.user)
+            with CaptureQueriesContext(connection) as ctx:
+                resp = view(req, **kwargs)
+            self.assertFalse([q["sql"] for q in ctx.captured_queries if "SUM(" in q["sql"].upper()])
+            return resp
+
+        review_id = call(ReviewListCreateView.as_view(), "post", {"movie_id": "1", "rating": 4}).data["id"]
+        call(ReviewListCreateView.as_view(), "post", {"movie_id": "1", "rating": 3})
+        call(ReviewRetrieveUpdateDestroyView.as_view(), "patch", {"rating": 5}, pk=review_id)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.reviews_count, stats.rating_sum), (6, 10))
+
+        call(ReviewRetrieveUpdateDestroyView.as_view(), "delete", pk=review_id)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.reviews_count, stats.rating_sum), (5, 5))
+
+    def test_rebuild_command_repairs_drift(self):
+        Review.objects.create(user=self.user, movie=movie("1"), rating=2)
+        Favourite.objects.create(user=self.user, movie=movie("1"))
+        UserStats.objects.filter(user=self.user).update(reviews_count=7, favourites_count=0)
+        call_command("rebuild_user_stats", stdout=StringIO())
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.reviews_count, stats.rating_sum, stats.favourites_count), (1, 2, 1))
+
+
+class RecordingBroker:
+    """Külső broker (pl. Redis) helyi helyettesítője: csak rögzíti a publish-okat."""
+    published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class LiveUpdateTests(BaseAPITestCase):
+    def post_review(self, movie_id, rating):
+        req = self.factory.post("/reviews", {"movie_id": movie_id, "rating": rating}, format="json")
+        force_authenticate(req, user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return ReviewListCreateView.as_view()(req)
+
+    @override_settings(FILMNERD_LIVE_BROKER="reviews.tests.RecordingBroker")
+    def test_write_publishes_review_and_summary_to_pluggable_broker(self):
+        RecordingBroker.published.clear()
+        self.post_review("42", 4)
+        channel, message = RecordingBroker.published[-1]
+        self.assertEqual(channel, "reviews:42")
+        self.assertEqual(message["type"], "review")
+        self.assertEqual(message["review"]["rating"], 4)
+        self.assertEqual(message["summary"], {"movie_id": "42", "count": 1, "avg": 4})
+
+    def test_in_process_broker_skips_work_without_subscribers(self):
+        with self.assertNumQueries(0):
+            live.publish_review_event("42", "review", {"review": {}})
+
+    async def test_sse_stream_receives_review_after_commit(self):
+        resp = await self.async_client.get("/api/reviews/stream/", {"movie_id": "42"})
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        stream = resp.streaming_content
+        # első chunk után él a feliratkozás
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+
+        await sync_to_async(self.post_review)("42", 5)
+        chunk = (await asyncio.wait_for(anext(stream), 5)).decode()
+        event, data = chunk.strip().split("\n")
+        self.assertEqual(event, "event: review")
+        self.assertEqual(json.loads(data[len("data: "):])["summary"]["count"], 1)
+        await stream.aclose()
+
+    async def test_websocket_receives_events_until_disconnect(self):
+        incoming = asyncio.Queue()
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await incoming.put({"type": "websocket.connect"})
+        task = asyncio.ensure_future(
+            live.websocket_app({"type": "websocket", "path": "/ws/reviews/7/"}, incoming.get, send)
+        )
+        while not live.get_broker().has_subscribers("reviews:7"):
+            await asyncio.sleep(0.01)
+        live.get_broker().publish("reviews:7", {"type": "review_deleted", "id": 1})
+        while len(sent) < 2:
+            await asyncio.sleep(0.01)
+        await incoming.put({"type": "websocket.disconnect"})
+        await asyncio.wait_for(task, 5)
+
+        self.assertEqual(sent[0], {"type": "websocket.accept"})
+        self.assertEqual(json.loads(sent[1]["text"]), {"type": "review_deleted", "id": 1})
+        self.assertFalse(live.get_broker().has_subscribers("reviews:7"))
+        await asyncio.sleep(0)  # a cancel-ek lefutnak
+        self.assertEqual(asyncio.all_tasks(), {asyncio.current_task()})
+
+    async def test_websocket_cancelled_or_failing_send_leaves_nothing_behind(self):
+        for fail in (False, True):
+            incoming = asyncio.Queue()
+            await incoming.put({"type": "websocket.connect"})
+
+            async def send(message):
+                if fail and message["type"] == "websocket.send":
+                    raise OSError("connection reset")
+
+            task = asyncio.ensure_future(
+                live.websocket_app({"type": "websocket", "path": "/ws/reviews/8/"}, incoming.get, send)
+            )
+            while not live.get_broker().has_subscribers("reviews:8"):
+                await asyncio.sleep(0.01)
+            if fail:
+                live.get_broker().publish("reviews:8", {"type": "review_deleted", "id": 1})
+                with self.assertRaises(OSError):
+                    await asyncio.wait_for(task, 5)
+            else:
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+            await asyncio.sleep(0)
+            self.assertFalse(live.get_broker().has_subscribers("reviews:8"))
+            self.assertEqual(asyncio.all_tasks(), {asyncio.current_task()})
+
+
+@override_settings(REPLICA_ROUTING=True)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Primary = a teszt SQLite fájl, replika = egy korábbi pillanatkép róla (replikációs késés)."""
+    databases = "__all__"  # a replica_0 csak setUpClass-ban jön létre
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_path = os.path.join(tempfile.mkdtemp(), "replica.sqlite3")
+        connections.settings["replica_0"] = {
+            **connections.settings["default"], "NAME": cls.replica_path, "TEST": {"MIRROR": None},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica_0"].close()
+        del connections["replica_0"]
+        del connections.settings["replica_0"]
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username="r_alice", password="pass123")
+        self.bob = User.objects.create_user(username="r_bob", password="pass123")
+        self.addCleanup(Movie.objects.filter(external_id__in=["1", "2"]).delete)
+        self.addCleanup(User.objects.filter(pk__in=[self.alice.pk, self.bob.pk]).delete)
+        # pillanatkép: ami ezután a primaryre kerül, azt a replika még nem látja
+        connection.close()
+        with sqlite3.connect(connection.settings_dict["NAME"]) as src, sqlite3.connect(self.replica_path) as dst:
+            src.backup(dst)
+
+    def get(self, user, movie_id):
+        token = RefreshToken.for_user(user).access_token
+        resp = self.client.get("/api/reviews/", {"movie_id": movie_id}, HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()["count"]
+
+    def test_reads_go_to_replica_and_writer_is_pinned_to_primary(self):
+        Review.objects.create(user=self.bob, movie=movie("1"), rating=3)
+        self.assertEqual(Review.objects.using("replica_0").count(), 0)
+        # még nem replikálódott: a replikáról olvasunk
+        self.assertEqual(self.get(self.bob, "1"), 0)
+
+        token = RefreshToken.for_user(self.alice).access_token
+        resp = self.client.post(
+            "/api/reviews/", {"movie_id": "2", "rating": 4},
+            content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(Review.objects.using("replica_0").count(), 0)
+        # az író a saját review-ját látja (primary), más még nem (replika)
+        self.assertEqual(self.get(self.alice, "2"), 1)
+        self.assertEqual(self.get(self.bob, "2"), 0)
+
+    def test_routing_is_off_without_a_shared_cache(self):
+        # LocMem mellett a pin nem látszana a többi workeren: a settings ilyenkor kikapcsolja
+        Review.objects.create(user=self.bob, movie=movie("1"), rating=3)
+        with override_settings(REPLICA_ROUTING=False):
+            self.assertEqual(self.get(self.bob, "1"), 1)
+        self.assertEqual(self.get(self.bob, "1"), 0)
+
+    def test_atomic_blocks_and_writes_stay_on_primary(self):
+        router = ReplicaRouter()
+        token = read_alias.set("replica_0")
+        try:
+            self.assertEqual(router.db_for_read(Review), "replica_0")
+            self.assertEqual(router.db_for_write(Review), "default")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Review), "default")
+        finally:
+            read_alias.reset(token)
+        self.assertEqual(router.db_for_read(Review), "default")
+
+
+class WarmupConnectionTests(TransactionTestCase):
+    def test_db_check_leaves_no_connection_open(self):
+        connection.close()
+        warmup.check_connections()
+        self.assertIsNone(connection.connection)
+
+
+class TunedSqliteTests(TransactionTestCase):
+    """TransactionTestCase: a loadtest a default kapcsolatról készít backupot, nyitott tranzakció nélkül."""
+    def wrapper(self, **options):
+        from .sqlite.base import DatabaseWrapper
+
+        path = os.path.join(tempfile.mkdtemp(), "tuned.sqlite3")
+        settings_dict = {**connection.settings_dict, "NAME": path, "OPTIONS": options}
+        wrapper = DatabaseWrapper(settings_dict, alias="tuned")
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pragmas_and_begin_immediate(self):
+        wrapper = self.wrapper(pragmas={"cache_size": -1000})
+        with wrapper.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA cache_size")
+            self.assertEqual(cursor.fetchone()[0], -1000)
+        # ugyanez fut transaction.atomic() belépésekor
+        with CaptureQueriesContext(wrapper) as queries:
+            wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            wrapper.rollback()
+        self.assertEqual(queries[0]["sql"], "BEGIN IMMEDIATE")
+
+    def test_invalid_transaction_mode(self):
+        with self.assertRaises(ValueError):
+            self.wrapper(transaction_mode="later")
+
+    def test_loadtest_command(self):
+        out = StringIO()
+        call_command("sqlite_loadtest", "--processes", "2", "--seconds", "0.5", "--users", "5", "--movies", "3",
+                     "--profiles", "tuned", stdout=out)
+        self.assertIn("tuned: 0 lock error(s)", out.getvalue())
+
+
+class ConnectionPoolTests(BaseAPITestCase):
+    def wrapper(self, alias, **pool):
+        from .sqlite.base import DatabaseWrapper
+
+        path = os.path.join(tempfile.mkdtemp(), "pooled.sqlite3")
+        settings_dict = {**connection.settings_dict, "NAME": path, "CONN_MAX_AGE": 0, "OPTIONS": {"pool": pool}}
+        self.addCleanup(dbpool.close_pools, alias)
+        return lambda: DatabaseWrapper(settings_dict, alias=alias)
+
+    def test_connection_returns_to_pool_with_its_setup(self):
+        make = self.wrapper("pooled_reuse")
+        first = make()
+        first.ensure_connection()
+        raw = first.connection
+        first.close()  # kérés vége (CONN_MAX_AGE=0): vissza a poolba
+
+        second = make()  # másik szál / következő kérés
+        with second.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+        self.assertIs(second.connection, raw)
+        second.close()
+        stats = dbpool.stats()["pooled_reuse"]
+        self.assertEqual((stats["created"], stats["reused"], stats["idle"], stats["in_use"]), (1, 1, 1, 0))
+
+    def test_dropped_connection_is_replaced_not_raised(self):
+        make = self.wrapper("pooled_health", check_idle=0)
+        first = make()
+        first.ensure_connection()
+        raw = first.connection
+        first.close()
+        raw.close()  # a szerver eldobta, amíg a poolban állt
+
+        second = make()
+        with second.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.assertIsNot(second.connection, raw)
+        second.close()
+        self.assertEqual(dbpool.stats()["pooled_health"]["health_failures"], 1)
+
+    def test_exhausted_pool_waits_then_times_out(self):
+        pool = dbpool.ConnectionPool("bounded", max_size=1, timeout=0.05)
+        conn = pool.getconn(lambda: sqlite3.connect(":memory:"))
+        with self.assertRaises(OperationalError):
+            pool.getconn(lambda: sqlite3.connect(":memory:"))
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(lambda: sqlite3.connect(":memory:")), conn)
+        pool.putconn(conn, broken=True)
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["waits"], stats["timeouts"], stats["closed"]), (0, 1, 1, 1))
+
+    def test_health_endpoint_is_staff_only(self):
+        req = self.factory.get("/health/db/")
+        force_authenticate(req, user=self.user)
+        self.assertEqual(DatabaseHealthView.as_view()(req).status_code, 403)
+
+        self.user.is_staff = True
+        force_authenticate(req, user=self.user)
+        resp = DatabaseHealthView.as_view()(req)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.data["default"]["ok"])
+        self.assertTrue(resp.data["default"]["health_checks"])
+
+
+class StatelessAuthTests(BaseAPITestCase):
+    def authed_get(self, view, path, refresh, **params):
+        req = self.factory.get(path, params, HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        return view(req)
+
+    def test_claims_user_skips_user_lookup(self):
+        Favourite.objects.create(user=self.user, movie=movie("603"))
+        view = FavouriteViewSet.as_view({"get": "exists"})
+        is_active(self.user.pk)  # az aktív állapot TTL-enként egyszer jön a DB-ből
+        with self.assertNumQueries(1):
+            resp = self.authed_get(view, "/favourites/exists", tokens_for(self.user), movie_id="603")
+        self.assertEqual(resp.data, {"exists": True})
+
+    def test_token_without_username_claim_falls_back_to_db(self):
+        view = FavouriteViewSet.as_view({"get": "exists"})
+        with self.assertNumQueries(2):
+            resp = self.authed_get(view, "/favourites/exists", RefreshToken.for_user(self.user), movie_id="1")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_me_loads_full_row_once_then_from_cache(self):
+        cache.clear()
+        is_active(self.user.pk)
+        refresh = tokens_for(self.user)
+        with self.assertNumQueries(1):
+            resp = self.authed_get(MeView.as_view(), "/me", refresh)
+        self.assertEqual(resp.data["email"], "alice@example.com")
+        with self.assertNumQueries(0):
+            resp = self.authed_get(MeView.as_view(), "/me", refresh)
+        self.assertEqual(resp.data["email"], "alice@example.com")
+        self.assertNotIn(self.user.password, repr(cache.get(f"user-row:{self.user.pk}")))
+
+    def test_deactivated_and_deleted_users_lose_access_at_once(self):
+        view = FavouriteViewSet.as_view({"get": "exists"})
+        alice, bob = tokens_for(self.user), tokens_for(self.user2)
+        self.assertEqual(self.authed_get(view, "/favourites/exists", alice, movie_id="1").status_code, 200)
+        self.assertEqual(self.authed_get(view, "/favourites/exists", bob, movie_id="1").status_code, 200)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        revoke([self.user.pk])
+        self.assertEqual(self.authed_get(view, "/favourites/exists", alice, movie_id="1").status_code, 401)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        restore(self.user.pk)
+        self.assertEqual(self.authed_get(view, "/favourites/exists", alice, movie_id="1").status_code, 200)
+
+        deletion.delete_users([self.user2.pk])
+        self.assertEqual(self.authed_get(view, "/favourites/exists", bob, movie_id="1").status_code, 401)
+        cache.delete(f"auth:active:{self.user2.pk}")  # a kulcs kiesett: a törölt sor hiánya dönt
+        self.assertEqual(self.authed_get(view, "/favourites/exists", bob, movie_id="1").status_code, 401)
+
+    def test_bench_command_reports_auth_scenario(self):
+        out = StringIO()
+        call_command("bench", "auth", "--iterations", "2", stdout=out)
+        self.assertIn("StatelessJWTAuthentication", out.getvalue())
+
+
+@override_settings(THROTTLE_BUCKETS={
+    "user_search": {"anon": "1/min", "user": None, "burst": 2},
+    "review_summary": {"anon": "1/hour", "user": "1/hour", "burst": 1},
+})
+class ThrottlingTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def search(self, **extra):
+        return self.client.get("/api/users/search/", {"q": "al"}, **extra)
+
+    def test_anonymous_bucket_per_ip_with_headers(self):
+        first, second, third = self.search(), self.search(), self.search()
+        self.assertEqual([first.status_code, second.status_code, third.status_code], [200, 200, 429])
+        self.assertEqual(first["RateLimit-Limit"], "2")
+        self.assertEqual([first["RateLimit-Remaining"], second["RateLimit-Remaining"]], ["1", "0"])
+        self.assertEqual(third["RateLimit-Remaining"], "0")
+        self.assertTrue(0 < int(third["Retry-After"]) <= 60)
+        # a 429 nem fogyaszt: egy perc múlva újra enged
+        with mock.patch("reviews.throttling.time.time", return_value=time.time() + 61):
+            self.assertEqual(self.search().status_code, 200)
+        self.assertEqual(self.search(REMOTE_ADDR="10.0.0.2").status_code, 200)
+
+    def test_user_rate_none_is_unlimited(self):
+        token = tokens_for(self.user).access_token
+        for _ in range(4):
+            resp = self.search(HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("RateLimit-Limit", resp)
+
+    def test_one_cache_round_trip_per_allowed_request(self):
+        self.search()
+        with count_cache_calls() as counter:
+            resp = self.search()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(counter.total(), 1)
+
+    def test_function_view_scope_and_unscoped_views(self):
+        movie("603")
+        self.assertEqual(self.client.get("/api/reviews/summary/", {"movie_id": "603"}).status_code, 200)
+        self.assertEqual(self.client.get("/api/reviews/summary/", {"movie_id": "603"}).status_code, 429)
+        resp = self.client.get("/api/reviews/", {"movie_id": "603"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("RateLimit-Limit", resp)
+
+
+@override_settings(PUBLIC_CACHE_SECONDS=600)
+class PublicCacheTests(BaseAPITestCase):
+    def auth(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {tokens_for(user).access_token}"}
+
+    def review_count_via(self, backend):
+        with mock.patch.object(public_cache, "cache", backend):
+            return self.client.get("/api/users/alice/reviews/").json()["count"]
+
+    def post_review_via(self, backend, movie_id):
+        with mock.patch.object(public_cache, "cache", backend), self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/reviews/", {"movie_id": movie_id, "rating": 3},
+                             content_type="application/json", **self.auth(self.user))
+
+    def test_write_on_one_worker_invalidates_reads_on_another(self):
+        from django.core.cache.backends.locmem import LocMemCache
+
+        # két worker egy közös cache-en (mint Redis mellett): azonos LOCATION = közös tár
+        worker_a, worker_b = LocMemCache("public-shared", {}), LocMemCache("public-shared", {})
+        self.addCleanup(worker_a.clear)
+        self.assertEqual(self.review_count_via(worker_a), 0)
+        self.post_review_via(worker_b, "603")
+        self.assertEqual(self.review_count_via(worker_a), 1)
+
+        # processzenkénti cache-ek: a másik worker írása nem ér el ide – ezért alapból csak REDIS_URL mellett
+        local_a, local_b = LocMemCache("public-a", {}), LocMemCache("public-b", {})
+        self.addCleanup(local_a.clear)
+        self.addCleanup(local_b.clear)
+        self.assertEqual(self.review_count_via(local_a), 1)
+        self.post_review_via(local_b, "550")
+        self.assertEqual(self.review_count_via(local_a), 1)
+
+    def test_hit_skips_orm_and_writes_invalidate(self):
+        Review.objects.create(user=self.user, movie=movie("603"), rating=4)
+        first = self.client.get("/api/users/alice/reviews/")
+        self.assertEqual(first.json()["count"], 1)
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/users/alice/reviews/")
+        self.assertEqual(again.json(), first.json())
+        # más URL (sparse fields) külön kulcs
+        self.assertEqual(list(self.client.get("/api/users/alice/reviews/", {"fields": "id"}).json()["results"][0]),
+                         ["id"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post("/api/reviews/", {"movie_id": "550", "rating": 5},
+                                    content_type="application/json", **self.auth(self.user))
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(self.client.get("/api/users/alice/reviews/").json()["count"], 2)
+
+    def test_follow_invalidates_both_profiles(self):
+        self.assertEqual(self.client.get("/api/users/bob/").json()["stats"]["followers_count"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/social/follow/", {"username": "bob"},
+                             content_type="application/json", **self.auth(self.user))
+        self.assertEqual(self.client.get("/api/users/bob/").json()["stats"]["followers_count"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/social/unfollow/{self.user2.pk}/", **self.auth(self.user))
+        self.assertEqual(self.client.get("/api/users/bob/").json()["stats"]["followers_count"], 0)
+
+    def test_invalidate_is_one_increment_after_commit(self):
+        self.client.get("/api/users/alice/")
+        before = public_cache.generation("alice")
+        with count_cache_calls() as counter, self.captureOnCommitCallbacks(execute=True):
+            public_cache.invalidate("Alice")
+            self.assertEqual(counter.total(), 0)  # még nincs commit
+        self.assertEqual(counter.total(), 1)
+        self.assertEqual(public_cache.generation("alice"), before + 1)
+
+    @override_settings(PUBLIC_CACHE_SECONDS=0)
+    def test_disabled(self):
+        self.client.get("/api/users/alice/favourites/")
+        with self.assertNumQueries(2):
+            self.client.get("/api/users/alice/favourites/")
+
+
+class WarmupTests(TestCase):
+    def test_warm_up_runs_every_step_and_survives_failures(self):
+        def broken():
+            raise RuntimeError("db down")
+
+        with self.assertLogs("reviews.warmup", "WARNING") as logs:
+            timings = warmup.warm_up(warmup.STEPS + [("broken", broken)])
+        self.assertEqual(list(timings), [label for label, _ in warmup.STEPS] + ["broken"])
+        self.assertIn("warm-up step 'broken' failed", logs.output[0])
+
+        with self.settings(WARMUP_ON_LOAD=False):
+            self.assertIsNone(warmup.warm_up_on_load())
+
+    def test_startup_profile_reports_imports_and_first_response(self):
+        out = StringIO()
+        call_command("startup_profile", "--runs", "1", "--top", "3", stdout=out)
+        output = out.getvalue()
+        self.assertIn("by top-level package", output)
+        self.assertIn("warm-up: urls", output)
+        self.assertEqual(output.count("process start -> first response"), 2)
+
+
+class JobQueueTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        jobs.load_tasks()
+        self.addCleanup(jobs.TASKS.pop, "flaky", None)
+
+        @jobs.task
+        def flaky(fail=False):
+            self.calls.append(fail)
+            if fail:
+                raise RuntimeError("boom")
+
+    def enqueue(self, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue(*args, **kwargs)
+
+    def test_enqueue_after_commit_with_dedupe(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            jobs.enqueue("flaky", dedupe_key="k")
+        self.assertFalse(Job.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.enqueue("flaky", dedupe_key="k")
+        self.assertEqual(Job.objects.count(), 1)
+
+        # futás közben (már nem QUEUED) jöhet új ugyanazzal a kulccsal
+        jobs.claim("w1")
+        self.enqueue("flaky", dedupe_key="k")
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_dedupe_holds_through_claim_and_retry(self):
+        self.enqueue("flaky", {"fail": True}, dedupe_key="k")
+        self.enqueue("flaky", dedupe_key="k")
+        self.assertEqual(Job.objects.get().queued_key, "k")
+        with transaction.atomic(), self.assertRaises(IntegrityError):
+            Job.objects.create(task="flaky", dedupe_key="k", queued_key="k")
+
+        job, = jobs.claim("w1")
+        self.assertIsNone(Job.objects.get(pk=job.pk).queued_key)
+        self.enqueue("flaky", dedupe_key="k")  # futás közben jöhet új
+        with self.assertLogs("reviews.jobs", "ERROR"):
+            jobs.execute(job)
+        # a retry nem kerülhet az új mellé: az elvégzi helyette
+        self.assertEqual(list(Job.objects.values_list("queued_key", "payload")), [("k", {})])
+
+    def test_heartbeat_keeps_long_running_job_leased(self):
+        self.enqueue("flaky")
+        job, = jobs.claim("w1")
+        Job.objects.update(locked_at=timezone.now() - timedelta(seconds=jobs.LEASE_SECONDS + 1))
+        self.assertTrue(jobs.renew(job))
+        self.assertEqual(jobs.claim("w2"), [])
+
+        beats = []
+        jobs.TASKS["flaky"] = lambda fail=False: time.sleep(0.2)
+        with mock.patch.object(jobs, "HEARTBEAT_SECONDS", 0.02), \
+                mock.patch.object(jobs, "renew", side_effect=lambda job: beats.append(job.pk) or True):
+            self.assertTrue(jobs.execute(job))
+        self.assertGreater(len(beats), 2)
+        self.assertEqual(set(beats), {job.pk})
+
+    def test_claim_is_exclusive_and_success_deletes(self):
+        for _ in range(3):
+            self.enqueue("flaky")
+        first, second = jobs.claim("w1", limit=2), jobs.claim("w2", limit=2)
+        self.assertEqual((len(first), len(second)), (2, 1))
+        self.assertFalse({j.pk for j in first} & {j.pk for j in second})
+
+        metrics = jobs.WorkerMetrics()
+        for job in first + second:
+            self.assertTrue(jobs.execute(job))
+            metrics.record(job, True, 0.001)
+        self.assertFalse(Job.objects.exists())
+        self.assertIn("3 succeeded", metrics.report())
+
+    def test_failures_back_off_then_fail_and_stale_leases_are_reclaimed(self):
+        self.enqueue("flaky", {"fail": True}, max_attempts=2)
+        metrics = jobs.WorkerMetrics()
+        with self.assertLogs("reviews.jobs", "ERROR"):
+            self.assertEqual(jobs.work("w1", metrics), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("boom", job.last_error)
+        self.assertEqual(jobs.claim("w1"), [])
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs("reviews.jobs", "ERROR"):
+            jobs.work("w1", metrics)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+        self.assertEqual(self.calls, [True, True])
+
+        # elhalt worker: a lejárt lease-ű RUNNING jobot más felveszi
+        Job.objects.update(status=Job.RUNNING, locked_by="dead",
+                           locked_at=timezone.now() - timedelta(seconds=jobs.LEASE_SECONDS + 1))
+        self.assertEqual([j.locked_by for j in jobs.claim("w2")], ["w2"])
+
+    def test_periodic_task_is_rescheduled_after_each_run(self):
+        jobs.PERIODIC["flaky"] = 60
+        self.addCleanup(jobs.PERIODIC.pop, "flaky", None)
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.schedule_periodic()
+            jobs.schedule_periodic()
+        self.assertEqual(Job.objects.filter(task="flaky").count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.work("w1", jobs.WorkerMetrics())
+        job = Job.objects.get(task="flaky")
+        self.assertEqual((job.status, job.dedupe_key), (Job.QUEUED, "periodic:flaky"))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(self.calls, [False])
+
+    def test_long_position_key_enqueues_one_rebalance(self):
+        movie_list = MovieList.objects.create(user=self.user, name="Top")
+        MovieListItem.objects.add_many([movie_list.id], ["a", "b", "c"])
+        view = MovieListItemMoveView.as_view()
+        with self.captureOnCommitCallbacks(execute=True), mock.patch("reviews.views.REBALANCE_KEY_LENGTH", 3):
+            for _ in range(20):
+                order = list(movie_list.items.values_list("movie__external_id", flat=True))
+                req = self.factory.post("/move", {"after": order[0], "before": order[1]}, format="json")
+                force_authenticate(req, user=self.user)
+                view(req, list_pk=movie_list.id, movie_id=order[-1])
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.payload), ("rebalance_list", {"movie_list_id": movie_list.id}))
+
+        expected = list(movie_list.items.values_list("movie__external_id", flat=True))
+        jobs.work("w1", jobs.WorkerMetrics())
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(list(movie_list.items.values_list("movie__external_id", flat=True)), expected)
+        self.assertTrue(all(len(p) <= 2 for p in movie_list.items.values_list("position", flat=True)))
+
+
+class AdminTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username="root", email="root@example.com", password="x")
+        self.client.force_login(self.admin)
+        for movie_id in ("603", "550", "13"):
+            Review.objects.create(user=self.user, movie=movie(movie_id), rating=4)
+
+    def test_every_changelist_renders_with_search_in_constant_queries(self):
+        from django.contrib import admin
+
+        for model in admin.site._registry:
+            url = f"/admin/{model._meta.app_label}/{model._meta.model_name}/"
+            with self.subTest(model=model.__name__):
+                # session + user + lista + lapozó COUNT (+ szűrők), soronként semmi
+                with CaptureQueriesContext(connection) as ctx:
+                    resp = self.client.get(url, {"q": "al"})
+                self.assertEqual(resp.status_code, 200)
+                self.assertLessEqual(len(ctx.captured_queries), 6)
+        resp = self.client.get("/admin/reviews/review/", {"q": "603", "rating": "4"})
+        self.assertEqual(len(resp.context["cl"].result_list), 1)
+
+    def test_paginator_uses_table_statistics_when_unfiltered(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE reviews_review")
+        Review.objects.create(user=self.user2, movie=movie("603"), rating=2)
+        paginator = type("Paginator", (EstimatedCountPaginator,), {"exact_below": 1})
+
+        self.assertEqual(paginator(Review.objects.all(), 50).count, 3)  # ANALYZE pillanatképe
+        self.assertEqual(paginator(Review.objects.filter(rating__lt=3), 50).count, 1)
+        self.assertEqual(EstimatedCountPaginator(Review.objects.all(), 50).count, 4)
+
+
+class ProfilingTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.staff = User.objects.create_user(username="ops", password="x", is_staff=True)
+        MovieList.objects.create(user=self.user, name="Top")
+
+    def get(self, user, **extra):
+        token = tokens_for(user).access_token
+        return self.client.get("/api/users/alice/lists/", HTTP_AUTHORIZATION=f"Bearer {token}", **extra)
+
+    def test_staff_request_is_profiled_with_sql_origins_and_downloadable(self):
+        resp = self.get(self.staff, HTTP_X_PROFILE="1")
+        self.assertEqual(resp.status_code, 200)
+        report = ProfileReport.objects.get(pk=resp["X-Profile-Id"])
+        self.assertEqual((report.user, report.path, report.status_code), (self.staff, "/api/users/alice/lists/", 200))
+        self.assertEqual(report.sql_count, len(report.sql_log))
+        self.assertTrue(any("reviews_movielist" in q["sql"] for q in report.sql_log))
+        self.assertTrue(any(o.startswith("reviews/views.py:") for q in report.sql_log for o in q["origin"]))
+
+        self.client.force_login(self.staff)
+        User.objects.filter(pk=self.staff.pk).update(is_superuser=True)
+        resp = self.client.get(f"/admin/reviews/profilereport/{report.pk}/sql/")
+        self.assertEqual(json.loads(resp.content), report.sql_log)
+        resp = self.client.get(f"/admin/reviews/profilereport/{report.pk}/collapsed/")
+        self.assertIn("attachment", resp["Content-Disposition"])
+
+    def test_non_staff_switch_is_ignored_and_staff_is_rate_limited(self):
+        resp = self.get(self.user, HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile-Id", resp)
+        self.assertFalse(ProfileReport.objects.exists())
+
+        with self.settings(PROFILING_MAX_PER_HOUR=1):
+            self.assertIn("X-Profile-Id", self.get(self.staff, QUERY_STRING="profile=1"))
+            resp = self.get(self.staff, QUERY_STRING="profile=1")
+        self.assertEqual((resp.status_code, resp["X-Profile"]), (200, "rate-limited"))
+        self.assertEqual(ProfileReport.objects.count(), 1)
+
+    def test_busy_lock_does_not_use_up_the_quota(self):
+        with self.settings(PROFILING_MAX_PER_HOUR=1):
+            self.assertTrue(profiling._busy.acquire(blocking=False))  # egy másik kérés épp profiloz
+            try:
+                resp = self.get(self.staff, HTTP_X_PROFILE="1")
+            finally:
+                profiling._busy.release()
+            self.assertEqual((resp.status_code, resp["X-Profile"]), (200, "busy"))
+            self.assertIn("X-Profile-Id", self.get(self.staff, HTTP_X_PROFILE="1"))
+
+    def test_sampler_collects_collapsed_stacks_of_another_thread(self):
+        def busy_loop(seconds):
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                pass
+
+        with profiling.Sampler(threading.get_ident(), interval=0.001) as sampler:
+            busy_loop(0.1)
+        self.assertGreater(sum(sampler.stacks.values()), 0)
+        stack, count = sampler.collapsed().splitlines()[0].rsplit(" ", 1)
+        self.assertIn("busy_loop (reviews/tests.py:", stack.split(";")[-1])
+        self.assertGreater(int(count), 0)
+
+
+class DeleteUsersTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.carol = User.objects.create_user(username="carol", email="carol@example.com", password="x")
+        movies = [movie(str(n)) for n in range(5)]
+        Review.objects.bulk_create([Review(user=self.carol, movie=m, rating=3) for m in movies])
+        Favourite.objects.bulk_create([Favourite(user=self.carol, movie=m) for m in movies[:3]])
+        Watchlist.objects.create(user=self.carol, movie=movies[4])
+        movie_list = MovieList.objects.create(user=self.carol, name="Mine")
+        MovieListItem.objects.add_many([movie_list.id], ["0", "1", "2"])
+        Follow.objects.create(from_user=self.user, to_user=self.carol)
+        Follow.objects.create(from_user=self.carol, to_user=self.user2)
+        Follow.objects.create(from_user=self.user2, to_user=self.user)
+        call_command("rebuild_user_stats", stdout=StringIO())
+
+    def counters(self):
+        return list(UserStats.objects.order_by("user_id").values_list("followers_count", "following_count"))
+
+    def test_command_deletes_in_chunks_and_keeps_counters(self):
+        out = StringIO()
+        call_command("delete_users", "carol", "--chunk-size", "2", "--noinput", stdout=out)
+        self.assertIn("  reviews: 4\n  reviews: 5\n", out.getvalue())
+        self.assertIn("1 user(s) deleted", out.getvalue())
+
+        self.assertFalse(User.objects.filter(username="carol").exists())
+        for model in (Review, Favourite, Watchlist, MovieList, MovieListItem):
+            self.assertFalse(model.objects.exists(), model.__name__)
+        self.assertEqual(Follow.objects.count(), 1)
+        live = self.counters()
+        call_command("rebuild_user_stats", stdout=StringIO())
+        self.assertEqual(live, self.counters())
+        self.assertEqual(live, [(1, 0), (0, 1)])
+
+    def test_admin_action_deactivates_and_queues_job(self):
+        admin_user = User.objects.create_superuser(username="root", email="root@example.com", password="x")
+        self.client.force_login(admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(
+                "/admin/reviews/user/", {"action": "delete_in_chunks", "_selected_action": [self.carol.pk]}
+            )
+        self.assertEqual(resp.status_code, 302)
+        self.carol.refresh_from_db()
+        self.assertFalse(self.carol.is_active)
+        self.assertEqual(Job.objects.get().payload, {"user_ids": [self.carol.pk]})
+
+        jobs.load_tasks()
+        jobs.work("w1", jobs.WorkerMetrics())
+        self.assertFalse(User.objects.filter(pk=self.carol.pk).exists())
+
+
+LETTERBOXD_RATINGS = """Date,Name,Year,Letterboxd URI,Rating
+2023-01-02,The Matrix,1999,https://boxd.it/1,4.5
+2023-01-03,Fight Club,1999,https://boxd.it/2,0.5
+2023-01-04,Unknown Film,2001,https://boxd.it/3,3
+2023-01-05,Forrest Gump,1994,https://boxd.it/4,eleven
+2023-01-06,The Matrix,1999,https://boxd.it/1,5
+"""
+
+IMDB_WATCHLIST = """Position,Const,Created,Modified,Description,Title,URL,Title Type,Year
+1,tt0110912,2022-05-01,2022-05-01,,Pulp Fiction,https://imdb.com/title/tt0110912/,movie,1994
+2,tt0000000,2022-05-02,2022-05-02,,Se7en,https://imdb.com/title/tt0000000/,movie,1995
+3,tt9999999,2022-05-03,2022-05-03,,Nope,https://imdb.com/title/tt9999999/,movie,2022
+"""
+
+
+class CsvImportTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def test_upload_is_processed_by_worker_and_status_is_pollable(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        Watchlist.objects.create(user=self.user, movie=movie("603"))
+        upload = SimpleUploadedFile("ratings.csv", LETTERBOXD_RATINGS.encode("utf-8-sig"), "text/csv")
+        req = self.factory.post("/imports/", {"file": upload, "kind": "ratings"}, format="multipart")
+        force_authenticate(req, user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = CsvImportViewSet.as_view({"post": "create"})(req)
+        self.assertEqual((resp.status_code, resp.data["status"]), (202, "pending"))
+
+        jobs.load_tasks()
+        jobs.work("w1", jobs.WorkerMetrics())
+        req = self.factory.get("/imports/")
+        force_authenticate(req, user=self.user)
+        data = CsvImportViewSet.as_view({"get": "retrieve"})(req, pk=resp.data["id"]).data
+        self.assertEqual((data["status"], data["source"]), ("done", "letterboxd"))
+        self.assertEqual((data["rows_processed"], data["created_count"], data["error_count"]), (5, 2, 2))
+        self.assertEqual([e["line"] for e in data["errors"]], [4, 5])
+
+        ratings = dict(Review.objects.filter(user=self.user).values_list("movie__external_id", "rating"))
+        self.assertEqual(ratings, {"603": 5.0, "550": 1.0})  # ismétlésnél az utolsó, 0.5 -> 1
+        self.assertFalse(Watchlist.objects.filter(user=self.user).exists())
+        self.assertEqual(UserStats.objects.get(user=self.user).reviews_count, 2)
+
+        req = self.factory.get("/imports/")
+        force_authenticate(req, user=self.user2)
+        self.assertEqual(CsvImportViewSet.as_view({"get": "retrieve"})(req, pk=resp.data["id"]).status_code, 404)
+
+    def test_bad_byte_fails_the_import_at_its_line_and_drops_the_file(self):
+        from django.core.files.storage import default_storage
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        lines = LETTERBOXD_RATINGS.encode("utf-8-sig").splitlines(keepends=True)
+        content = b"".join(lines[:3]) + b"2024-01-09,Bad \xff Row,1999,,4\n" + b"".join(lines[3:])
+        with self.captureOnCommitCallbacks(execute=True):
+            csv_import = imports.start_upload(self.user, "ratings", SimpleUploadedFile("ratings.csv", content))
+        jobs.load_tasks()
+        self.assertEqual(jobs.work("w1", jobs.WorkerMetrics()), 1)
+
+        csv_import.refresh_from_db()
+        self.assertEqual(csv_import.status, CsvImport.FAILED)
+        self.assertEqual(csv_import.errors[-1]["line"], 4)
+        self.assertIn("utf-8", csv_import.errors[-1]["error"])
+        self.assertIsNotNone(csv_import.finished_at)
+        self.assertFalse(default_storage.exists(csv_import.file_name))
+        self.assertFalse(Job.objects.exists())  # nincs retry
+
+        with self.assertRaises(imports.CsvReadError) as ctx:
+            list(imports.parse(StringIO("Name,Year\na,1\n" + "x" * 200000 + ",1\n"))[1])
+        self.assertEqual(ctx.exception.line, 3)  # field larger than field limit
+
+    def test_command_imports_imdb_watchlist_idempotently_in_chunks(self):
+        path = os.path.join(tempfile.mkdtemp(), "watchlist.csv")
+        self.addCleanup(os.remove, path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(IMDB_WATCHLIST)
+
+        out = StringIO()
+        call_command("import_csv", "alice", path, "--kind", "watchlist", "--chunk-size", "2", stdout=out)
+        # az IMDb id ismeretlen, de a cím + év egyértelmű
+        self.assertIn("2 created, 0 updated, 1 errors", out.getvalue())
+        self.assertIn("  2 rows, 0 errors\n  3 rows, 1 errors\n", out.getvalue())
+        call_command("import_csv", "alice", path, "--kind", "watchlist", stdout=out)
+        self.assertEqual(
+            sorted(Watchlist.objects.filter(user=self.user).values_list("movie__external_id", flat=True)),
+            ["680", "807"],
+        )
+
+
+class CompatibilityTests(BaseAPITestCase):
+    ALICE = [5, 4, 1, 3, 2, 5]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.carol = User.objects.create_user(username="carol", password="x")
+        movies = [movie(str(n)) for n in range(7)]
+        ratings = {self.user: self.ALICE, self.user2: [4, 5, 2, 3, 1, 4], self.carol: [1, 2, 5, 3, 4]}
+        for user, values in ratings.items():
+            Review.objects.bulk_create([Review(user=user, movie=m, rating=r) for m, r in zip(movies, values)])
+        Review.objects.create(user=self.carol, movie=movies[6], rating=5)  # nem közös
+        Follow.objects.create(from_user=self.user, to_user=self.user2)
+        Follow.objects.create(from_user=self.user, to_user=self.carol)
+
+    def expected(self, theirs):
+        import numpy as np
+
+        mine = self.ALICE[:len(theirs)]
+        n = len(theirs)
+        return float(np.corrcoef(mine, theirs)[0, 1]) * n / (n + compatibility.SHRINKAGE)
+
+    def test_vectorized_pearson_with_shrinkage_and_symmetric_cache(self):
+        with self.assertNumQueries(1):
+            result = compatibility.compare(self.user.pk, self.user2.pk)
+        self.assertAlmostEqual(result["score"], self.expected([4, 5, 2, 3, 1, 4]), places=3)
+        self.assertEqual(result["overlap"], 6)
+        with self.assertNumQueries(0):
+            self.assertEqual(compatibility.compare(self.user2.pk, self.user.pk), result)
+
+        cosine = compatibility.compare(self.user.pk, self.carol.pk, "cosine")
+        self.assertLess(cosine["score"], 0)
+        self.assertEqual(cosine["overlap"], 5)
+
+    def test_uncorrelated_or_opposite_taste_is_zero_agreement(self):
+        dave = User.objects.create_user(username="dave", password="x")
+        Review.objects.bulk_create([
+            Review(user=dave, movie=movie(str(n)), rating=r) for n, r in enumerate([1, 1, 1, 2, 2, 2])
+        ])
+        uncorrelated = compatibility.compare(self.user.pk, dave.pk)
+        self.assertAlmostEqual(uncorrelated["score"], 0)
+        self.assertEqual(uncorrelated["agreement"], 0)
+
+        opposite = compatibility.compare(self.user.pk, self.carol.pk)
+        self.assertLess(opposite["score"], 0)
+        self.assertEqual(opposite["agreement"], 0)
+        agreeing = compatibility.compare(self.user.pk, self.user2.pk)
+        self.assertEqual(agreeing["agreement"], round(agreeing["score"] * 100))
+
+    def test_mutual_pairs_of_a_range_in_one_query(self):
+        Follow.objects.bulk_create([Follow(from_user=self.user2, to_user=self.user),
+                                    Follow(from_user=self.carol, to_user=self.user)])
+        with self.assertNumQueries(1):
+            results = compatibility.compare_mutual(self.user.pk, self.carol.pk + 1)
+        self.assertEqual(results, {
+            self.user.pk: compatibility.compare_many(self.user.pk, [self.user2.pk, self.carol.pk]),
+            self.user2.pk: compatibility.compare_many(self.user2.pk, [self.user.pk]),
+            self.carol.pk: compatibility.compare_many(self.carol.pk, [self.user.pk]),
+        })
+
+    def test_new_review_invalidates_and_batch_ranks_followings(self):
+        req = self.factory.get("/social/compatibility/")
+        force_authenticate(req, user=self.user)
+        with self.assertNumQueries(3):  # followings + a menet + userek
+            ranked = FollowingCompatibilityView.as_view()(req).data
+        self.assertEqual([r["user"]["username"] for r in ranked], ["bob", "carol"])
+        self.assertAlmostEqual(ranked[1]["score"], self.expected([1, 2, 5, 3, 4]), places=3)
+
+        req = self.factory.post("/reviews/", {"movie_id": "6", "rating": 5}, format="json")
+        force_authenticate(req, user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            ReviewListCreateView.as_view()(req)
+
+        req = self.factory.get("/compat/")
+        force_authenticate(req, user=self.user)
+        data = UserCompatibilityView.as_view()(req, username="carol").data
+        self.assertEqual((data["username"], data["overlap"]), ("carol", 6))
+        self.assertEqual(UserCompatibilityView.as_view()(req, username="alice").status_code, 400)
+
+
+class SuggestionTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        carol, dave, erin, frank = (User.objects.create_user(username=n, password="x")
+                                    for n in ("carol", "dave", "erin", "frank"))
+        self.carol, self.dave, self.erin, self.frank = carol, dave, erin, frank
+        # alice -> bob, carol; bob -> dave, erin, alice; carol -> dave, bob; dave -> frank
+        Follow.objects.bulk_create([
+            Follow(from_user=a, to_user=b) for a, b in [
+                (self.user, self.user2), (self.user, carol), (self.user2, dave), (self.user2, erin),
+                (self.user2, self.user), (carol, dave), (carol, self.user2), (dave, frank),
+            ]
+        ])
+
+    def test_csr_second_degree_counts_mutuals_without_self_or_followed(self):
+        graph = suggestions.FollowGraph.load()
+        index = {int(u): i for i, u in enumerate(graph.user_ids)}
+        candidates, mutual = graph.second_degree(index[self.user.pk])
+        found = {int(graph.user_ids[c]): int(m) for c, m in zip(candidates, mutual)}
+        self.assertEqual(found, {self.dave.pk: 2, self.erin.pk: 1})
+
+    def test_build_ranks_by_mutuals_and_taste_and_endpoint_skips_new_follows(self):
+        movies = [movie(str(n)) for n in range(5)]
+        ratings = {self.user: [5, 4, 3, 2, 1], self.erin: [5, 4, 3, 2, 1], self.dave: [1, 2, 3, 4, 5]}
+        for user, values in ratings.items():
+            Review.objects.bulk_create([Review(user=user, movie=m, rating=r) for m, r in zip(movies, values)])
+        FollowSuggestion.objects.create(user=self.frank, suggested=self.user, mutual_count=1, score=1)  # elavult
+
+        call_command("build_suggestions", stdout=StringIO())
+        self.assertFalse(FollowSuggestion.objects.filter(user=self.frank).exists())
+        rows = list(FollowSuggestion.objects.filter(user=self.user).values_list("suggested__username", "mutual_count"))
+        # erinnel 1 közös kapcsolat, de nagyon egyezik az ízlésünk; dave 2 közös, de ellentétes ízlés
+        self.assertEqual(rows, [("erin", 1), ("dave", 2)])
+
+        req = self.factory.get("/social/suggestions/")
+        force_authenticate(req, user=self.user)
+        with self.assertNumQueries(1):
+            data = FollowSuggestionsView.as_view()(req).data
+        self.assertEqual([r["user"]["username"] for r in data], ["erin", "dave"])
+        self.assertGreater(data[0]["taste"], 0)
+
+        Follow.objects.create(from_user=self.user, to_user=self.erin)
+        data = FollowSuggestionsView.as_view()(req).data
+        self.assertEqual([r["user"]["username"] for r in data], ["dave"])
+
+
+class WrappedTests(BaseAPITestCase):
+    def at(self, year, month):
+        return timezone.make_aware(datetime.datetime(year, month, 10, 12))
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(cache.clear)
+        self.carol = User.objects.create_user(username="carol", password="x")
+        movies = [movie(str(n)) for n in range(4)]
+        Review.objects.bulk_create([
+            Review(user=self.user, movie=movies[0], rating=5, created_at=self.at(2024, 1)),
+            Review(user=self.user, movie=movies[1], rating=4, created_at=self.at(2024, 3)),
+            Review(user=self.user, movie=movies[2], rating=1.5, created_at=self.at(2024, 3)),
+            Review(user=self.user, movie=movies[3], rating=3, created_at=self.at(2023, 12)),  # előző év
+            Review(user=self.user2, movie=movies[0], rating=5, created_at=self.at(2024, 2)),
+            Review(user=self.user2, movie=movies[1], rating=4, created_at=self.at(2024, 2)),
+            Review(user=self.user2, movie=movies[2], rating=2, created_at=self.at(2023, 5)),
+            Review(user=self.carol, movie=movies[0], rating=1, created_at=self.at(2023, 5)),
+        ])
+        Favourite.objects.create(user=self.user, movie=movies[0], created_at=self.at(2024, 3))
+        Watchlist.objects.create(user=self.user, movie=movies[3], created_at=None)  # migráció előtti: kimarad
+        item = MovieListItem.objects.create(movie_list=MovieList.objects.create(user=self.user, name="L"),
+                                            movie=movies[1])
+        MovieListItem.objects.filter(pk=item.pk).update(added_at=self.at(2024, 6))
+        # alice <-> bob kölcsönös, alice -> carol nem
+        Follow.objects.bulk_create([Follow(from_user=self.user, to_user=self.user2),
+                                    Follow(from_user=self.user2, to_user=self.user),
+                                    Follow(from_user=self.user, to_user=self.carol)])
+
+    def test_ranges_cover_every_user_and_build_in_shards(self):
+        shards = wrapped.ranges(shard_size=2)
+        self.assertEqual(shards[0][0], self.user.pk)
+        self.assertEqual(shards[-1][1], self.carol.pk + 1)
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(shards, shards[1:])))
+
+        YearInReview.objects.create(user=self.carol, year=2024, data={})  # elavult: carolnak nincs 2024-es sora
+        call_command("build_wrapped", "2024", "--inline", "--shard-size", "1", stdout=StringIO())
+        self.assertEqual(set(YearInReview.objects.values_list("user__username", flat=True)), {"alice", "bob"})
+
+        data = YearInReview.objects.get(user=self.user, year=2024).data
+        self.assertEqual((data["films_rated"], data["rating_avg"]), (3, 3.5))
+        self.assertEqual({k: v for k, v in data["rating_distribution"].items() if v}, {"1.5": 1, "4": 1, "5": 1})
+        self.assertEqual((data["favourites_added"], data["watchlist_added"], data["list_adds"]), (1, 0, 1))
+        self.assertEqual(data["monthly_activity"], [1, 0, 3, 0, 0, 1, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(data["most_active_month"], 3)
+        self.assertEqual([f["user_id"] for f in data["most_compatible_friends"]], [self.user2.pk])
+        self.assertEqual(data["most_compatible_friends"][0]["overlap"], 3)
+
+    def test_friends_of_the_whole_range_in_one_query(self):
+        for i in range(5):
+            friend = User.objects.create_user(username=f"friend{i}", password="x")
+            Review.objects.create(user=friend, movie=movie("0"), rating=5, created_at=self.at(2024, 4))
+            Follow.objects.bulk_create([Follow(from_user=friend, to_user=self.user),
+                                        Follow(from_user=self.user, to_user=friend)])
+        lo, hi = wrapped.ranges(shard_size=100)[0]
+        with self.assertNumQueries(5):  # review-k + 3 forrás + minden barát pár egy menetben
+            snapshots = wrapped.compute(2024, lo, hi)
+        self.assertEqual(len(snapshots), 7)
+        self.assertEqual(snapshots[self.user.pk]["most_compatible_friends"][0]["user_id"], self.user2.pk)
+
+    def test_schedule_queues_one_job_per_range(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            shards = wrapped.schedule(2024, shard_size=2)
+            wrapped.schedule(2024, shard_size=2)  # dedupe: nem duplázódik
+        self.assertEqual(Job.objects.filter(task="build_wrapped").count(), len(shards))
+        jobs.load_tasks()
+        # két worker, mindegyik a saját tartományait
+        first, second = jobs.claim("w1", limit=1), jobs.claim("w2", limit=len(shards))
+        self.assertEqual(len(first) + len(second), len(shards))
+        self.assertTrue(all(jobs.execute(job) for job in first + second))
+        self.assertEqual(YearInReview.objects.filter(year=2024).count(), 2)
+
+    def test_endpoint_reads_one_row_and_drops_deleted_friends(self):
+        wrapped.build_range(2024, self.user.pk, self.carol.pk + 1)
+        view = UserWrappedView.as_view()
+        req = self.factory.get("/users/alice/wrapped/2024/")
+        with self.assertNumQueries(2):
+            resp = view(req, username="alice", year=2024)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["films_rated"], 3)
+        self.assertEqual([f["username"] for f in resp.data["most_compatible_friends"]], ["bob"])
+
+        User.objects.filter(pk=self.user2.pk).update(is_active=False)
+        self.assertEqual(view(req, username="alice", year=2024).data["most_compatible_friends"], [])
+        self.assertEqual(view(req, username="alice", year=2023).status_code, 404)
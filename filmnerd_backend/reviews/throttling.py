@@ -0,0 +1,113 @@
+"""
+Token bucket throttling a drága publikus végpontokra, a közös cache-ben.
+
+A view `throttle_scope`-ja választja a vödröt (THROTTLE_BUCKETS, a
+DEFAULT_BUCKETS-et scope-onként felülírva); bejelentkezett usernél a user
+id, egyébként az IP (DRF get_ident, NUM_PROXIES) a kulcs. Scope nélküli
+view-n a throttle nem csinál semmit.
+
+Az algoritmus GCRA, ami egyenértékű a token buckettel: vödrönként egyetlen
+egész szám, a "theoretical arrival time" (TAT, ms). Egy kérés:
+`incr(kulcs, T)`, ahol T = két token közti idő. Ha az eredmény
+`now + burst * T` fölött van, a vödör üres (a kérés 429, az incr
+visszacsinálva). A pontos GCRA `max(TAT, now) + T`-t tárolna, de az incr
+nem tud max-ot: a now mögött lemaradó TAT-ot csak akkor állítjuk
+`now + T`-re (set), ha a lemaradás nagyobb egy burstnyi időnél (vagy nincs
+kulcs). Az engedett kérés így egy cache round trip; a második csak
+elutasításnál és hosszabb üresjárat utáni első kérésnél kell. Ára: a
+lemaradás miatt egy kliens egyben legfeljebb 2 * burst kérést kaphat; az
+átlagos ráta így is tartva.
+
+A kulcs KEY_TTL után lejár (az incr nem frissíti): egy folyamatosan
+terhelő kliens így óránként legfeljebb egy extra burstöt kap.
+
+Válaszfejlécek: RateLimit-Limit (burst), RateLimit-Remaining,
+RateLimit-Reset (mp, amíg a vödör újra tele); 429-nél Retry-After (DRF).
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_BUCKETS = {
+    # scope: {"anon": IP-nkénti ráta, "user": useronkénti ráta, "burst": vödör méret}; None = nincs limit
+    "user_search": {"anon": "30/min", "user": "120/min", "burst": 10},
+    "review_summary": {"anon": "120/min", "user": "600/min", "burst": 30},
+    "public_user": {"anon": "60/min", "user": "300/min", "burst": 20},
+}
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+KEY_TTL = 3600
+
+
+def parse_rate(rate):
+    """"30/min" -> két token közti idő ms-ban (legalább 1)."""
+    count, period = rate.split("/")
+    return max(PERIODS[period] * 1000 // int(count), 1)
+
+
+def bucket(scope):
+    return {**DEFAULT_BUCKETS, **getattr(settings, "THROTTLE_BUCKETS", {})}.get(scope)
+
+
+def _incr(key, delta):
+    """
+    Atomikus incr egy round trippel. A Django RedisCache.incr előtte EXISTS-et
+    is küld, ezért ott közvetlenül INCRBY (hiányzó kulcsnál delta-t ad, amit a
+    hívó üres vödörként kezel); máshol hiányzó kulcsnál ugyanígy delta.
+    """
+    from django.core.cache.backends.redis import RedisCacheClient
+
+    client = getattr(cache, "_cache", None)
+    if isinstance(client, RedisCacheClient):
+        raw_key = cache.make_and_validate_key(key)
+        return client.get_client(raw_key, write=True).incrby(raw_key, delta)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        return delta
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    @classmethod
+    def scoped(cls, scope):
+        """Function view-khoz (@throttle_classes), ahol nincs throttle_scope attribútum."""
+        return type(f"{cls.__name__}_{scope}", (cls,), {"scope": scope})
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", self.scope)
+        config = bucket(scope)
+        if config is None:
+            return True
+        user = request.user
+        if user is not None and user.is_authenticated:
+            rate, ident = config.get("user"), f"user:{user.pk}"
+        else:
+            rate, ident = config.get("anon"), f"ip:{self.get_ident(request)}"
+        if rate is None:
+            return True
+
+        interval, burst = parse_rate(rate), config.get("burst", 1)
+        key = f"throttle:{scope}:{ident}"
+        now = int(time.time() * 1000)
+        tat = _incr(key, interval)
+        if tat < now - burst * interval:
+            tat = now + interval
+            cache.set(key, tat, max(KEY_TTL, math.ceil(burst * interval / 1000)))
+        allowed = tat <= now + burst * interval
+        if not allowed:
+            _incr(key, -interval)
+            self.retry_after = (tat - now - burst * interval) / 1000
+            tat -= interval
+        view.headers.update({
+            "RateLimit-Limit": str(burst),
+            "RateLimit-Remaining": str(min((now + burst * interval - tat) // interval, burst)),
+            "RateLimit-Reset": str(max(math.ceil((tat - now) / 1000), 0)),
+        })
+        return allowed
+
+    def wait(self):
+        return self.retry_after
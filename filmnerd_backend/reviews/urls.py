@@ -6,12 +6,17 @@ from .views import (
     UserWatchlistView,
     WatchlistViewSet,
     review_summary,
+    review_stream,
+    MovieTimeseriesView,
+    DatabaseHealthView,
     LoginView,
     RegisterView,
     MeView,
     FavouriteViewSet,
     MovieListItemCreateView,
+    MovieListItemBulkCreateView,
     MovieListItemDestroyView,
+    MovieListItemMoveView,
     MovieListViewSet,
     FollowCreateView,
     UnfollowView,
@@ -23,11 +28,17 @@ from .views import (
     UserListsView,
     UserFavouritesView,
     UserReviewsView,
+    UserWrappedView,
+    CsvImportViewSet,
+    UserCompatibilityView,
+    FollowingCompatibilityView,
+    FollowSuggestionsView,
 )
 
 router = DefaultRouter()
 
 router.register(r'lists', MovieListViewSet, basename='movielist')
+router.register(r'imports', CsvImportViewSet, basename='csvimport')
 
 urlpatterns = [
     # --- Auth ---
@@ -39,6 +50,13 @@ urlpatterns = [
     path("reviews/", ReviewListCreateView.as_view()),
     path("reviews/<int:pk>/", ReviewRetrieveUpdateDestroyView.as_view()),
     path("reviews/summary/", review_summary),
+    path("reviews/stream/", review_stream),
+
+    # --- Health ---
+    path("health/db/", DatabaseHealthView.as_view(), name="health-db"),
+
+    # --- Movies ---
+    path("movies/<str:movie_id>/timeseries/", MovieTimeseriesView.as_view(), name="movie-timeseries"),
 
     # --- Favourites ---
     path(
@@ -60,6 +78,10 @@ urlpatterns = [
     ),
 
     # --- CreatingList ---
+    path('lists/bulk-add/',
+         MovieListItemBulkCreateView.as_view(),
+         name='listitem-bulk-create'),
+
     path('lists/<int:list_pk>/items/',
          MovieListItemCreateView.as_view(),
          name='listitem-create'),
@@ -67,6 +89,9 @@ urlpatterns = [
     path('lists/<int:list_pk>/items/<str:movie_id>/',
          MovieListItemDestroyView.as_view(),
          name='listitem-destroy'),
+    path('lists/<int:list_pk>/items/<str:movie_id>/move/',
+         MovieListItemMoveView.as_view(),
+         name='listitem-move'),
     path('', include(router.urls)),
 
     # --- Social (Follow/Friends) ---
@@ -75,6 +100,8 @@ urlpatterns = [
     path("social/followers/", FollowersListView.as_view(), name="followers-list"),
     path("social/following/", FollowingListView.as_view(), name="following-list"),
     path("social/friends/", FriendsListView.as_view(), name="friends-list"),
+    path("social/compatibility/", FollowingCompatibilityView.as_view(), name="following-compatibility"),
+    path("social/suggestions/", FollowSuggestionsView.as_view(), name="follow-suggestions"),
 
 
     # --- Public user profile endpoints (NINCS 'api/' előtte!) ---
@@ -84,6 +111,8 @@ urlpatterns = [
     path("users/<str:username>/favourites/", UserFavouritesView.as_view(), name="user-favourites"),
     path("users/<str:username>/reviews/", UserReviewsView.as_view(), name="user-reviews"),
     path("users/<str:username>/watchlist/", UserWatchlistView.as_view(), name="user-watchlist"),
+    path("users/<str:username>/compatibility/", UserCompatibilityView.as_view(), name="user-compatibility"),
+    path("users/<str:username>/wrapped/<int:year>/", UserWrappedView.as_view(), name="user-wrapped"),
 
     # --- Watchlist ---
     path(
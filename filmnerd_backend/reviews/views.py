@@ -1,32 +1,61 @@
 # reviews/views.py
-from django.db.models import Avg, Count, Q
-from django.db import transaction
-from rest_framework import generics, permissions, status, viewsets
+import asyncio
+import time
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Avg, Count, Exists, Max, OuterRef, Prefetch, Q, Window
+from django.db import DatabaseError, connections, transaction
+from rest_framework import generics, mixins, permissions, status, viewsets
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, action
+from rest_framework.decorators import api_view, action, throttle_classes
 from datetime import timedelta
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from django.shortcuts import get_object_or_404
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotAuthenticated, NotFound, ValidationError
+from django.http import JsonResponse, StreamingHttpResponse
 
-from .models import Review, Favourite, MovieList, MovieListItem, Follow, Watchlist
-from .serializers import (ReviewSerializer, RegisterSerializer, LoginSerializer, MeSerializer,
+from .models import (CsvImport, Review, Favourite, Movie, MovieList, MovieListItem, Follow, FollowSuggestion, Watchlist,
+                     UserStats, YearInReview)
+from .serializers import (CsvImportSerializer, CsvImportCreateSerializer,
+                          ReviewSerializer, RegisterSerializer, LoginSerializer, MeSerializer,
                           FavouriteSerializer, MovieListCreateUpdateSerializer,
-                          MovieListItemCreateSerializer, MovieListSerializer,
-                          FollowSerializer, UserPublicSerializer, WatchlistSerializer)
+                          MovieListItemCreateSerializer, MovieListItemBulkCreateSerializer, MovieListSerializer,
+                          FollowSerializer, UserPublicSerializer, UserProfileSerializer, WatchlistSerializer,
+                          sparse_queryset)
+from . import compatibility, dbpool, imports, live, public_cache, rollups, suggestions
+from .jobs import enqueue
+from .authentication import forget_user, full_user, tokens_for
 from .permissions import IsOwnerOrReadOnly
+from .positions import MAX_KEY_LENGTH, key_between, rebalance
+from .public_cache import PublicCacheMixin
+from .throttling import TokenBucketThrottle
 
 User = get_user_model()
 
+SSE_HEARTBEAT_SECONDS = 15
+# ennél hosszabb pozíciókulcs után a lista rebalance-a háttérjobként sorba kerül
+REBALANCE_KEY_LENGTH = 12
+
+
+class SparseFieldsViewMixin:
+    """GET-nél a queryset a serializer ?fields=/?omit= szerinti mezőire szűkül (only/select_related)."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in SAFE_METHODS:
+            queryset = sparse_queryset(queryset, self.get_serializer())
+        return queryset
+
 
 def set_expiration(user):
     lifetime = timedelta(days=7)
     user.token_expiration = timezone.now() + lifetime
     user.save(update_fields=["token_expiration"])
+    forget_user(user.pk)
 
 
 # --- Auth ---
@@ -37,7 +66,7 @@ class RegisterView(APIView):
         ser = RegisterSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         user = ser.save()
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for(user)
         set_expiration(user)
         return Response({
             "user": MeSerializer(user).data,
@@ -53,7 +82,7 @@ class LoginView(APIView):
         ser = LoginSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         user = ser.validated_data["user"]
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for(user)
         set_expiration(user)
         return Response({
             "user": MeSerializer(user).data,
@@ -66,105 +95,177 @@ class MeView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        return Response(MeSerializer(request.user).data)
+        return Response(MeSerializer(full_user(request), context={"request": request}).data)
 
 
 # --- Reviews ---
-class ReviewListCreateView(generics.ListCreateAPIView):
+class ReviewListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    SCOPES = ("following", "friends")
+
     def get_queryset(self):
-        qs = Review.objects.all()
+        qs = Review.objects.select_related("user", "movie")
         movie_id = self.request.query_params.get("movie_id")
         mine = self.request.query_params.get("mine")
+        scope = self.request.query_params.get("scope")
 
         if movie_id:
-            qs = qs.filter(movie_id=movie_id)
+            qs = qs.filter(movie__external_id=movie_id)
 
         if mine in ("1", "true", "True") and self.request.user.is_authenticated:
             qs = qs.filter(user=self.request.user)
 
+        if scope:
+            qs = self.scoped(qs, scope)
+
         return qs.order_by("-created_at")
 
-    @transaction.atomic
-    def perform_create(self, serializer):
+    def scoped(self, qs, scope):
         """
-        Idempotens: (user, movie_id) egyediség – ha létezik, frissítjük.
+        scope=following: akiket követek; scope=friends: kölcsönös követés.
+        Review-nként egy EXISTS a (from_user, to_user) unique indexre, így a
+        költség a film review-inak számával nő, nem a követettekével. A
+        scope-on belüli darabszám és átlag window függvényként ugyanabban a
+        lekérdezésben jön (a LIMIT előtt számolódik).
         """
-        user = self.request.user
-        if not user.is_authenticated:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Bejelentkezés szükséges.")
-
-        movie_id = self.request.data.get("movie_id")
-        rating = self.request.data.get("rating")
-        text = self.request.data.get("text")
-
-        # update_or_create a tisztább megoldás
-        obj, created = Review.objects.update_or_create(
-            user=user,
-            movie_id=movie_id,
-            defaults={
-                "rating": float(rating) if rating is not None else 0,
-                "text": (text or "").strip(),
-            },
-        )
-        self.existing_instance = None if created else obj
-        # ha létezőt frissítettünk, töröljük a watchlistből
-        Watchlist.objects.filter(user=user, movie_id=movie_id).delete()
-        if created:
-            # ha új, a DRF serializerrel mentünk (hogy before/after hookok menjenek)
-            serializer.instance = obj
+        if scope not in self.SCOPES:
+            raise ValidationError({"scope": f"Must be one of: {', '.join(self.SCOPES)}."})
+        if not self.request.user.is_authenticated:
+            raise NotAuthenticated()
+        me = self.request.user
+        qs = qs.filter(Exists(Follow.objects.filter(from_user=me, to_user=OuterRef("user"))))
+        if scope == "friends":
+            qs = qs.filter(Exists(Follow.objects.filter(from_user=OuterRef("user"), to_user=me)))
+        return qs.annotate(scope_count=Window(Count("id")), scope_avg=Window(Avg("rating")))
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get("scope"):
+            # a window értékek az oldal bármelyik sorából olvashatók (üres oldal = üres scope)
+            page = getattr(self.paginator, "page", None)
+            first = page.object_list[0] if page is not None and page.object_list else None
+            response.data["summary"] = {
+                "movie_id": request.query_params.get("movie_id"),
+                "count": first.scope_count if first else 0,
+                "avg": round(first.scope_avg, 1) if first else 0,
+            }
+        return response
 
     def create(self, request, *args, **kwargs):
-        resp = super().create(request, *args, **kwargs)
-        # ha létezőt frissítettünk, 200-zal és a friss példány adataival térünk vissza
-        existing = getattr(self, "existing_instance", None)
-        if existing is not None:
-            ser = self.get_serializer(existing)
-            headers = self.get_success_headers(ser.data)
-            return Response(ser.data, status=status.HTTP_200_OK, headers=headers)
-        return resp
-
-
-class ReviewRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Review.objects.select_related("user").all()
+        """
+        Idempotens: (user, movie_id) egyediség – ha létezik, frissítjük (200), különben 201.
+        A régi rating (zárolva) + egy upsert + egy watchlist DELETE, egy tranzakcióban;
+        a számlálók delta-val frissülnek.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        movie_id = data["movie"]["external_id"]
+
+        # a tranzakción kívül: így az első utasítása írás (SQLite-on nincs lock upgrade)
+        movie = Movie.objects.get_for(movie_id)
+        with transaction.atomic():
+            previous = Review.objects.previous_rating(user=request.user, movie=movie)
+            obj, created = Review.objects.upsert(
+                user=request.user,
+                movie=movie,
+                rating=float(data.get("rating", 0)),
+                text=(data.get("text") or "").strip(),
+            )
+            # értékelt film lekerül a watchlistről
+            removed, _ = Watchlist.objects.filter(user=request.user, movie=movie).delete()
+            if created:
+                UserStats.objects.bump(
+                    request.user.id, reviews_count=1, rating_sum=obj.rating, watchlist_count=-removed
+                )
+            elif previous is not None:
+                UserStats.objects.bump(request.user.id, rating_sum=obj.rating - previous, watchlist_count=-removed)
+            else:
+                # közben egy párhuzamos kérés szúrta be: a régi rating nem ismert
+                UserStats.objects.recount_reviews(request.user.id)
+                UserStats.objects.bump(request.user.id, watchlist_count=-removed)
+
+        ser = self.get_serializer(obj)
+        data = ser.data
+        transaction.on_commit(lambda: live.publish_review_event(movie_id, "review", {"review": data}))
+        transaction.on_commit(lambda: compatibility.invalidate(request.user.id))
+        public_cache.invalidate(request.user.username)
+        if created:
+            return Response(ser.data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(ser.data))
+        return Response(ser.data, status=status.HTTP_200_OK)
+
+
+class ReviewRetrieveUpdateDestroyView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Review.objects.select_related("user", "movie").all()
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
+    @transaction.atomic
     def perform_update(self, serializer):
         # Mindig a bejelentkezett user a tulaj; user-t külső változtatásra nem engedjük
-        serializer.save(user=self.request.user)
+        previous = None
+        if "rating" in serializer.validated_data:
+            previous = Review.objects.previous_rating(pk=serializer.instance.pk)
+        review = serializer.save(user=self.request.user)
+        if previous is not None:
+            UserStats.objects.bump(review.user_id, rating_sum=review.rating - previous)
+            transaction.on_commit(lambda: compatibility.invalidate(review.user_id))
+        public_cache.invalidate(self.request.user.username)
+        data = serializer.data
+        transaction.on_commit(lambda: live.publish_review_event(review.movie.external_id, "review", {"review": data}))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        review_id = instance.id
+        rating = Review.objects.previous_rating(pk=review_id)
+        instance.delete()
+        if rating is not None:
+            UserStats.objects.bump(instance.user_id, reviews_count=-1, rating_sum=-rating)
+        transaction.on_commit(
+            lambda: live.publish_review_event(instance.movie.external_id, "review_deleted", {"id": review_id})
+        )
+        transaction.on_commit(lambda: compatibility.invalidate(instance.user_id))
+        public_cache.invalidate(self.request.user.username)
 
 
-class FavouriteViewSet(viewsets.ModelViewSet):
+class FavouriteViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Favourite.objects.all()
     serializer_class = FavouriteSerializer
     permission_classes = [IsAuthenticated]
-    lookup_field = "movie_id"
+    lookup_field = "movie__external_id"
     lookup_url_kwarg = "movie_id"
 
     def get_queryset(self):
         # Mindig csak az adott user kedvencei
-        return Favourite.objects.filter(user=self.request.user)
+        return Favourite.objects.filter(user=self.request.user).select_related("movie")
 
     def create(self, request, *args, **kwargs):
         movie_id = request.data.get("movie_id")
         user = request.user
 
-        fav, created = Favourite.objects.get_or_create(
-            user=user,
-            movie_id=movie_id
-        )
+        movie = Movie.objects.get_for(movie_id)
+        with transaction.atomic():
+            fav, created = Favourite.objects.get_or_create(
+                user=user,
+                movie=movie
+            )
+            UserStats.objects.bump(user.id, favourites_count=int(created))
+            if created:
+                public_cache.invalidate(user.username)
 
         return Response({"created": created}, status=200)
 
     def destroy(self, request, movie_id=None, *args, **kwargs):
-        Favourite.objects.filter(
-            user=request.user,
-            movie_id=movie_id
-        ).delete()
+        with transaction.atomic():
+            removed, _ = Favourite.objects.filter(
+                user=request.user,
+                movie__external_id=movie_id
+            ).delete()
+            UserStats.objects.bump(request.user.id, favourites_count=-removed)
+            if removed:
+                public_cache.invalidate(request.user.username)
         return Response(status=204)
 
     @action(detail=False, methods=["get"])
@@ -172,64 +273,216 @@ class FavouriteViewSet(viewsets.ModelViewSet):
         movie_id = request.query_params.get("movie_id")
         exists = Favourite.objects.filter(
             user=request.user,
-            movie_id=movie_id
+            movie__external_id=movie_id
         ).exists()
         return Response({"exists": exists})
 
 
 @api_view(["GET"])
+@throttle_classes([TokenBucketThrottle.scoped("review_summary")])
 def review_summary(request):
     movie_id = request.query_params.get("movie_id")
     if not movie_id:
         return Response({"detail": "movie_id is required"}, status=400)
 
-    agg = Review.objects.filter(movie_id=movie_id).aggregate(
-        count=Count("id"),
-        avg=Avg("rating"),
-    )
-    return Response({
-        "movie_id": movie_id,              # ← ne erőltesd int-re
-        "count": int(agg["count"] or 0),
-        "avg": round((agg["avg"] or 0), 1),
-    })
+    return Response(Review.objects.summary(movie_id))
+
+
+async def review_stream(request):
+    """
+    GET /api/reviews/stream/?movie_id=<id>
+    Server-Sent Events: új/frissített/törölt review-k és a friss summary.
+    Csak ASGI szerver alatt (uvicorn/daphne) működik.
+    """
+    movie_id = request.GET.get("movie_id")
+    if not movie_id:
+        return JsonResponse({"detail": "movie_id is required"}, status=400)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Streaming requires an ASGI server."}, status=501)
+
+    async def events():
+        async with live.get_broker().subscribe(live.channel_for(movie_id)) as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield live.format_sse(message)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _date_param(request, name, default):
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({name: "Must be a date (YYYY-MM-DD)."})
+    return day
+
+
+class MovieTimeseriesView(APIView):
+    """
+    GET /api/movies/<movie_id>/timeseries/?from=2024-01-01&to=2024-12-31&bucket=day|week|month
+    A film review/kedvenc/watchlist/lista számai időben, a napi összesítőkből
+    (MovieDailyStats) bucketekre összegezve, egy lekérdezéssel. Alapból az
+    utolsó egy év heti bontásban; a mai nap a periodikus job futásáig hiányos.
+    """
+
+    def get(self, request, movie_id):
+        bucket = request.query_params.get("bucket", "week")
+        if bucket not in rollups.BUCKETS:
+            raise ValidationError({"bucket": f"Must be one of: {', '.join(rollups.BUCKETS)}."})
+        end = _date_param(request, "to", timezone.localdate())
+        start = _date_param(request, "from", end - timedelta(days=364))
+        if start > end:
+            raise ValidationError({"from": "Must not be after 'to'."})
+        if len(rollups.bucket_starts(start, end, bucket)) > rollups.MAX_POINTS:
+            raise ValidationError({"from": f"Too many {bucket} buckets (max {rollups.MAX_POINTS})."})
+        return Response({
+            "movie_id": movie_id,
+            "bucket": bucket,
+            "from": start,
+            "to": end,
+            "points": rollups.timeseries(movie_id, start, end, bucket),
+        })
+
+
+class DatabaseHealthView(APIView):
+    """
+    GET /api/health/db/ (staff) – aliasonként egy SELECT 1 ideje, a kapcsolat
+    beállításai és ennek a worker processznek a pool metrikái (reviews/dbpool.py).
+    Ha valamelyik alias nem válaszol: 503.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        result = {}
+        for connection in connections.all():
+            start = time.perf_counter()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                error = None
+            except DatabaseError as exc:
+                error = str(exc)
+            result[connection.alias] = {
+                "ok": error is None,
+                "error": error,
+                "ms": round((time.perf_counter() - start) * 1000, 2),
+                "vendor": connection.vendor,
+                "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+                "health_checks": connection.settings_dict["CONN_HEALTH_CHECKS"],
+            }
+        pools = dbpool.stats()
+        for alias, row in result.items():
+            row["pool"] = pools.get(alias)
+        healthy = all(r["ok"] for r in result.values())
+        return Response(result, status=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
 # List Creating views
-class MovieListViewSet(viewsets.ModelViewSet):
+def movie_lists_with_items():
+    # listák + elemek + külső movie id-k: 2 lekérdezés, listaszámtól függetlenül
+    return MovieList.objects.select_related("user").prefetch_related(
+        Prefetch("items", queryset=MovieListItem.objects.select_related("movie"))
+    )
+
+
+class MovieListViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
 
     def get_queryset(self):
-        return MovieList.objects.filter(user=self.request.user)
+        return movie_lists_with_items().filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return MovieListCreateUpdateSerializer
         return MovieListSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        UserStats.objects.bump(self.request.user.id, lists_count=1)
+        public_cache.invalidate(self.request.user.username)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        public_cache.invalidate(self.request.user.username)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        UserStats.objects.bump(instance.user_id, lists_count=-1)
+        public_cache.invalidate(self.request.user.username)
 
 
 class MovieListItemCreateView(generics.CreateAPIView):
     serializer_class = MovieListItemCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def perform_create(self, serializer):
-        movie_list = get_object_or_404(MovieList, pk=self.kwargs['list_pk'])
-        if movie_list.user != self.request.user:
-            raise permissions.PermissionDenied("You do not own this list.")
-        serializer.save(movie_list=movie_list)
-
     def create(self, request, *args, **kwargs):
-        try:
-            return super().create(request, *args, **kwargs)
-        except Exception as e:
-            if 'unique_movie_in_list' in str(e):
-                return Response(
-                    {"error": "This movie is already in the list."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            raise e
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        movie_id = serializer.validated_data["movie"]["external_id"]
+
+        # egyetlen lekérdezés: létezik-e, a useré-e, és mi az utolsó position
+        tails = dict(
+            MovieList.objects.filter(pk=self.kwargs['list_pk'], user=request.user)
+            .annotate(tail=Max("items__position"))
+            .values_list("pk", "tail")
+        )
+        if not tails:
+            raise NotFound("List not found.")
+
+        added, _ = MovieListItem.objects.add_many(list(tails), [movie_id], tails=tails)
+        if not added:
+            return Response(
+                {"error": "This movie is already in the list."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        public_cache.invalidate(request.user.username)
+        return Response({"movie_id": movie_id}, status=status.HTTP_201_CREATED)
+
+
+class MovieListItemBulkCreateView(APIView):
+    """
+    POST /api/lists/bulk-add/
+    {"list_ids": [1, 2], "movie_ids": ["603", "550"]} – minden filmet minden listához.
+    A duplikátumok nem hibák, külön jelentjük őket.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        ser = MovieListItemBulkCreateSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        list_ids = ser.validated_data["list_ids"]
+        movie_ids = ser.validated_data["movie_ids"]
+
+        owned = dict(
+            MovieList.objects.filter(pk__in=list_ids, user=request.user)
+            .annotate(tail=Max("items__position"))
+            .values_list("pk", "tail")
+        )
+        added, duplicates = MovieListItem.objects.add_many(
+            [pk for pk in list_ids if pk in owned], movie_ids, tails=owned
+        )
+        if added:
+            public_cache.invalidate(request.user.username)
+        return Response({
+            "added": [{"list_id": list_id, "movie_id": movie_id} for list_id, movie_id in added],
+            "duplicates": [{"list_id": list_id, "movie_id": movie_id} for list_id, movie_id in duplicates],
+            "missing_lists": [pk for pk in list_ids if pk not in owned],
+        }, status=status.HTTP_200_OK)
 
 
 class MovieListItemDestroyView(generics.DestroyAPIView):
@@ -241,9 +494,65 @@ class MovieListItemDestroyView(generics.DestroyAPIView):
         movie_list = get_object_or_404(MovieList, pk=list_pk)
         if movie_list.user != self.request.user:
             raise permissions.PermissionDenied("You do not own this list.")
-        item = get_object_or_404(MovieListItem, movie_list=movie_list, movie_id=movie_id)
+        item = get_object_or_404(MovieListItem, movie_list=movie_list, movie__external_id=movie_id)
         return item
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        public_cache.invalidate(self.request.user.username)
+
+
+class MovieListItemMoveView(APIView):
+    """
+    POST /api/lists/<list_pk>/items/<movie_id>/move/
+    {"after": "<movie_id>" | null, "before": "<movie_id>" | null}
+    A két szomszéd közé teszi az elemet (null = lista eleje/vége).
+    Csak a mozgatott sor íródik; ha a kulcs túl hosszú lett, a lista rebalance-a
+    háttérjobként fut (rebalance_list). Ha a kulcs nem férne a mezőbe, vagy egy
+    szomszédnak üres a kulcsa (ez elé nem lehet tenni), a rebalance itt, a mentés
+    előtt fut le.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @staticmethod
+    def neighbours(items, after, before):
+        neighbours = dict(
+            items.filter(movie__external_id__in=[m for m in (after, before) if m is not None])
+            .values_list("movie__external_id", "position")
+        )
+        if (after is not None and after not in neighbours) or (before is not None and before not in neighbours):
+            raise NotFound("Neighbour not found in this list.")
+        return neighbours
+
+    def rebalanced(self, list_pk, items, after, before):
+        # csak meglévő szomszédok után hívódik, a lista tulajdonosa így már ellenőrzött
+        with transaction.atomic():
+            rebalance(list_pk)
+        return self.neighbours(items, after, before)
+
+    def post(self, request, list_pk, movie_id):
+        after = request.data.get("after")
+        before = request.data.get("before")
+        items = MovieListItem.objects.filter(movie_list_id=list_pk, movie_list__user=request.user)
+        neighbours = self.neighbours(items, after, before)
+        if "" in neighbours.values():
+            neighbours = self.rebalanced(list_pk, items, after, before)
+        try:
+            position = key_between(neighbours.get(after), neighbours.get(before))
+        except ValueError:
+            # a kliens elavult sorrendet lát
+            return Response({"detail": "Stale list order, reload and retry."}, status=status.HTTP_409_CONFLICT)
+        if len(position) > MAX_KEY_LENGTH:
+            neighbours = self.rebalanced(list_pk, items, after, before)
+            position = key_between(neighbours.get(after), neighbours.get(before))
+
+        if not items.filter(movie__external_id=movie_id).update(position=position):
+            raise NotFound("Item not found in this list.")
+        public_cache.invalidate(request.user.username)
+        if len(position) > REBALANCE_KEY_LENGTH:
+            enqueue("rebalance_list", {"movie_list_id": int(list_pk)}, dedupe_key=f"rebalance_list:{list_pk}")
+        return Response({"movie_id": movie_id, "position": position})
+
 
 # --- Social: Follow / Followers / Following / Friends ---
 class FollowCreateView(APIView):
@@ -268,7 +577,13 @@ class FollowCreateView(APIView):
         if to_user == request.user:
             return Response({"detail": "You cannot follow yourself."}, status=status.HTTP_400_BAD_REQUEST)
 
-        follow, created = Follow.objects.get_or_create(from_user=request.user, to_user=to_user)
+        with transaction.atomic():
+            follow, created = Follow.objects.get_or_create(from_user=request.user, to_user=to_user)
+            if created:
+                UserStats.objects.bump(request.user.id, following_count=1)
+                UserStats.objects.bump(to_user.id, followers_count=1)
+                public_cache.invalidate(request.user.username, to_user.username)
+        follow.from_user = full_user(request)
         ser = FollowSerializer(follow)
         return Response({"created": created, "follow": ser.data}, status=status.HTTP_200_OK)
 
@@ -277,16 +592,27 @@ class UnfollowView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def delete(self, request, user_id: int):
-        Follow.objects.filter(from_user=request.user, to_user_id=user_id).delete()
+        with transaction.atomic():
+            removed, _ = Follow.objects.filter(from_user=request.user, to_user_id=user_id).delete()
+            if removed:
+                UserStats.objects.bump(request.user.id, following_count=-removed)
+                UserStats.objects.bump(user_id, followers_count=-removed)
+                public_cache.invalidate_ids([request.user.id, user_id])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def _public_users(request, users, limit=None):
+    serializer = UserPublicSerializer(many=True, context={"request": request})
+    users = sparse_queryset(users, serializer)
+    return UserPublicSerializer(users[:limit], many=True, context={"request": request}).data
+
+
 class FollowersListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         users = User.objects.filter(following__to_user=request.user).distinct()
-        return Response(UserPublicSerializer(users, many=True).data)
+        return Response(_public_users(request, users))
 
 
 class FollowingListView(APIView):
@@ -294,7 +620,7 @@ class FollowingListView(APIView):
 
     def get(self, request):
         users = User.objects.filter(followers__from_user=request.user).distinct()
-        return Response(UserPublicSerializer(users, many=True).data)
+        return Response(_public_users(request, users))
 
 
 class FriendsListView(APIView):
@@ -310,34 +636,43 @@ class FriendsListView(APIView):
         )
         mutual_ids = list(following_ids.intersection(follower_ids))
         users = User.objects.filter(id__in=mutual_ids)
-        return Response(UserPublicSerializer(users, many=True).data)
+        return Response(_public_users(request, users))
 
 
-class WatchlistViewSet(viewsets.ModelViewSet):
+class WatchlistViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Watchlist.objects.all()
     serializer_class = WatchlistSerializer
     permission_classes = [permissions.IsAuthenticated]
-    lookup_field = "movie_id"
+    lookup_field = "movie__external_id"
     lookup_url_kwarg = "movie_id"
 
     def get_queryset(self):
-        return Watchlist.objects.filter(user=self.request.user)
+        return Watchlist.objects.filter(user=self.request.user).select_related("movie")
 
     def create(self, request, *args, **kwargs):
         movie_id = request.data.get("movie_id")
         user = request.user
 
-        obj, created = Watchlist.objects.get_or_create(
-            user=user,
-            movie_id=movie_id
-        )
+        movie = Movie.objects.get_for(movie_id)
+        with transaction.atomic():
+            obj, created = Watchlist.objects.get_or_create(
+                user=user,
+                movie=movie
+            )
+            UserStats.objects.bump(user.id, watchlist_count=int(created))
+            if created:
+                public_cache.invalidate(user.username)
         return Response({"created": created}, status=200)
 
     def destroy(self, request, movie_id=None, *args, **kwargs):
-        Watchlist.objects.filter(
-            user=request.user,
-            movie_id=movie_id
-        ).delete()
+        with transaction.atomic():
+            removed, _ = Watchlist.objects.filter(
+                user=request.user,
+                movie__external_id=movie_id
+            ).delete()
+            UserStats.objects.bump(request.user.id, watchlist_count=-removed)
+            if removed:
+                public_cache.invalidate(request.user.username)
         return Response(status=204)
 
     @action(detail=False, methods=["get"])
@@ -345,20 +680,22 @@ class WatchlistViewSet(viewsets.ModelViewSet):
         movie_id = request.query_params.get("movie_id")
         exists = Watchlist.objects.filter(
             user=request.user,
-            movie_id=movie_id
+            movie__external_id=movie_id
         ).exists()
         return Response({"exists": exists})
 
 
-class UserPublicProfileView(generics.RetrieveAPIView):
+class UserPublicProfileView(PublicCacheMixin, SparseFieldsViewMixin, generics.RetrieveAPIView):
     """
     GET /api/users/<username>/
-    Csak a publikus adatokat adja vissza (username, name, bio stb.).
+    Csak a publikus adatokat adja vissza (username, name, bio stb.),
+    a denormalizált UserStats számlálókkal együtt (egy JOIN, nincs COUNT).
     """
-    queryset = User.objects.all()
-    serializer_class = UserPublicSerializer
+    queryset = User.objects.select_related("stats")
+    serializer_class = UserProfileSerializer
     lookup_field = "username"
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "public_user"
 
 
 class UserSearchView(APIView):
@@ -368,6 +705,7 @@ class UserSearchView(APIView):
     Returns a limited public representation using UserPublicSerializer.
     """
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "user_search"
 
     def get(self, request):
         q = (request.query_params.get("q") or "").strip()
@@ -376,9 +714,8 @@ class UserSearchView(APIView):
 
         qs = User.objects.filter(
             Q(username__icontains=q) | Q(name__icontains=q)
-        ).order_by("username")[:20]
-        data = UserPublicSerializer(qs, many=True).data
-        return Response(data)
+        ).order_by("username")
+        return Response(_public_users(request, qs, limit=20))
 
 
 class UsernameMixin:
@@ -398,56 +735,182 @@ class UsernameMixin:
         return super().get_queryset().filter(user=user)
 
 
-class UserListsView(UsernameMixin, generics.ListAPIView):
+class UserListsView(PublicCacheMixin, SparseFieldsViewMixin, UsernameMixin, generics.ListAPIView):
     """
     GET /api/users/<username>/lists/
     Az adott user MovieListjei.
     """
     serializer_class = MovieListSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "public_user"
 
     def get_queryset(self):
-        base_qs = MovieList.objects.all()
+        base_qs = movie_lists_with_items()
         user = self.get_user()
         return base_qs.filter(user=user)
 
 
-class UserFavouritesView(UsernameMixin, generics.ListAPIView):
+class UserFavouritesView(PublicCacheMixin, SparseFieldsViewMixin, UsernameMixin, generics.ListAPIView):
     """
     GET /api/users/<username>/favourites/
     Az adott user kedvenc filmjei.
     """
     serializer_class = FavouriteSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "public_user"
 
     def get_queryset(self):
-        base_qs = Favourite.objects.all()
+        base_qs = Favourite.objects.select_related("movie")
         user = self.get_user()
         return base_qs.filter(user=user)
 
 
-class UserReviewsView(UsernameMixin, generics.ListAPIView):
+class UserReviewsView(PublicCacheMixin, SparseFieldsViewMixin, UsernameMixin, generics.ListAPIView):
     """
     GET /api/users/<username>/reviews/
     Az adott user review-i.
     """
     serializer_class = ReviewSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "public_user"
 
     def get_queryset(self):
-        base_qs = Review.objects.all()
+        base_qs = Review.objects.select_related("movie")
         user = self.get_user()
         return base_qs.filter(user=user)
 
 
-class UserWatchlistView(UsernameMixin, generics.ListAPIView):
+class UserWatchlistView(PublicCacheMixin, SparseFieldsViewMixin, UsernameMixin, generics.ListAPIView):
     """
     GET /api/users/<username>/watchlist/
     """
     serializer_class = WatchlistSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "public_user"
 
     def get_queryset(self):
-        base_qs = Watchlist.objects.all()
+        base_qs = Watchlist.objects.select_related("movie")
         user = self.get_user()
         return base_qs.filter(user=user)
+
+
+class UserWrappedView(APIView):
+    """
+    GET /api/users/<username>/wrapped/<year>/
+    Az éves összefoglaló a batch job (reviews.wrapped) kész snapshotjából:
+    egy sor, plusz a barátok nevei (a törölt barátok kimaradnak).
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_scope = "public_user"
+
+    def get(self, request, username, year):
+        row = YearInReview.objects.filter(user__username=username, year=year).values_list(
+            "data", "computed_at"
+        ).first()
+        if row is None:
+            raise NotFound("No year in review for this user and year.")
+        data, computed_at = row
+        friends = data["most_compatible_friends"]
+        names = dict(User.objects.filter(pk__in=[f["user_id"] for f in friends], is_active=True).values_list(
+            "pk", "username"
+        )) if friends else {}
+        return Response({
+            "username": username,
+            "year": year,
+            "computed_at": computed_at,
+            **data,
+            "most_compatible_friends": [
+                {"username": names[f["user_id"]], "score": f["score"], "agreement": f["agreement"],
+                 "overlap": f["overlap"]}
+                for f in friends if f["user_id"] in names
+            ],
+        })
+
+
+# --- CSV import (Letterboxd / IMDb) ---
+class CsvImportViewSet(SparseFieldsViewMixin, mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    POST /api/imports/ (multipart: file, kind) -> 202 + a státusz; a feldolgozás háttérjob.
+    GET /api/imports/<id>/ -> státusz pollozáshoz (rows_processed, created/updated/error_count, errors).
+    """
+    serializer_class = CsvImportSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return CsvImport.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        ser = CsvImportCreateSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        csv_import = imports.start_upload(request.user, ser.validated_data["kind"], ser.validated_data["file"])
+        return Response(CsvImportSerializer(csv_import).data, status=status.HTTP_202_ACCEPTED)
+
+
+# --- Taste compatibility ---
+def _compatibility_method(request):
+    method = request.query_params.get("method", "pearson")
+    if method not in compatibility.METHODS:
+        raise ValidationError({"method": f"Must be one of: {', '.join(compatibility.METHODS)}."})
+    return method
+
+
+class UserCompatibilityView(APIView):
+    """
+    GET /api/users/<username>/compatibility/?method=pearson|cosine
+    A bejelentkezett user és <username> egyezése a közösen értékelt filmeken
+    (külön végpont, hogy a publikus profil nézőtől független maradjon).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, username):
+        method = _compatibility_method(request)
+        other_id = User.objects.filter(username=username).values_list("pk", flat=True).first()
+        if other_id is None:
+            raise NotFound("User not found.")
+        if other_id == request.user.pk:
+            raise ValidationError({"username": "Cannot compare a user with themselves."})
+        return Response({"username": username, **compatibility.compare(request.user.pk, other_id, method)})
+
+
+class FollowingCompatibilityView(APIView):
+    """GET /api/social/compatibility/ – minden követett user pontszáma egy menetben, csökkenő sorrendben."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        ranked = compatibility.compare_with_followings(request.user.pk, _compatibility_method(request))
+        users = User.objects.in_bulk([user_id for user_id, _ in ranked])
+        return Response([
+            {"user": UserPublicSerializer(users[user_id]).data, **result}
+            for user_id, result in ranked if user_id in users
+        ])
+
+
+class FollowSuggestionsView(APIView):
+    """
+    GET /api/social/suggestions/?limit=10 – "People you may know".
+    Az előre számolt top-N sorokból (reviews.suggestions, periodikus job);
+    az azóta követett userek kimaradnak.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), suggestions.TOP_N)
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer."})
+        rows = (
+            FollowSuggestion.objects.filter(user=request.user, suggested__is_active=True)
+            .exclude(Exists(Follow.objects.filter(from_user=request.user, to_user=OuterRef("suggested_id"))))
+            .select_related("suggested")
+            .order_by("-score", "suggested_id")[:limit]
+        )
+        return Response([
+            {
+                "user": UserPublicSerializer(row.suggested).data,
+                "mutual_count": row.mutual_count,
+                "taste": round(row.taste, 3),
+                "score": round(row.score, 3),
+            }
+            for row in rows
+        ])
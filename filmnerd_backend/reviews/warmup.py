@@ -0,0 +1,142 @@
+"""
+Bemelegítés a WSGI/ASGI modul betöltésekor, hogy az elalvó (idle) instance
+első kérése ne fizesse ki a lusta inicializálásokat.
+
+Az első kérés alapból ezeket végzi el: URLconf import és a resolver regexek
+fordítása, a DRF beállításokban megadott osztályok importja, a serializerek
+mezőinek felépítése (model _meta introspekció, validátorok), a fordítási
+katalógus betöltése, a DB driver és backend első használata, cache és JWT
+backend első használata. A `warm_up()` ezeket előre lefuttatja; minden lépés külön
+mérve, és egy hibás lépés (pl. még nem elérhető DB) nem állítja meg az
+indulást.
+
+A wsgi.py / asgi.py hívja, ha WARMUP_ON_LOAD be van kapcsolva. A mérést a
+`manage.py startup_profile` végzi (import-idők modulonként, time to first
+response bemelegítéssel és nélküle).
+
+A DB lépés csak ellenőriz: az általa nyitott kapcsolatot (és poolt) be is
+zárja. A kapcsolat szálhoz kötött, ASGI alatt a sync view-k executor
+szálakon, saját kapcsolattal futnak, `--preload`-dal pedig a fork után a
+workerek osztoznának rajta; nyitva hagyva csak árva kapcsolat lenne.
+"""
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_urls():
+    """Az URLconf importja és a resolver (reverse_dict, regexek) felépítése."""
+    from django.urls import get_resolver, resolve
+
+    resolver = get_resolver()
+    resolver.reverse_dict  # lusta _populate()
+    for path in ("/api/reviews/", "/api/users/warmup/lists/"):
+        resolve(path)
+
+
+def load_drf_settings():
+    """A DRF a DEFAULT_*_CLASSES stringeket az első kérésnél importálja."""
+    from rest_framework.settings import api_settings
+
+    for name in ("DEFAULT_AUTHENTICATION_CLASSES", "DEFAULT_PERMISSION_CLASSES", "DEFAULT_RENDERER_CLASSES",
+                 "DEFAULT_PARSER_CLASSES", "DEFAULT_PAGINATION_CLASS", "DEFAULT_CONTENT_NEGOTIATION_CLASS"):
+        getattr(api_settings, name)
+
+
+def _build_fields(serializer):
+    from rest_framework.serializers import BaseSerializer
+
+    for field in serializer.fields.values():
+        nested = getattr(field, "child", field)
+        if isinstance(nested, BaseSerializer):
+            _build_fields(nested)
+
+
+def build_serializers():
+    """
+    Minden reviews serializer mezői (a beágyazottakkal együtt) egyszer
+    felépítve. A DRF példányonként újraépíti őket, de a model _meta
+    cache-ek, a ModelSerializer mezőleképezés és a validátorok importja
+    ilyenkor töltődik be.
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    from . import serializers
+
+    for value in vars(serializers).values():
+        if isinstance(value, type) and issubclass(value, BaseSerializer) and value.__module__ == serializers.__name__:
+            _build_fields(value())
+
+
+def load_translations():
+    from django.utils import translation
+
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext("This field is required.")
+
+
+def check_connections():
+    """Minden beállított adatbázis (primary + replikák): kapcsolat + egy SELECT 1, utána a nyitott kapcsolat zárása."""
+    from django.db import connections
+
+    from . import dbpool
+
+    for connection in connections.all():
+        opened = connection.connection is None
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        finally:
+            if opened:
+                connection.close()
+                dbpool.close_pools(connection.alias)
+
+
+def prime_caches():
+    """Cache backend kapcsolat, JWT backend (kriptó import), live broker."""
+    from django.core.cache import cache
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from . import live
+
+    cache.get("warmup")
+    token = AccessToken()
+    token[api_settings.USER_ID_CLAIM] = 0
+    AccessToken(str(token))
+    live.get_broker()
+
+
+STEPS = [
+    ("urls", resolve_urls),
+    ("drf settings", load_drf_settings),
+    ("serializers", build_serializers),
+    ("translations", load_translations),
+    ("db check", check_connections),
+    ("caches", prime_caches),
+]
+
+
+def warm_up(steps=None):
+    """A lépések futtatása; returns {címke: ms}. Hiba esetén figyelmeztet és megy tovább."""
+    timings = {}
+    for label, step in steps or STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.warning("warm-up step %r failed", label, exc_info=True)
+        timings[label] = (time.perf_counter() - start) * 1000
+    logger.info("warm-up done in %.1f ms (%s)", sum(timings.values()),
+                ", ".join(f"{label} {ms:.1f} ms" for label, ms in timings.items()))
+    return timings
+
+
+def warm_up_on_load():
+    """A wsgi.py / asgi.py hívja a Django setup után."""
+    if getattr(settings, "WARMUP_ON_LOAD", False):
+        return warm_up()
+    return None
@@ -0,0 +1,143 @@
+"""
+Éves összefoglaló ("wrapped") batch számolása user id tartományonként.
+
+Egy [lo, hi) tartomány adott évi sorait (review-k, kedvencek, watchlist és
+lista bejegyzések) CHUNK soronként streameljük, és NumPy bincount-tal
+adjuk össze a tartományon belüli sűrű user index (user_id - lo) szerint:
+userenkénti review szám és rating összeg, fél csillagos rating hisztogram,
+havi aktivitás. Forrásonként egy lekérdezés a tartományra, userenkénti
+aggregátumok helyett; a memória a tartomány szélességével arányos, nem a
+sorok számával.
+
+A tartományok függetlenek: a `schedule` mindegyiket külön jobként teszi
+sorba, így több `manage.py runworker` processz párhuzamosan dolgozza fel
+őket. Egy tartomány snapshotjai egy tranzakcióban cserélődnek, így a job
+újrafuttatható.
+
+A "leginkább egyező barátok" (kölcsönös követés) a reviews.compatibility
+`compare_mutual`-jával számolódnak: a tartomány összes (user, barát) párjára
+egy lekérdezés, páronkénti bincount. A snapshot a barátok id-ját tárolja, a
+nevüket az olvasó view adja hozzá (a törölt userek így kimaradnak).
+
+Műfaj statisztika nincs: a filmekről csak a külső (TMDB) id-t tároljuk.
+"""
+import itertools
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.db.models.functions import ExtractMonth
+
+from . import compatibility
+from .jobs import enqueue
+from .models import Favourite, MovieListItem, Review, User, Watchlist, YearInReview
+
+CHUNK = 20000
+SHARD_SIZE = 5000
+TOP_FRIENDS = 3
+# fél csillagos bin-ek: 1, 1.5, ..., 5
+RATING_BINS = [x / 2 for x in range(2, 11)]
+# snapshot mező -> (forrás model, időbélyeg oszlop, user lookup)
+ADDS = {
+    "favourites_added": (Favourite, "created_at", "user_id"),
+    "watchlist_added": (Watchlist, "created_at", "user_id"),
+    "list_adds": (MovieListItem, "added_at", "movie_list__user_id"),
+}
+
+
+def _stream(queryset):
+    """A values_list sorok CHUNK-onként, (sorok, oszlopok) alakú float tömbként."""
+    import numpy as np
+
+    rows = queryset.iterator(chunk_size=CHUNK)
+    while batch := list(itertools.islice(rows, CHUNK)):
+        yield np.array(batch, dtype=float)
+
+
+def _activity(model, column, user_field, year, lo, hi):
+    """(user, hónap) párok CHUNK-onként a forrás adott évi soraiból; a user a tartományon belüli index."""
+    import numpy as np
+
+    queryset = (
+        model.objects.filter(**{f"{user_field}__gte": lo, f"{user_field}__lt": hi, f"{column}__year": year})
+        .order_by().values_list(user_field, ExtractMonth(column), *(["rating"] if model is Review else []))
+    )
+    for rows in _stream(queryset):
+        yield rows[:, 0].astype(np.int64) - lo, rows[:, 1].astype(np.int64) - 1, rows[:, 2:]
+
+
+def _top_friends(results):
+    ranked = sorted(
+        (item for item in results.items() if item[1]["overlap"]), key=lambda item: (-item[1]["score"], item[0])
+    )
+    return [
+        {"user_id": friend_id, "score": r["score"], "agreement": r["agreement"], "overlap": r["overlap"]}
+        for friend_id, r in ranked[:TOP_FRIENDS]
+    ]
+
+
+def compute(year, lo, hi):
+    """{user_id: snapshot} a [lo, hi) tartomány azon usereire, akiknek volt aktivitása az évben."""
+    import numpy as np
+
+    width, bins = hi - lo, len(RATING_BINS)
+    reviews, rating_sum = np.zeros(width, dtype=np.int64), np.zeros(width)
+    histogram = np.zeros((width, bins), dtype=np.int64)
+    monthly = np.zeros((width, 12), dtype=np.int64)
+    adds = {field: np.zeros(width, dtype=np.int64) for field in ADDS}
+
+    for user, month, rest in _activity(Review, "created_at", "user_id", year, lo, hi):
+        rating = rest[:, 0]
+        reviews += np.bincount(user, minlength=width)
+        rating_sum += np.bincount(user, weights=rating, minlength=width)
+        rating_bin = np.clip(np.rint(rating * 2).astype(np.int64) - 2, 0, bins - 1)
+        histogram += np.bincount(user * bins + rating_bin, minlength=width * bins).reshape(width, bins)
+        monthly += np.bincount(user * 12 + month, minlength=width * 12).reshape(width, 12)
+    for field, source in ADDS.items():
+        for user, month, _ in _activity(*source, year, lo, hi):
+            adds[field] += np.bincount(user, minlength=width)
+            monthly += np.bincount(user * 12 + month, minlength=width * 12).reshape(width, 12)
+
+    active = np.flatnonzero(monthly.sum(axis=1))
+    compatible = compatibility.compare_mutual(lo, hi) if len(active) else {}
+    snapshots = {}
+    for i in active.tolist():
+        user_id, count = lo + i, int(reviews[i])
+        snapshots[user_id] = {
+            "films_rated": count,
+            "rating_avg": round(float(rating_sum[i]) / count, 2) if count else None,
+            "rating_distribution": {f"{b:g}": int(c) for b, c in zip(RATING_BINS, histogram[i])},
+            **{field: int(values[i]) for field, values in adds.items()},
+            "monthly_activity": monthly[i].tolist(),
+            "most_active_month": int(monthly[i].argmax()) + 1,
+            "most_compatible_friends": _top_friends(compatible.get(user_id, {})),
+        }
+    return snapshots
+
+
+def build_range(year, lo, hi):
+    """A [lo, hi) tartomány snapshotjainak újraszámolása és cseréje; visszaadja a snapshotok számát."""
+    snapshots = compute(year, lo, hi)
+    with transaction.atomic():
+        YearInReview.objects.filter(year=year, user_id__gte=lo, user_id__lt=hi).delete()
+        YearInReview.objects.bulk_create(
+            [YearInReview(user_id=user_id, year=year, data=data) for user_id, data in snapshots.items()],
+            batch_size=500,
+        )
+    return len(snapshots)
+
+
+def ranges(shard_size=SHARD_SIZE):
+    """A user id tér [lo, hi) darabjai."""
+    bounds = User.objects.aggregate(lo=Min("pk"), hi=Max("pk"))
+    if bounds["lo"] is None:
+        return []
+    end = bounds["hi"] + 1
+    return [(lo, min(lo + shard_size, end)) for lo in range(bounds["lo"], end, shard_size)]
+
+
+def schedule(year, shard_size=SHARD_SIZE):
+    """Tartományonként egy `build_wrapped` job; a workerek párhuzamosan veszik fel őket."""
+    shards = ranges(shard_size)
+    for lo, hi in shards:
+        enqueue("build_wrapped", {"year": year, "lo": lo, "hi": hi}, dedupe_key=f"wrapped:{year}:{lo}:{hi}")
+    return shards
@@ -45,6 +45,7 @@ export default function PublicProfilePage() {
   const { username } = useParams();
 
   const [user, setUser] = useState(null);
+  const [compat, setCompat] = useState(null);
   const [lists, setLists] = useState([]);
   const [favourites, setFavourites] = useState([]);
   const [watchlist, setWatchlist] = useState([]);
@@ -91,6 +92,15 @@ export default function PublicProfilePage() {
         const userData = await userRes.json();
         setUser(userData);
 
+        // ízlés-egyezés (csak bejelentkezve, saját profilnál 400 jön)
+        setCompat(null);
+        if (token) {
+          const compatRes = await fetch(`${API_BASE}/users/${username}/compatibility/`, {
+            headers: authHeaders,
+          });
+          if (compatRes.ok) setCompat(await compatRes.json());
+        }
+
         const listsRes = await fetch(`${API_BASE}/users/${username}/lists/`, {
           headers: authHeaders,
         });
@@ -300,6 +310,12 @@ export default function PublicProfilePage() {
                         @{user.username}
                       </p>
                     )}
+                    {compat?.overlap > 0 && (
+                      <p className="text-sm text-emerald-300">
+                        You agree {compat.agreement}% of the time
+                        <span className="ml-1 text-neutral-500">({compat.overlap} movies in common)</span>
+                      </p>
+                    )}
                   </div>
                 </div>
               </header>
@@ -86,20 +86,21 @@ export default function AddToListModel({ show, onClose, movieId, onRequireLogin
   const handleAddItemToList = async (listId) => {
     setError('');
     try {
-      const res = await fetch(`${API_BASE}/lists/${listId}/items/`, {
+      const res = await fetch(`${API_BASE}/lists/bulk-add/`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
           Authorization: `Bearer ${access}`,
         },
-        body: JSON.stringify({ movie_id: String(movieId) }),
+        body: JSON.stringify({ list_ids: [listId], movie_ids: [String(movieId)] }),
       });
-      if (!res.ok) {
-         const errData = await res.json();
-         if (errData.error && errData.error.includes("already in the list")) {
-           throw new Error("This movie is already in that list.");
-         }
-         throw new Error('Failed to add movie to list');
+      if (!res.ok) throw new Error('Failed to add movie to list');
+      const data = await res.json();
+      if (data.duplicates?.length) {
+        throw new Error("This movie is already in that list.");
+      }
+      if (data.missing_lists?.length) {
+        throw new Error('Failed to add movie to list');
       }
       
       onClose(); // Success! Close the modal.
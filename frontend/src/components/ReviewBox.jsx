@@ -8,6 +8,7 @@ function ReviewsBoxAuthed({ movieId, user, access, onRequireLogin }) {
   const [loading, setLoading] = useState(true);
   const [list, setList] = useState([]);
   const [avg, setAvg] = useState({ count: 0, avg: 0 });
+  const [followingAvg, setFollowingAvg] = useState({ count: 0, avg: 0 });
   const [rating, setRating] = useState(0);
   const [text, setText] = useState("");
   const [saving, setSaving] = useState(false);
@@ -18,9 +19,15 @@ function ReviewsBoxAuthed({ movieId, user, access, onRequireLogin }) {
     setLoading(true);
     setError("");
     try {
-      const [r1, r2] = await Promise.all([
+      const [r1, r2, r3] = await Promise.all([
         fetch(`${API_BASE}/reviews/?movie_id=${movieId}`),
         fetch(`${API_BASE}/reviews/summary/?movie_id=${movieId}`),
+        // akiket követek: ebből csak a summary (átlag) kell
+        access
+          ? fetch(`${API_BASE}/reviews/?movie_id=${movieId}&scope=following`, {
+              headers: { Authorization: `Bearer ${access}` },
+            })
+          : null,
       ]);
       if (!r1.ok) throw new Error("Nem sikerült lekérni a véleményeket.");
       if (!r2.ok) throw new Error("Nem sikerült lekérni az összegzést.");
@@ -29,6 +36,7 @@ function ReviewsBoxAuthed({ movieId, user, access, onRequireLogin }) {
       const rows = data.results ?? data;
       setList(rows);
       setAvg(summary);
+      if (r3?.ok) setFollowingAvg((await r3.json()).summary);
 
       if (user?.id) {
         const mine = rows.find(x => x.user_id === user.id);
@@ -43,13 +51,30 @@ function ReviewsBoxAuthed({ movieId, user, access, onRequireLogin }) {
     } finally {
       setLoading(false);
     }
-  }, [movieId, user?.id]);
+  }, [movieId, user?.id, access]);
 
 
   useEffect(() => {
     if (movieId) load();
   }, [movieId, user?.id, load]);
 
+  // Élő frissítés (SSE): mások új/törölt review-i és a friss átlag, polling nélkül
+  useEffect(() => {
+    if (!movieId || typeof EventSource === "undefined") return;
+    const source = new EventSource(`${API_BASE}/reviews/stream/?movie_id=${movieId}`);
+    source.addEventListener("review", (e) => {
+      const msg = JSON.parse(e.data);
+      setList(rows => [msg.review, ...rows.filter(x => x.id !== msg.review.id)]);
+      setAvg(msg.summary);
+    });
+    source.addEventListener("review_deleted", (e) => {
+      const msg = JSON.parse(e.data);
+      setList(rows => rows.filter(x => x.id !== msg.id));
+      setAvg(msg.summary);
+    });
+    return () => source.close();
+  }, [movieId]);
+
   async function save() {
     if (!user || !access) {
       setError("You must login to rate.");
@@ -103,6 +128,12 @@ function ReviewsBoxAuthed({ movieId, user, access, onRequireLogin }) {
         <div className="text-sm text-neutral-300">
           Score: <span className="font-semibold">{avg.avg || 0}</span> / 5
           <span className="ml-2 text-neutral-500">({avg.count} review)</span>
+          {followingAvg.count > 0 && (
+            <span className="ml-3 text-neutral-400">
+              Following: <span className="font-semibold">{followingAvg.avg}</span>
+              <span className="ml-1 text-neutral-500">({followingAvg.count})</span>
+            </span>
+          )}
         </div>
       </div>
 
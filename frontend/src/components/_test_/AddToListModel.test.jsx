@@ -121,4 +121,68 @@ afterEach(() => {
     expect(screen.getByText('Sci-Fi')).toBeInTheDocument();
     expect(screen.queryByText('Comedy')).not.toBeInTheDocument();
   });
+
+  it('adds the movie through the bulk-add endpoint', async () => {
+    vi.spyOn(AuthContext, 'useAuthOptional').mockReturnValue({ 
+      user: { id: 1 }, 
+      access: 'token' 
+    });
+
+    globalThis.fetch.mockResolvedValueOnce({
+      ok: true,
+      json: () => Promise.resolve({ results: [{ id: 7, name: 'Sci-Fi', items: [] }] }),
+    });
+    globalThis.fetch.mockResolvedValueOnce({
+      ok: true,
+      json: () => Promise.resolve({
+        added: [{ list_id: 7, movie_id: '123' }], duplicates: [], missing_lists: [],
+      }),
+    });
+    const onClose = vi.fn();
+
+    render(
+      <AddToListModel 
+        show={true} 
+        onClose={onClose} 
+        movieId={123} 
+      />
+    );
+
+    fireEvent.click(await screen.findByText('Sci-Fi'));
+
+    await waitFor(() => expect(onClose).toHaveBeenCalled());
+    const [url, options] = globalThis.fetch.mock.calls[1];
+    expect(url).toMatch(/\/lists\/bulk-add\/$/);
+    expect(JSON.parse(options.body)).toEqual({ list_ids: [7], movie_ids: ['123'] });
+  });
+
+  it('shows an error when the movie is already in the list', async () => {
+    vi.spyOn(AuthContext, 'useAuthOptional').mockReturnValue({ 
+      user: { id: 1 }, 
+      access: 'token' 
+    });
+
+    globalThis.fetch.mockResolvedValueOnce({
+      ok: true,
+      json: () => Promise.resolve({ results: [{ id: 7, name: 'Sci-Fi', items: [] }] }),
+    });
+    globalThis.fetch.mockResolvedValueOnce({
+      ok: true,
+      json: () => Promise.resolve({
+        added: [], duplicates: [{ list_id: 7, movie_id: '123' }], missing_lists: [],
+      }),
+    });
+
+    render(
+      <AddToListModel 
+        show={true} 
+        onClose={vi.fn()} 
+        movieId={123} 
+      />
+    );
+
+    fireEvent.click(await screen.findByText('Sci-Fi'));
+
+    expect(await screen.findByText('This movie is already in that list.')).toBeInTheDocument();
+  });
 });
\ No newline at end of file